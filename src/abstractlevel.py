@@ -11,6 +11,7 @@ import abc
 import typing
 import itertools
 import enum
+import hashlib
 import random
 
 import constants
@@ -137,6 +138,11 @@ class SpecialRoom:
         """ property """
         return self._altar_alignment
 
+    @property
+    def cells(self) -> typing.Set[typing.Tuple[int, int]]:
+        """ property """
+        return self._cells
+
 
 class DungeonLevelDepth:
     """ Dungeon level name sort of """
@@ -227,7 +233,7 @@ class AbstractLevel(abc.ABC):
 
     _cur_identifier = itertools.count(0)
 
-    def __init__(self, level_name: str, depth: int, branch: str, nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False) -> None:
+    def __init__(self, level_name: str, depth: int, branch: str, nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False, identifier: typing.Optional[int] = None) -> None:
 
         assert nb_up_stairs >= 0 and nb_down_stairs >= 0, "Creating a level with no stairs at all"
         assert not (entry_level and nb_up_stairs == 0), "Creating and entry level with no up stairs"
@@ -245,6 +251,12 @@ class AbstractLevel(abc.ABC):
 
         self._level_light_sources: typing.List[places.LightSourceRecord] = list()
 
+        # light map is of class lighting.LightMap but we cannot import it here (cycle) - will be made later
+        self._light_map: typing.Any = None
+
+        # navigation graph is of class navigation.NavigationGraph but we cannot import it here (cycle) - will be made later
+        self._navigation_graph: typing.Any = None
+
         self._name = level_name
         self._depth = DungeonLevelDepth(depth)
         self._branch = branch
@@ -255,21 +267,21 @@ class AbstractLevel(abc.ABC):
         self._free_downstairs: typing.Set[typing.Tuple[int, int]] = set()
         self._free_upstairs: typing.Set[typing.Tuple[int, int]] = set()
 
-        # every level need a different identiifier
-        self._identifier = next(type(self)._cur_identifier)
+        # every level need a different identiifier (reserved before if level is part of a dungeon)
+        self._identifier = identifier if identifier is not None else next(AbstractLevel._cur_identifier)
 
         # special rooms of the level
         self._level_special_rooms: typing.List[SpecialRoom] = list()
 
-        # actual data of the level
-        self._data: typing.Dict[typing.Tuple[int, int], places.Place] = dict()
+        # actual data of the level (all tiles on level are matter until otherwise specified)
+        self._data = places.LevelGrid(self._level_width, self._level_height)
 
-        # all tiles on level are matter until otherwise specified
-        for x_pos in range(self._level_width):
-            for y_pos in range(self._level_height):
-                tile = places.Tile(places.TileTypeEnum.MATTER)
-                place = places.Place(tile)
-                self._data[(x_pos, y_pos)] = place
+    @classmethod
+    def reserve_identifiers(cls, nb_identifiers: int) -> int:
+        """ first of identifiers for levels to be made (maybe in other processes) """
+        first = next(cls._cur_identifier)
+        cls._cur_identifier = itertools.count(first + nb_identifiers)
+        return first
 
     def scatter_items(self) -> None:
         """ Put items on the level """
@@ -306,7 +318,7 @@ class AbstractLevel(abc.ABC):
                     item_type = random.choice(list(possible_types))
                     # make it to item
                     item = item_glyph_choice(item_type)
-                    place.items.append(item)
+                    place.add_item(item)
 
     def populate_monsters(self) -> None:
         """ Put mosnsters on the level """
@@ -347,7 +359,9 @@ class AbstractLevel(abc.ABC):
     def show_path(monsters_ai: typing.Any, hero_position: typing.Tuple[int, int]) -> int:
         """ for debug purpose : put xans (x) on the path from some monster to hero """
 
-        monster = monsters.Monster.ready_ones[0]
+        monster = next((m for m in monsters.LIFECYCLE.active_ones() if not m.is_hero()), None)
+        if monster is None:
+            return 0
         success, _, path = monsters_ai.tools.path_towards(monster, hero_position)
         if not success:
             return 0
@@ -359,7 +373,9 @@ class AbstractLevel(abc.ABC):
     def show_los(monsters_ai: typing.Any, hero_position: typing.Tuple[int, int]) -> bool:
         """ for debug purpose : put xans (x) on the LOS (line of sight) from some monster to hero """
 
-        monster = monsters.Monster.ready_ones[0]
+        monster = next((m for m in monsters.LIFECYCLE.active_ones() if not m.is_hero()), None)
+        if monster is None:
+            return False
         line: typing.List[typing.Tuple[int, int]] = list()
         success, line = monsters_ai.tools.can_see(monster, hero_position)
         for pos in line[:-1]:
@@ -368,21 +384,39 @@ class AbstractLevel(abc.ABC):
 
     def reveal_secret(self) -> None:
         """ reveal secret stuff (debug)  """
-        for place in self._data.values():
-            if place.door:
-                place.door.reveal_secret()
-            if place.corridor:
-                place.corridor.reveal_secret()
+        for secret in self._data.secrets():
+            secret.reveal_secret()
 
     def random_position(self) -> typing.Tuple[int, int]:
         """ Teleport level arrival on level position """
-        possibilities = [pos for pos in self.data if self.data[pos].may_access() and not self.data[pos].occupant]
+        possibilities = self._data.free_accessible_positions()
         return random.choice(possibilities)
 
     @abc.abstractmethod
     def convert_to_places(self) -> None:
         """ should convert logical level to physical level """
 
+    def fingerprint(self) -> str:
+        """ digest of all the level is made of : same digest, same level (up to the last item, whatever its identifier in process) """
+
+        digest = hashlib.sha256()
+        digest.update(f"{self._name} {self._depth.value} {self._branch} {self._entry_position}".encode())
+        for plane in self._data.tile_plane, self._data.opacity, self._data.walkability, self._data.diagonal_passability:
+            digest.update(bytes(plane))
+        for pos in self._data:
+            place = self._data[pos]
+            items = [i.whatis() for i in place.items]
+            feature = place.feature.whatis() if place.feature else None
+            trap = place.trap.whatis() if place.trap else None
+            digest.update(f"{pos} {place.display_glyph()} {place.bumped_into()} {items} {feature} {trap} {place.inscription}".encode())
+        for staircase, (other_level, other_staircase) in sorted(self._junction_table.items()):
+            digest.update(f"{staircase} {other_level.name if other_level else None} {other_staircase}".encode())
+        digest.update(f"{sorted(self._downstairs)} {sorted(self._upstairs)} {sorted(self._free_downstairs)} {sorted(self._free_upstairs)}".encode())
+        for special_room in self._level_special_rooms:
+            digest.update(f"{special_room.mytype.name} {sorted(special_room.cells)}".encode())
+        digest.update(f"{self._level_light_sources}".encode())
+        return digest.hexdigest()
+
     @property
     def entry_position(self) -> typing.Optional[typing.Tuple[int, int]]:
         """ property """
@@ -404,10 +438,35 @@ class AbstractLevel(abc.ABC):
         return self._identifier
 
     @property
-    def data(self) -> typing.Dict[typing.Tuple[int, int], places.Place]:
+    def data(self) -> places.LevelGrid:
         """ property """
         return self._data
 
+    @property
+    def opacity(self) -> bytearray:
+        """ property : 1 where vision is blocked (index is y * width + x) """
+        return self._data.opacity
+
+    @property
+    def walkability(self) -> bytearray:
+        """ property : 1 where place may be accessed (index is y * width + x) """
+        return self._data.walkability
+
+    @property
+    def diagonal_passability(self) -> bytearray:
+        """ property : 1 where place may be accessed diagonally (index is y * width + x) """
+        return self._data.diagonal_passability
+
+    @property
+    def version(self) -> int:
+        """ property : changes when one of the bitmaps changes """
+        return self._data.version
+
+    @property
+    def opacity_version(self) -> int:
+        """ property : changes when opacity bitmap changes """
+        return self._data.opacity_version
+
     @property
     def junction_table(self) -> typing.Dict[typing.Tuple[int, int], typing.Tuple[typing.Optional['AbstractLevel'], typing.Optional[typing.Tuple[int, int]]]]:
         """ property """
@@ -443,6 +502,26 @@ class AbstractLevel(abc.ABC):
         """ property """
         return self._level_light_sources
 
+    @property
+    def light_map(self) -> typing.Any:
+        """ property """
+        return self._light_map
+
+    @light_map.setter
+    def light_map(self, light_map: typing.Any) -> None:
+        """ setter """
+        self._light_map = light_map
+
+    @property
+    def navigation_graph(self) -> typing.Any:
+        """ property """
+        return self._navigation_graph
+
+    @navigation_graph.setter
+    def navigation_graph(self, navigation_graph: typing.Any) -> None:
+        """ setter """
+        self._navigation_graph = navigation_graph
+
     @property
     def depth(self) -> DungeonLevelDepth:
         """ property """
@@ -469,7 +548,7 @@ def test(roomtype: typing.Type[typing.Any]) -> None:
     for num in range(NB_TEST):
         myrandom.restart_random()
         print(f"{num} ", end='', flush=True)
-        roomtype("dummy", 1, "X", set())
+        roomtype("dummy", 1, "X", None)
 
 
 if __name__ == '__main__':
@@ -11,7 +11,7 @@ import typing
 import enum
 import random
 import math
-import curses
+import mycurses
 
 import myrandom
 import gui
@@ -104,6 +104,7 @@ class Action:
 
     # these are defined once for all
     the_messages: typing.Optional[gui.Messages] = None
+    the_dungeon: typing.Any = None  # dungeon module imports (indirectly) this one
 
     def __init__(self, mytype: ActionEnum,
                  the_monster: typing.Optional[monsters.Monster] = None,
@@ -144,8 +145,7 @@ class Action:
         # cannot access because not walkable
         if not cur_level.data[new_pos].may_access():
             if self._the_monster.is_hero():
-                curses.beep()  # does not work here ???
-                curses.flash()
+                mycurses.beep()
                 obstacle = cur_level.data[new_pos].bumped_into()
                 Action.the_messages.store(f"Ouch you bumped into {obstacle}")
             return
@@ -176,6 +176,10 @@ class Action:
         cur_pos = self._the_monster.position
         cur_level = self._the_monster.dungeon_level
 
+        # level at other end made if first time reached
+        if Action.the_dungeon is not None:
+            Action.the_dungeon.resolve_junction(cur_level, cur_pos)
+
         if self._the_direction == DirectionEnum.CLIMB_UP:
             if cur_pos not in cur_level.junction_table:
                 Action.the_messages.store("Junction error!")
@@ -350,7 +354,7 @@ class Action:
             x_pos, y_pos = self._the_monster.position
             start_pos = (x_pos + delta_x, y_pos + delta_y)
 
-            for item in self._the_monster.dungeon_level.data[start_pos].items.copy():
+            for item in list(self._the_monster.dungeon_level.data[start_pos].items):
                 (new_x, new_y) = start_pos
                 good_pos = start_pos
                 dist_max = math.ceil(self._the_monster.strength_value() / 2 - item.mytype.weight / 40) + myrandom.randint(-1, 1)
@@ -366,8 +370,8 @@ class Action:
                     dist += 1
                 if good_pos != start_pos:
                     something_moved = True
-                    self._the_monster.dungeon_level.data[start_pos].items.remove(item)
-                    self._the_monster.dungeon_level.data[good_pos].items.append(item)
+                    self._the_monster.dungeon_level.data[start_pos].remove_item(item)
+                    self._the_monster.dungeon_level.data[good_pos].add_item(item)
 
             if not something_moved:
                 Action.the_messages.store("Thump!")
@@ -383,14 +387,13 @@ class Action:
 
         hero_pos = self._the_monster.position
         place = self._the_monster.dungeon_level.data[hero_pos]
-        local_items = place.items
 
-        if self._the_item not in local_items:
+        if self._the_item not in place.items:
             if self._the_monster.is_hero():
                 Action.the_messages.store("Hey, the item to pick is no more there!")
             return
 
-        local_items.remove(self._the_item)
+        place.remove_item(self._the_item)
         self._the_monster.backsack.add_something(self._the_item)
         Action.the_messages.store(f"{self._the_item.whatis()}")
 
@@ -403,7 +406,6 @@ class Action:
 
         hero_pos = self._the_monster.position
         place = self._the_monster.dungeon_level.data[hero_pos]
-        local_items = place.items
 
         if self._the_item not in self._the_monster.backsack.list_content():
             if self._the_monster.is_hero():
@@ -411,7 +413,7 @@ class Action:
             return
 
         self._the_monster.backsack.remove_something(self._the_item)
-        local_items.append(self._the_item)
+        place.add_item(self._the_item)
         if self._the_monster.is_hero():
             Action.the_messages.store(f"You dropped {self._the_item.whatis()}")
 
@@ -447,7 +449,7 @@ class Action:
                 return
 
             self._the_monster.backsack.remove_something(self._the_item)
-            self._the_monster.dungeon_level.data[good_pos].items.append(self._the_item)
+            self._the_monster.dungeon_level.data[good_pos].add_item(self._the_item)
             return
 
         if self._the_monster.is_hero():
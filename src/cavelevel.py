@@ -23,7 +23,7 @@ import abstractlevel
 class CaveLevel(abstractlevel.AbstractLevel):
     """ A cave level object """
 
-    def __init__(self, level_name: str, depth: int, branch: str, already_special_rooms: typing.Set[abstractlevel.SpecialRoomEnum], nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False) -> None:  # pylint: disable=unused-argument
+    def __init__(self, level_name: str, depth: int, branch: str, planned_special_room: typing.Optional[abstractlevel.SpecialRoomEnum], nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False, identifier: typing.Optional[int] = None) -> None:  # pylint: disable=unused-argument
 
         def outside_cave(pos: typing.Tuple[int, int]) -> bool:
             """ detects outside positions """
@@ -191,7 +191,7 @@ class CaveLevel(abstractlevel.AbstractLevel):
 
         #  start of init here
 
-        abstractlevel.AbstractLevel.__init__(self, level_name, depth, branch, nb_down_stairs, nb_up_stairs, entry_level)
+        abstractlevel.AbstractLevel.__init__(self, level_name, depth, branch, nb_down_stairs, nb_up_stairs, entry_level, identifier)
 
         cave_table: typing.Dict[typing.Tuple[int, int], bool] = dict()
 
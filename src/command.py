@@ -19,6 +19,7 @@ import actions
 import monsters
 import monsters_ai
 import heavyrocks
+import instrument
 
 
 COMMAND_2_DIRECTION = {
@@ -567,6 +568,12 @@ class CommandHandler:
             self._the_gui.show_content(enlightment_content, False)
             return list()
 
+        # debug - performance overlay
+        if my_command == gui.CommandEnum.PERF_OVERLAY:
+            instrument.toggle_overlay()
+            self._the_messages.store(f"Performance overlay {'on' if instrument.OVERLAY else 'off'}")
+            return list()
+
         # special : recall messages (go up)
         if my_command == gui.CommandEnum.PREVIOUS_MESSAGES:
             self._the_messages.upper()
@@ -21,6 +21,8 @@ VERSION = ""
 DUNGEON_WIDTH = 0
 DUNGEON_HEIGHT = 0
 FOV_RADIUS = 0
+FOV_ENGINE = ""
+FOV_CACHE_SIZE = 0
 MESSAGES_BUFFER_SIZE = 0
 PROMPT_BUFFER_SIZE = 0
 STATUS_INFORMATION_SIZE = 0
@@ -38,6 +40,7 @@ LOAD_LEVEL = ""
 GENERATE_LEVEL = ""
 GENERATE_LEVEL_DEPTH = 1
 REVERSE = False
+PARALLEL_GENERATION = False
 
 
 class ConfigFile:
@@ -89,6 +92,12 @@ def load_config() -> None:
     global FOV_RADIUS
     FOV_RADIUS = int(section['fov_radius'])
 
+    section = CONFIG.general_config.section('mapping')
+    global FOV_ENGINE
+    FOV_ENGINE = section['fov_engine']
+    global FOV_CACHE_SIZE
+    FOV_CACHE_SIZE = int(section['fov_cache_size'])
+
     section = CONFIG.general_config.section('interface')
     global MESSAGES_BUFFER_SIZE
     MESSAGES_BUFFER_SIZE = int(section['messages_buffer_size'])
@@ -7,9 +7,13 @@ File : dungeon.py
 Overall creation of the dungeon. Means creating levels and linking them with stairs.
 """
 
+# pylint: disable=global-statement
+
 import typing
 import time
 import enum
+import hashlib
+import concurrent.futures
 
 import myjson
 import mylogger
@@ -20,9 +24,17 @@ import cavelevel
 import roomlevel
 import mappedlevel
 import abstractlevel
+import lighting
+import navigation
+import monsters
+import pickables
 
 
 NB_TEST = 10
+NB_TEST_PARALLEL = 3
+
+# items made with a level are numbered in a range depending on level (so whatever order levels are made in), items made during play after all ranges
+ITEMS_PER_LEVEL = 1000
 
 
 @enum.unique
@@ -44,9 +56,185 @@ def find_level_type(name: str) -> LevelTypeEnum:
     return type_level
 
 
+class LevelSpec(typing.NamedTuple):
+    """ All that is needed to generate a level (in this process or in another one) """
+    level_name: str
+    level_type: LevelTypeEnum
+    depth: int
+    branch: str
+    nb_down_stairs: int
+    nb_up_stairs: int
+    entry_level: bool
+    planned_special_room: typing.Optional[abstractlevel.SpecialRoomEnum]
+    number: int
+    identifier: int
+
+
+def build_level(level_spec: LevelSpec) -> abstractlevel.AbstractLevel:
+    """ Build a single level : from its own random stream so it does not depend on other levels (nor on where it is built) """
+
+    level_name, level_type, depth, branch, nb_down_stairs, nb_up_stairs, entry_level, planned_special_room, number, identifier = level_spec
+
+    with myrandom.derived_stream(f"level {depth}{branch}"), pickables.idents_from(number * ITEMS_PER_LEVEL + 1, ITEMS_PER_LEVEL):
+
+        if level_type == LevelTypeEnum.MAPPED_LEVEL:
+            t_before = time.perf_counter()
+            attempt_mapped_level = mappedlevel.MappedLevel(level_name, depth, branch, planned_special_room, nb_down_stairs, nb_up_stairs, entry_level, identifier)
+            attempt_mapped_level.convert_to_places()
+            lighting.light_map(attempt_mapped_level)
+            navigation.navigation_graph(attempt_mapped_level)
+            t_after = time.perf_counter()
+            elapsed = t_after - t_before
+            mylogger.LOGGER.info("mapped level %s took %f seconds to build", level_name, elapsed)
+            return attempt_mapped_level
+        if level_type == LevelTypeEnum.ROOM_LEVEL:
+            t_before = time.perf_counter()
+            attempt_room_level = roomlevel.RoomLevel(level_name, depth, branch, planned_special_room, nb_down_stairs, nb_up_stairs, entry_level, identifier)
+            attempt_room_level.convert_to_places()
+            attempt_room_level.scatter_items()
+            attempt_room_level.populate_monsters()
+            lighting.light_map(attempt_room_level)
+            navigation.navigation_graph(attempt_room_level)
+            t_after = time.perf_counter()
+            elapsed = t_after - t_before
+            mylogger.LOGGER.info("room level %s took %f seconds to build", level_name, elapsed)
+            return attempt_room_level
+        if level_type == LevelTypeEnum.MAZE_LEVEL:
+            t_before = time.perf_counter()
+            attempt_maze_level = mazelevel.MazeLevel(level_name, depth, branch, planned_special_room, nb_down_stairs, nb_up_stairs, entry_level, identifier)
+            attempt_maze_level.convert_to_places()
+            attempt_maze_level.scatter_items()
+            attempt_maze_level.populate_monsters()
+            lighting.light_map(attempt_maze_level)
+            navigation.navigation_graph(attempt_maze_level)
+            t_after = time.perf_counter()
+            elapsed = t_after - t_before
+            mylogger.LOGGER.info("maze level %s took %f seconds to build", level_name, elapsed)
+            return attempt_maze_level
+        if level_type == LevelTypeEnum.CAVE_LEVEL:
+            t_before = time.perf_counter()
+            attempt_cave_level = cavelevel.CaveLevel(level_name, depth, branch, planned_special_room, nb_down_stairs, nb_up_stairs, entry_level, identifier)
+            attempt_cave_level.convert_to_places()
+            attempt_cave_level.scatter_items()
+            attempt_cave_level.populate_monsters()
+            lighting.light_map(attempt_cave_level)
+            navigation.navigation_graph(attempt_cave_level)
+            t_after = time.perf_counter()
+            elapsed = t_after - t_before
+            mylogger.LOGGER.info("cave level %s took %f seconds to build", level_name, elapsed)
+            return attempt_cave_level
+
+    assert False, f"What is this type of level '{level_type}' ?"
+    return None
+
+
+def _start_worker(seed_value: int) -> None:
+    """ A process building levels starts (needed if it does not inherit everything from its parent) """
+    if not hasattr(mylogger, 'LOGGER'):
+        mylogger.start_logger(True)
+    if constants.CONFIG is None:
+        constants.load_config()
+    myrandom.SEED_VALUE = seed_value
+
+
+def _build_level_apart(level_spec: LevelSpec) -> typing.Tuple[abstractlevel.AbstractLevel, typing.List[monsters.Monster]]:
+    """ Builds a level in a process building levels : the monsters made with it go back with it (in order) """
+    nb_rising_before = len(monsters.LIFECYCLE.rising_ones())
+    level = build_level(level_spec)
+    return level, monsters.LIFECYCLE.rising_ones()[nb_rising_before:]
+
+
+def link_levels(upper_level: typing.Optional[abstractlevel.AbstractLevel], up_staircase: typing.Optional[typing.Tuple[int, int]], lower_level: typing.Optional[abstractlevel.AbstractLevel], down_staircase: typing.Optional[typing.Tuple[int, int]]) -> None:
+    """ Link two staircases of two levels (or a staircase to void) """
+
+    if up_staircase and down_staircase:
+        assert upper_level, "No upper level"
+        upper_level.junction_table[up_staircase] = (lower_level, down_staircase)
+        assert lower_level, "No lower level"
+        lower_level.junction_table[down_staircase] = (upper_level, up_staircase)
+    elif up_staircase and not down_staircase:
+        assert upper_level, "No upper level"
+        upper_level.junction_table[up_staircase] = None, (0, 0)  # void !
+    elif down_staircase and not up_staircase:
+        assert lower_level, "No lower level"
+        lower_level.junction_table[down_staircase] = None, (0, 0)  # void !
+
+
+def join_levels(upper_level: typing.Optional[abstractlevel.AbstractLevel], lower_level: typing.Optional[abstractlevel.AbstractLevel], debug_context: bool) -> None:
+    """ Join two levels in the dungeon (insert stairs etc...) """
+
+    # Obvious checks
+    assert upper_level or lower_level, "Cannot join None and None"
+    if upper_level and lower_level:
+        assert upper_level.depth.value < lower_level.depth.value, f"Joining levels '{upper_level.name}' and '{lower_level.name}' : check their depth"
+
+    up_staircase = None
+    if upper_level:
+        up_staircase = upper_level.pop_downstairs()
+        assert up_staircase, f"There are no staircase down in level '{upper_level.name}'"
+
+    down_staircase = None
+    if lower_level:
+        down_staircase = lower_level.pop_upstairs()
+        if not debug_context:
+            assert down_staircase, f"There are no staircase up in level '{lower_level.name}'"
+
+    link_levels(upper_level, up_staircase, lower_level, down_staircase)
+
+
+class Prefetcher:
+    """ Makes levels in background (in another process) before they are reached """
+
+    def __init__(self) -> None:
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=1, initializer=_start_worker, initargs=(myrandom.SEED_VALUE,))
+        self._futures: typing.Dict[str, concurrent.futures.Future] = dict()  # type: ignore
+
+    def want(self, level_specs: typing.List[LevelSpec]) -> None:
+        """ these levels are made in background if not asked yet, levels asked and no longer wanted are cancelled (if not started) """
+        wanted_names = {s.level_name for s in level_specs}
+        for level_name in list(self._futures):
+            if level_name not in wanted_names and self._futures[level_name].cancel():
+                mylogger.LOGGER.info("level %s no longer made in background", level_name)
+                del self._futures[level_name]
+        for level_spec in level_specs:
+            if level_spec.level_name not in self._futures:
+                mylogger.LOGGER.info("level %s made in background", level_spec.level_name)
+                self._futures[level_spec.level_name] = self._executor.submit(_build_level_apart, level_spec)
+
+    def take(self, level_name: str) -> typing.Optional[typing.Tuple[abstractlevel.AbstractLevel, typing.List[monsters.Monster]]]:
+        """ level made in background and monsters made with it (waits if being made), None if not asked """
+        future = self._futures.pop(level_name, None)
+        if future is None:
+            return None
+        if not future.done():
+            mylogger.LOGGER.info("level %s still being made in background : waiting", level_name)
+        return future.result()  # type: ignore
+
+    def stop(self) -> None:
+        """ levels not started are cancelled, level being made is waited for """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# makes levels in background (None when not wanted)
+PREFETCHER: typing.Optional[Prefetcher] = None
+
+
+def start_prefetch() -> None:
+    """ Function to be called once to make levels next to the one of hero in background (after seed is known) """
+    global PREFETCHER
+    PREFETCHER = Prefetcher()
+    mylogger.LOGGER.info("Levels made in background")
+
+
+def stop_prefetch() -> None:
+    """ Function to be called once at end """
+    if PREFETCHER is not None:
+        PREFETCHER.stop()
+
+
 class Dungeon:
     """
-    Creates the whole dungeon
+    Creates the whole dungeon : levels are described at start and made when first reached
     """
 
     def __init__(self) -> None:
@@ -54,9 +242,7 @@ class Dungeon:
         def read_dungeon(loaded_content: typing.Dict[str, typing.Any]) -> None:
             """ reads a dungeon from json file """
 
-            level_by_name_table: typing.Dict[str, abstractlevel.AbstractLevel] = dict()
-            junction_list: typing.List[typing.Tuple[str, str]] = list()
-
+            entrance_name = ""
             for item_name in loaded_content:
 
                 item_data = loaded_content[item_name]
@@ -68,124 +254,59 @@ class Dungeon:
                     level_type = find_level_type(level_type_name)
                     depth = item_data["depth"] if "depth" in item_data else 1
                     branch = item_data["branch"]
-                    level_identifier = f"{depth}{branch}"
-                    assert level_identifier not in self._level_table, f"Duplicated depth/branch identifier {level_identifier}"
                     nb_up_stairs = item_data["nb_up_stairs"] if "nb_up_stairs" in item_data else 1
                     nb_down_stairs = item_data["nb_down_stairs"] if "nb_down_stairs" in item_data else 1
                     entry_level = item_data["entry_level"] if "entry_level" in item_data else False
-                    level = make_level(level_name, level_type, depth, branch, nb_down_stairs, nb_up_stairs, entry_level)
+                    level_identifier = f"{depth}{branch}"
+                    assert level_identifier not in self._level_names, f"Duplicated depth/branch identifier {level_identifier}"
+                    self._level_names[level_identifier] = level_name
+                    self._level_specs[level_name] = self.level_spec(level_name, level_type, depth, branch, nb_down_stairs, nb_up_stairs, entry_level)
                     if entry_level:
-                        self._entrance_level = level
-                    level_by_name_table[level_name] = level
-                    self._level_table[level_identifier] = level
+                        entrance_name = level_name
 
                 elif item_type == "junction":
                     upl_name = item_data["up"]
                     down_name = item_data["down"]
-                    junction_list.append((upl_name, down_name))
+                    self._junction_list.append((upl_name, down_name))
 
                 else:
                     assert False, "Unknown item type"
 
-            for (up_level_name, down_level_name) in junction_list:
+            for (up_level_name, down_level_name) in self._junction_list:
                 if up_level_name is not None:
-                    assert up_level_name in level_by_name_table, f"There is no level 'up' to join for {up_level_name}"
-                    up_level = level_by_name_table[up_level_name]
-                else:
-                    up_level = None
+                    assert up_level_name in self._level_specs, f"There is no level 'up' to join for {up_level_name}"
                 if down_level_name is not None:
-                    assert down_level_name in level_by_name_table, f"There is no level 'down' to join for {down_level_name}"
-                    down_level = level_by_name_table[down_level_name]
-                else:
-                    down_level = None
-                join_levels(up_level, down_level, False)
-
-        def make_level(level_name: str, level_type: LevelTypeEnum, depth: int, branch: str, nb_down_stairs: int, nb_up_stairs: int, entry_level: bool) -> abstractlevel.AbstractLevel:
-            """ Build a single level in the dungeon """
-
-            if entry_level:
-                assert not self._entry_point_defined, "Entry point defined twice for dungeon"
-                self._entry_point_defined = True
-
-            if level_type == LevelTypeEnum.MAPPED_LEVEL:
-                t_before = time.perf_counter()
-                attempt_mapped_level = mappedlevel.MappedLevel(level_name, depth, branch, self._already_special_rooms, nb_down_stairs, nb_up_stairs, entry_level)
-                attempt_mapped_level.convert_to_places()
-                t_after = time.perf_counter()
-                elapsed = t_after - t_before
-                mylogger.LOGGER.info("mapped level %s took %f seconds to build", level_name, elapsed)
-                return attempt_mapped_level
-            if level_type == LevelTypeEnum.ROOM_LEVEL:
-                t_before = time.perf_counter()
-                attempt_room_level = roomlevel.RoomLevel(level_name, depth, branch, self._already_special_rooms, nb_down_stairs, nb_up_stairs, entry_level)
-                attempt_room_level.convert_to_places()
-                attempt_room_level.scatter_items()
-                attempt_room_level.populate_monsters()
-                t_after = time.perf_counter()
-                elapsed = t_after - t_before
-                mylogger.LOGGER.info("room level %s took %f seconds to build", level_name, elapsed)
-                return attempt_room_level
-            if level_type == LevelTypeEnum.MAZE_LEVEL:
-                t_before = time.perf_counter()
-                attempt_maze_level = mazelevel.MazeLevel(level_name, depth, branch, self._already_special_rooms, nb_down_stairs, nb_up_stairs, entry_level)
-                attempt_maze_level.convert_to_places()
-                attempt_maze_level.scatter_items()
-                attempt_maze_level.populate_monsters()
-                t_after = time.perf_counter()
-                elapsed = t_after - t_before
-                mylogger.LOGGER.info("maze level %s took %f seconds to build", level_name, elapsed)
-                return attempt_maze_level
-            if level_type == LevelTypeEnum.CAVE_LEVEL:
-                t_before = time.perf_counter()
-                attempt_cave_level = cavelevel.CaveLevel(level_name, depth, branch, self._already_special_rooms, nb_down_stairs, nb_up_stairs, entry_level)
-                attempt_cave_level.convert_to_places()
-                attempt_cave_level.scatter_items()
-                attempt_cave_level.populate_monsters()
-                t_after = time.perf_counter()
-                elapsed = t_after - t_before
-                mylogger.LOGGER.info("cave level %s took %f seconds to build", level_name, elapsed)
-                return attempt_cave_level
-            assert False, f"What is this type of level '{level_type}' ?"
-            return None
+                    assert down_level_name in self._level_specs, f"There is no level 'down' to join for {down_level_name}"
+                if up_level_name is not None and down_level_name is not None:
+                    assert self._level_specs[up_level_name].depth < self._level_specs[down_level_name].depth, f"Joining levels '{up_level_name}' and '{down_level_name}' : check their depth"
 
-        def join_levels(upper_level: typing.Optional[abstractlevel.AbstractLevel], lower_level: typing.Optional[abstractlevel.AbstractLevel], debug_context: bool) -> None:
-            """ Join two levels in the dungeon (insert stairs etc...) """
-
-            # Obvious checks
-            assert upper_level or lower_level, "Cannot join None and None"
-            if upper_level and lower_level:
-                assert upper_level.depth.value < lower_level.depth.value, f"Joining levels '{upper_level.name}' and '{lower_level.name}' : check their depth"
-
-            up_staircase = None
-            if upper_level:
-                up_staircase = upper_level.pop_downstairs()
-                assert up_staircase, f"There are no staircase down in level '{upper_level.name}'"
-
-            down_staircase = None
-            if lower_level:
-                down_staircase = lower_level.pop_upstairs()
-                if not debug_context:
-                    assert down_staircase, f"There are no staircase up in level '{lower_level.name}'"
-
-            if up_staircase and down_staircase:
-                assert upper_level, "No upper level"
-                upper_level.junction_table[up_staircase] = (lower_level, down_staircase)
-                assert lower_level, "No lower level"
-                lower_level.junction_table[down_staircase] = (upper_level, up_staircase)
-            elif up_staircase and not down_staircase:
-                assert upper_level, "No upper level"
-                upper_level.junction_table[up_staircase] = None, (0, 0)  # void !
-            elif down_staircase and not up_staircase:
-                assert lower_level, "No lower level"
-                lower_level.junction_table[down_staircase] = None, (0, 0)  # void !
+            assert self._entry_point_defined, "No entry point defined for dungeon"
+
+            # all levels made now or only the one player starts in
+            if constants.PARALLEL_GENERATION:
+                self.make_all_levels()
+            self._entrance_level = self.level_named(entrance_name)
 
         #  == start of init here ==
         t_before_dungeon = time.perf_counter()
 
         self._entry_point_defined = False
-        self._level_table: typing.Dict[str, abstractlevel.AbstractLevel] = dict()
         self._already_special_rooms: typing.Set[abstractlevel.SpecialRoomEnum] = set()
 
+        # what levels will be (by name), their names (by depth/branch identifier) and junctions between them (by name)
+        self._level_specs: typing.Dict[str, LevelSpec] = dict()
+        self._level_names: typing.Dict[str, str] = dict()
+        self._junction_list: typing.List[typing.Tuple[typing.Optional[str], typing.Optional[str]]] = list()
+
+        # levels made so far (by name)
+        self._levels: typing.Dict[str, abstractlevel.AbstractLevel] = dict()
+
+        # staircases of levels made given to junctions (by number of junction and end : up or down)
+        self._junction_staircases: typing.Dict[typing.Tuple[int, bool], typing.Optional[typing.Tuple[int, int]]] = dict()
+
+        # staircases of levels made leading to levels not made yet (by name of level and staircase) : name of other level
+        self._pending_junctions: typing.Dict[typing.Tuple[str, typing.Tuple[int, int]], str] = dict()
+
         if constants.GENERATE_LEVEL:
             type_level = find_level_type(constants.GENERATE_LEVEL)
             branch = ""
@@ -197,12 +318,12 @@ class Dungeon:
                 branch = "M"  # mines
             else:
                 assert False, "Cannot generate this type of level."
-            self._entrance_level = make_level(f"Testing {constants.GENERATE_LEVEL} type", type_level, constants.GENERATE_LEVEL_DEPTH, branch, 1, 1, True)
+            self._entrance_level = self.make_level(self.level_spec(f"Testing {constants.GENERATE_LEVEL} type", type_level, constants.GENERATE_LEVEL_DEPTH, branch, 1, 1, True))
             join_levels(None, self._entrance_level, True)
             return
 
         if constants.LOAD_LEVEL:
-            self._entrance_level = make_level(constants.LOAD_LEVEL, LevelTypeEnum.MAPPED_LEVEL, 1, "X", 1, 1, True)
+            self._entrance_level = self.make_level(self.level_spec(constants.LOAD_LEVEL, LevelTypeEnum.MAPPED_LEVEL, 1, "X", 1, 1, True))
             join_levels(None, self._entrance_level, True)
             return
 
@@ -213,9 +334,117 @@ class Dungeon:
 
         t_after_dungeon = time.perf_counter()
         elapsed = t_after_dungeon - t_before_dungeon
-        mylogger.LOGGER.info("*** dungeon took %f seconds to build ***", elapsed)
-
-        assert self._entry_point_defined, "No entry point defined for dungeon"
+        mylogger.LOGGER.info("*** dungeon took %f seconds to build (%d levels made out of %d) ***", elapsed, len(self._levels), len(self._level_specs))
+
+    def level_spec(self, level_name: str, level_type: LevelTypeEnum, depth: int, branch: str, nb_down_stairs: int, nb_up_stairs: int, entry_level: bool) -> LevelSpec:
+        """ What a level of the dungeon will be : special room planned (in order of levels), identifier and range of item identifiers reserved """
+
+        if entry_level:
+            assert not self._entry_point_defined, "Entry point defined twice for dungeon"
+            self._entry_point_defined = True
+
+        planned_special_room = None
+        if level_type == LevelTypeEnum.ROOM_LEVEL:
+            with myrandom.derived_stream(f"special room {depth}{branch}"):
+                planned_special_room = roomlevel.plan_special_room(depth, self._already_special_rooms)
+
+        # number of level in dungeon gives its range of item identifiers
+        number = len(self._level_specs)
+        pickables.keep_idents_below((number + 1) * ITEMS_PER_LEVEL + 1)
+
+        identifier = abstractlevel.AbstractLevel.reserve_identifiers(1)
+        return LevelSpec(level_name, level_type, depth, branch, nb_down_stairs, nb_up_stairs, entry_level, planned_special_room, number, identifier)
+
+    def make_level(self, level_spec: LevelSpec) -> abstractlevel.AbstractLevel:  # pylint: disable=no-self-use
+        """ Build a single level in the dungeon """
+        return build_level(level_spec)
+
+    def make_levels(self, level_specs: typing.List[LevelSpec]) -> typing.List[abstractlevel.AbstractLevel]:  # pylint: disable=no-self-use
+        """ Build levels of the dungeon on all cores (same levels as one after the other) """
+
+        t_before = time.perf_counter()
+        with concurrent.futures.ProcessPoolExecutor(initializer=_start_worker, initargs=(myrandom.SEED_VALUE,)) as executor:
+            results = list(executor.map(_build_level_apart, level_specs))
+        mylogger.LOGGER.info("%d levels built apart in %f seconds", len(results), time.perf_counter() - t_before)
+
+        # monsters made with levels are followed here
+        for _, level_monsters in results:
+            for monster in level_monsters:
+                monsters.LIFECYCLE.rise(monster)
+
+        return [l for l, _ in results]
+
+    def add_level(self, level_spec: LevelSpec, level: abstractlevel.AbstractLevel) -> None:
+        """ A level just made joins the dungeon : its staircases are given to its junctions and linked to levels already made """
+
+        level_name = level_spec.level_name
+        self._levels[level_name] = level
+
+        # which staircase for which junction : from stream of level, so whatever order levels are made in
+        with myrandom.derived_stream(f"stairs {level_spec.depth}{level_spec.branch}"):
+            for num, (up_level_name, down_level_name) in enumerate(self._junction_list):
+                if up_level_name == level_name:
+                    up_staircase = level.pop_downstairs()
+                    assert up_staircase, f"There are no staircase down in level '{level_name}'"
+                    self._junction_staircases[(num, True)] = up_staircase
+                if down_level_name == level_name:
+                    down_staircase = level.pop_upstairs()
+                    assert down_staircase, f"There are no staircase up in level '{level_name}'"
+                    self._junction_staircases[(num, False)] = down_staircase
+
+        for num, (up_level_name, down_level_name) in enumerate(self._junction_list):
+            if level_name not in (up_level_name, down_level_name):
+                continue
+            other_level_name = down_level_name if up_level_name == level_name else up_level_name
+            if other_level_name is None or other_level_name in self._levels:
+                upper_level = self._levels[up_level_name] if up_level_name is not None else None
+                lower_level = self._levels[down_level_name] if down_level_name is not None else None
+                up_staircase = self._junction_staircases.get((num, True))
+                down_staircase = self._junction_staircases.get((num, False))
+                link_levels(upper_level, up_staircase, lower_level, down_staircase)
+                if other_level_name is not None:
+                    self._pending_junctions.pop((other_level_name, self._junction_staircases[(num, up_level_name == other_level_name)]), None)
+            else:
+                self._pending_junctions[(level_name, self._junction_staircases[(num, up_level_name == level_name)])] = other_level_name
+
+    def level_named(self, level_name: str) -> abstractlevel.AbstractLevel:
+        """ Level of that name, made now if first time reached (unless made in background) """
+        if level_name not in self._levels:
+            level_spec = self._level_specs[level_name]
+            made_apart = PREFETCHER.take(level_name) if PREFETCHER is not None else None
+            if made_apart is None:
+                self.add_level(level_spec, self.make_level(level_spec))
+            else:
+                level, level_monsters = made_apart
+                # monsters made with level are followed here
+                for monster in level_monsters:
+                    monsters.LIFECYCLE.rise(monster)
+                self.add_level(level_spec, level)
+        return self._levels[level_name]
+
+    def prefetch_around(self, level: abstractlevel.AbstractLevel) -> None:
+        """ Levels next to this one not made yet are made in background (others asked before cancelled) """
+        if PREFETCHER is None:
+            return
+        next_level_names = [n for (l, n) in self._pending_junctions.items() if l[0] == level.name]
+        PREFETCHER.want([self._level_specs[n] for n in sorted(set(next_level_names))])
+
+    def make_all_levels(self) -> None:
+        """ Levels not made yet are made now (on all cores if parallel generation) """
+        level_specs = [s for n, s in self._level_specs.items() if n not in self._levels]
+        if constants.PARALLEL_GENERATION:
+            levels = self.make_levels(level_specs)
+        else:
+            levels = [self.make_level(s) for s in level_specs]
+        for level_spec, level in zip(level_specs, levels):
+            self.add_level(level_spec, level)
+
+    def resolve_junction(self, level: abstractlevel.AbstractLevel, staircase: typing.Tuple[int, int]) -> None:
+        """ Staircase is about to be climbed : level it leads to is made if not yet """
+        other_level_name = self._pending_junctions.get((level.name, staircase))
+        if other_level_name is not None:
+            mylogger.LOGGER.info("level %s reached first time", other_level_name)
+            self.level_named(other_level_name)
 
     def start_position(self) -> typing.Tuple[abstractlevel.AbstractLevel, typing.Tuple[int, int]]:
         """ Dungeon start position """
@@ -223,10 +452,18 @@ class Dungeon:
         return self._entrance_level, self._entrance_level.entry_position
 
     def get_level(self, identifier: str) -> typing.Optional[abstractlevel.AbstractLevel]:
-        """ Get level from identifier """
-        if identifier not in self._level_table:
+        """ Get level from identifier (made if first time reached) """
+        if identifier not in self._level_names:
             return None
-        return self._level_table[identifier]
+        return self.level_named(self._level_names[identifier])
+
+    def fingerprint(self) -> str:
+        """ digest of levels made : same seed, same digest (whatever order levels were made in, here or in parallel) """
+        digest = hashlib.sha256()
+        for identifier, level_name in sorted(self._level_names.items()):
+            if level_name in self._levels:
+                digest.update(f"{identifier} {self._levels[level_name].fingerprint()}".encode())
+        return digest.hexdigest()
 
 
 def test() -> None:
@@ -237,7 +474,21 @@ def test() -> None:
     for num in range(NB_TEST):
         myrandom.restart_random()
         print(f"{num} ", end='', flush=True)
-        Dungeon()
+        Dungeon().make_all_levels()
+
+    # same dungeon when levels made in reverse order or in parallel
+    for num in range(NB_TEST_PARALLEL):
+        myrandom.restart_random()
+        print(f"p{num} ", end='', flush=True)
+        constants.PARALLEL_GENERATION = False
+        dungeon_reversed = Dungeon()
+        levels_made = [dungeon_reversed.get_level(i) for i in reversed(list(dungeon_reversed._level_names))]  # pylint: disable=protected-access
+        # identifiers reserved after levels were made are still free
+        assert abstractlevel.AbstractLevel.reserve_identifiers(1) not in {l.identifier for l in levels_made if l}, "Identifier of level given twice"
+        constants.PARALLEL_GENERATION = True
+        dungeon_parallel = Dungeon()
+        constants.PARALLEL_GENERATION = False
+        assert dungeon_reversed.fingerprint() == dungeon_parallel.fingerprint(), f"Dungeon made in another order differs (seed {myrandom.SEED_VALUE})"
 
 
 if __name__ == '__main__':
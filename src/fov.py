@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+
+
+"""
+File : fov.py
+
+Field of view engines : say what can be seen from a position of a level.
+
+All engines implement Adam Milazzo's algorithm for line of sight
+http://www.adammil.net/blog/v125_Roguelike_Vision_Algorithms.html
+and must give exactly the same result. The engine used is chosen in the ini file.
+"""
+
+import typing
+import abc
+import fractions
+import math
+import sys
+import time
+import pathlib
+import random
+
+import constants
+import mylogger
+import myrandom
+import abstractlevel
+import mappedlevel
+import roomlevel
+import mazelevel
+import cavelevel
+
+LOS_FULLY_SYMETRICAL = False
+
+NB_TEST_POSITIONS = 20
+
+
+class FovEngine(abc.ABC):
+    """ All field of view engines must derive from this class """
+
+    def __init__(self, level: abstractlevel.AbstractLevel) -> None:
+        self._level = level
+
+        # opacity bitmap of level (kept up to date by level)
+        self._opacity = level.opacity
+
+    def _blocks_vision(self, x_pos: int, y_pos: int) -> bool:
+        if x_pos < 0 or y_pos < 0 or x_pos >= self._level.level_width or y_pos >= self._level.level_height:
+            return True
+        return self._opacity[y_pos * self._level.level_width + x_pos] == 1
+
+    @abc.abstractmethod
+    def cast_light(self, x_origin: int, y_origin: int, range_limit: typing.Optional[int]) -> typing.Set[typing.Tuple[int, int]]:
+        """
+        Positions seen from origin within range (None for no limit)
+
+        It can be made fully symmetrical using LOS_FULLY_SYMETRICAL
+        """
+
+    def cast_light_distances(self, x_origin: int, y_origin: int) -> typing.Dict[typing.Tuple[int, int], int]:
+        """
+        Positions seen from origin with no range limit, with their square distance to origin (one single pass)
+        Positions seen within range R are exactly the ones at square distance <= R * R (checked in test())
+        """
+        return {(x_pos, y_pos): (x_pos - x_origin) ** 2 + (y_pos - y_origin) ** 2 for (x_pos, y_pos) in self.cast_light(x_origin, y_origin, None)}
+
+
+class FractionFovEngine(FovEngine):
+    """ Python strict translation of the C Sharp code implementing "My algorithm" (uses fractions) """
+
+    def _cast_light_rec(self, octant: int, origin: typing.Tuple[int, int], range_limit: typing.Optional[int], x_start: int, top: fractions.Fraction, bottom: fractions.Fraction, result: typing.Set[typing.Tuple[int, int]]) -> None:
+        """ Recursive part of lightcasting function """
+
+        def _get_distance(x_val: int, y_val: int) -> float:
+            """ get_distance """
+            return math.sqrt(x_val ** 2 + y_val ** 2)
+
+        def _translate_octant(x_val: int, y_val: int, octant: int, origin: typing.Tuple[int, int]) -> typing.Tuple[int, int]:
+            """ translate_octant """
+            new_x, new_y = origin
+            if octant == 0:
+                new_x += x_val
+                new_y -= y_val
+            elif octant == 1:
+                new_x += y_val
+                new_y -= x_val
+            elif octant == 2:
+                new_x -= y_val
+                new_y -= x_val
+            elif octant == 3:
+                new_x -= x_val
+                new_y -= y_val
+            elif octant == 4:
+                new_x -= x_val
+                new_y += y_val
+            elif octant == 5:
+                new_x -= y_val
+                new_y += x_val
+            elif octant == 6:
+                new_x += y_val
+                new_y += x_val
+            elif octant == 7:
+                new_x += x_val
+                new_y += y_val
+            return new_x, new_y
+
+        def _blocks_light(x_val: int, y_val: int, octant: int, origin: typing.Tuple[int, int]) -> bool:
+            """ blocksLight """
+            new_x, new_y = _translate_octant(x_val, y_val, octant, origin)
+            return self._blocks_vision(new_x, new_y)
+
+        def _set_visible(x_val: int, y_val: int, octant: int, origin: typing.Tuple[int, int]) -> None:
+            """ setVisible """
+            viewed = _translate_octant(x_val, y_val, octant, origin)
+            result.add(viewed)
+
+        # start of _cast_light_rec method
+
+        for x_val in range(x_start, range_limit + 1 if range_limit else sys.maxsize):
+
+            top_y = 0
+            if top.denominator == 1:
+                top_y = x_val
+            else:
+                top_y = int(((x_val * 2 - 1) * top.numerator + top.denominator) / (top.denominator * 2))
+                if _blocks_light(x_val, top_y, octant, origin):
+                    if top >= fractions.Fraction(top_y * 2 + 1, x_val * 2) and not _blocks_light(x_val, top_y + 1, octant, origin):
+                        top_y += 1
+                else:
+                    a_for_x = x_val * 2
+                    if _blocks_light(x_val + 1, top_y + 1, octant, origin):
+                        a_for_x += 1
+                    if top > fractions.Fraction(top_y * 2 + 1, a_for_x):
+                        top_y += 1
+
+            bottom_y = 0
+            if bottom.numerator == 0:
+                bottom_y = 0
+            else:
+                bottom_y = int(((x_val * 2 - 1) * bottom.numerator + bottom.denominator) / (bottom.denominator * 2))
+                if bottom >= fractions.Fraction(bottom_y * 2 + 1, x_val * 2) and _blocks_light(x_val, bottom_y, octant, origin) and not _blocks_light(x_val, bottom_y + 1, octant, origin):
+                    bottom_y += 1
+
+            was_opaque: typing.Optional[bool] = None
+
+            for y_val in range(top_y, bottom_y - 1, -1):
+                if range_limit is None or _get_distance(x_val, y_val) <= range_limit:
+                    is_opaque = _blocks_light(x_val, y_val, octant, origin)
+
+                    is_visible = False
+                    if not LOS_FULLY_SYMETRICAL:
+                        is_visible = is_opaque or ((y_val != top_y or top > fractions.Fraction(y_val * 4 - 1, x_val * 4 + 1)) and (y_val != bottom_y or bottom < fractions.Fraction(y_val * 4 + 1, x_val * 4 - 1)))
+                    else:
+                        is_visible = (y_val != top_y or top >= fractions.Fraction(y_val, x_val)) and (y_val != bottom_y or bottom <= fractions.Fraction(y_val, x_val))
+
+                    if is_visible:
+                        _set_visible(x_val, y_val, octant, origin)
+                    if x_val != range_limit:
+                        if is_opaque:
+                            if was_opaque is not None and not was_opaque:
+                                new_x, new_y = x_val * 2, y_val * 2 + 1
+
+                                if not LOS_FULLY_SYMETRICAL:
+                                    if _blocks_light(x_val, y_val + 1, octant, origin):
+                                        new_x -= 1
+
+                                if top > fractions.Fraction(new_y, new_x):
+                                    if y_val == bottom_y:
+                                        bottom = fractions.Fraction(new_y, new_x)
+                                        break
+                                    else:
+                                        self._cast_light_rec(octant, origin, range_limit, x_val + 1, top, fractions.Fraction(new_y, new_x), result)
+                                else:
+                                    if y_val == bottom_y:
+                                        return
+                            was_opaque = True
+                        else:  # isOpaque
+                            if was_opaque is not None and was_opaque:
+                                new_x, new_y = x_val * 2, y_val * 2 + 1
+                                if _blocks_light(x_val + 1, y_val + 1, octant, origin):
+                                    new_x += 1
+                                if bottom >= fractions.Fraction(new_y, new_x):
+                                    return
+                                top = fractions.Fraction(new_y, new_x)
+                            was_opaque = False
+
+            if was_opaque is None or was_opaque:
+                break
+
+    def cast_light(self, x_origin: int, y_origin: int, range_limit: typing.Optional[int]) -> typing.Set[typing.Tuple[int, int]]:
+        result: typing.Set[typing.Tuple[int, int]] = set()
+        origin = (x_origin, y_origin)
+        result.add(origin)
+        for octant in range(8):
+            self._cast_light_rec(octant, origin, range_limit, 1, fractions.Fraction(1, 1), fractions.Fraction(0, 1), result)
+        return result
+
+
+# octant transforms as coefficients : level x = origin x + x * xx + y * xy, level y = origin y + x * yx + y * yy
+OCTANT_COEFFICIENTS = (
+    (1, 0, 0, -1),
+    (0, 1, -1, 0),
+    (0, -1, -1, 0),
+    (-1, 0, 0, -1),
+    (-1, 0, 0, 1),
+    (0, -1, 1, 0),
+    (0, 1, 1, 0),
+    (1, 0, 0, 1),
+)
+
+
+class IntegerFovEngine(FovEngine):
+    """
+    Exact port of the same algorithm with integers only :
+      - a slope is kept as (numerator, denominator) and compared by cross multiplication
+      - octants are translated using precomputed coefficients
+    """
+
+    def _cast_light_rec(self, coefficients: typing.Tuple[int, int, int, int], origin: typing.Tuple[int, int], range_limit: typing.Optional[int], x_start: int, top: typing.Tuple[int, int], bottom: typing.Tuple[int, int], result: typing.Dict[typing.Tuple[int, int], int]) -> None:
+        """ Recursive part of lightcasting function (result gets square distance of positions seen) """
+
+        x_origin, y_origin = origin
+        coef_xx, coef_xy, coef_yx, coef_yy = coefficients
+        width = self._level.level_width
+        height = self._level.level_height
+        opacity = self._opacity
+
+        def _blocks_light(x_val: int, y_val: int) -> bool:
+            """ blocksLight """
+            new_x = x_origin + x_val * coef_xx + y_val * coef_xy
+            new_y = y_origin + x_val * coef_yx + y_val * coef_yy
+            if new_x < 0 or new_y < 0 or new_x >= width or new_y >= height:
+                return True
+            return opacity[new_y * width + new_x] == 1
+
+        top_num, top_den = top
+        bottom_num, bottom_den = bottom
+        range_limit2 = range_limit * range_limit if range_limit is not None else 0
+
+        for x_val in range(x_start, range_limit + 1 if range_limit else sys.maxsize):
+
+            # top is one when its reduced denominator is one (slope never goes beyond one)
+            if top_num % top_den == 0:
+                top_y = x_val
+            else:
+                top_y = ((x_val * 2 - 1) * top_num + top_den) // (top_den * 2)
+                if _blocks_light(x_val, top_y):
+                    if top_num * x_val * 2 >= (top_y * 2 + 1) * top_den and not _blocks_light(x_val, top_y + 1):
+                        top_y += 1
+                else:
+                    a_for_x = x_val * 2
+                    if _blocks_light(x_val + 1, top_y + 1):
+                        a_for_x += 1
+                    if top_num * a_for_x > (top_y * 2 + 1) * top_den:
+                        top_y += 1
+
+            if bottom_num == 0:
+                bottom_y = 0
+            else:
+                bottom_y = ((x_val * 2 - 1) * bottom_num + bottom_den) // (bottom_den * 2)
+                if bottom_num * x_val * 2 >= (bottom_y * 2 + 1) * bottom_den and _blocks_light(x_val, bottom_y) and not _blocks_light(x_val, bottom_y + 1):
+                    bottom_y += 1
+
+            was_opaque: typing.Optional[bool] = None
+
+            for y_val in range(top_y, bottom_y - 1, -1):
+                distance2 = x_val * x_val + y_val * y_val
+                if range_limit is None or distance2 <= range_limit2:
+                    is_opaque = _blocks_light(x_val, y_val)
+
+                    if not LOS_FULLY_SYMETRICAL:
+                        is_visible = is_opaque or ((y_val != top_y or top_num * (x_val * 4 + 1) > (y_val * 4 - 1) * top_den) and (y_val != bottom_y or bottom_num * (x_val * 4 - 1) < (y_val * 4 + 1) * bottom_den))
+                    else:
+                        is_visible = (y_val != top_y or top_num * x_val >= y_val * top_den) and (y_val != bottom_y or bottom_num * x_val <= y_val * bottom_den)
+
+                    if is_visible:
+                        result[(x_origin + x_val * coef_xx + y_val * coef_xy, y_origin + x_val * coef_yx + y_val * coef_yy)] = distance2
+                    if x_val != range_limit:
+                        if is_opaque:
+                            if was_opaque is not None and not was_opaque:
+                                new_x, new_y = x_val * 2, y_val * 2 + 1
+
+                                if not LOS_FULLY_SYMETRICAL:
+                                    if _blocks_light(x_val, y_val + 1):
+                                        new_x -= 1
+
+                                if top_num * new_x > new_y * top_den:
+                                    if y_val == bottom_y:
+                                        bottom_num, bottom_den = new_y, new_x
+                                        break
+                                    self._cast_light_rec(coefficients, origin, range_limit, x_val + 1, (top_num, top_den), (new_y, new_x), result)
+                                else:
+                                    if y_val == bottom_y:
+                                        return
+                            was_opaque = True
+                        else:  # isOpaque
+                            if was_opaque is not None and was_opaque:
+                                new_x, new_y = x_val * 2, y_val * 2 + 1
+                                if _blocks_light(x_val + 1, y_val + 1):
+                                    new_x += 1
+                                if bottom_num * new_x >= new_y * bottom_den:
+                                    return
+                                top_num, top_den = new_y, new_x
+                            was_opaque = False
+
+            if was_opaque is None or was_opaque:
+                break
+
+    def _cast_light_all(self, x_origin: int, y_origin: int, range_limit: typing.Optional[int]) -> typing.Dict[typing.Tuple[int, int], int]:
+        """ all octants """
+        origin = (x_origin, y_origin)
+        result = {origin: 0}
+        for coefficients in OCTANT_COEFFICIENTS:
+            self._cast_light_rec(coefficients, origin, range_limit, 1, (1, 1), (0, 1), result)
+        return result
+
+    def cast_light(self, x_origin: int, y_origin: int, range_limit: typing.Optional[int]) -> typing.Set[typing.Tuple[int, int]]:
+        return set(self._cast_light_all(x_origin, y_origin, range_limit))
+
+    def cast_light_distances(self, x_origin: int, y_origin: int) -> typing.Dict[typing.Tuple[int, int], int]:
+        # square distances are got while casting
+        return self._cast_light_all(x_origin, y_origin, None)
+
+
+FOV_ENGINES: typing.Dict[str, typing.Type[FovEngine]] = {
+    "fraction": FractionFovEngine,
+    "integer": IntegerFovEngine,
+}
+
+
+def make_engine(level: abstractlevel.AbstractLevel) -> FovEngine:
+    """ The engine chosen in ini file for this level """
+    assert constants.FOV_ENGINE in FOV_ENGINES, f"Unknown fov engine '{constants.FOV_ENGINE}' in ini file"
+    return FOV_ENGINES[constants.FOV_ENGINE](level)
+
+
+def test() -> None:
+    """ Equivalence of engines on all mapped levels and some generated levels, then benchmark """
+
+    global LOS_FULLY_SYMETRICAL
+
+    mylogger.start_logger(True)
+    constants.load_config()
+    myrandom.start_random()
+
+    levels: typing.List[abstractlevel.AbstractLevel] = list()
+    for file_path in sorted(pathlib.Path("./levels").glob("*.lev.json")):
+        level_name = file_path.name[:-len(".lev.json")]
+        mapped_level = mappedlevel.MappedLevel(level_name, 1, "X", None)
+        mapped_level.convert_to_places()
+        levels.append(mapped_level)
+    for level_class in roomlevel.RoomLevel, mazelevel.MazeLevel, cavelevel.CaveLevel:
+        generated_level = level_class(f"dummy {level_class.__name__}", 1, "X", None)
+        generated_level.convert_to_places()
+        levels.append(generated_level)
+
+    # positions : any place that can be accessed
+    tests: typing.List[typing.Tuple[abstractlevel.AbstractLevel, typing.Tuple[int, int]]] = list()
+    for level in levels:
+        accessible = [pos for pos in level.data if level.data[pos].may_access()]
+        for pos in random.sample(accessible, min(NB_TEST_POSITIONS, len(accessible))):
+            tests.append((level, pos))
+
+    # equivalence
+    infinite = constants.DUNGEON_WIDTH + constants.DUNGEON_HEIGHT
+    for symetrical in False, True:
+        LOS_FULLY_SYMETRICAL = symetrical
+        for level, (x_pos, y_pos) in tests:
+            reference = FractionFovEngine(level)
+            for engine_class in FOV_ENGINES.values():
+                engine = engine_class(level)
+                for range_limit in constants.FOV_RADIUS, infinite, None:
+                    assert engine.cast_light(x_pos, y_pos, range_limit) == reference.cast_light(x_pos, y_pos, range_limit), f"{engine_class.__name__} differs on {level.name} at {(x_pos, y_pos)} range={range_limit} symetrical={symetrical}"
+        print(f"symetrical={symetrical} : {len(tests)} positions on {len(levels)} levels, all engines agree")
+
+        # single pass with distances instead of a range limited pass
+        nb_differences = 0
+        for level, (x_pos, y_pos) in tests:
+            for engine_class in FOV_ENGINES.values():
+                engine = engine_class(level)
+                range_limit = constants.FOV_RADIUS
+                limited = engine.cast_light(x_pos, y_pos, range_limit)
+                within = {pos for pos, distance2 in engine.cast_light_distances(x_pos, y_pos).items() if distance2 <= range_limit * range_limit}
+                nb_differences += len(limited ^ within)
+        print(f"symetrical={symetrical} : single pass differs from range limited pass on {nb_differences} places")
+    LOS_FULLY_SYMETRICAL = False
+
+    # benchmark
+    for engine_name, engine_class in FOV_ENGINES.items():
+        engines = {level: engine_class(level) for level in levels}
+        nb_cells = 0
+        t_before = time.perf_counter()
+        for level, (x_pos, y_pos) in tests:
+            for range_limit in constants.FOV_RADIUS, infinite:
+                nb_cells += len(engines[level].cast_light(x_pos, y_pos, range_limit))
+        elapsed = time.perf_counter() - t_before
+        print(f"{engine_name} : {nb_cells} cells in {elapsed:.3f} s -> {nb_cells / elapsed:.0f} cells/s")
+
+
+if __name__ == '__main__':
+    test()
@@ -107,6 +107,7 @@ class CommandEnum(enum.Enum):
     TRANS_LEVEL_TELEPORT = enum.auto()
     MAKE_WISH = enum.auto()
     SHOW_ATTRIBUTES = enum.auto()
+    PERF_OVERLAY = enum.auto()
 
     def is_move_command(self, direction_mode: DirectionModeEnum) -> bool:
         """ Is it a move command corresponding to the mode ? """
@@ -252,6 +253,10 @@ def key2command(key: int) -> typing.Optional[CommandEnum]:
         if constants.DEBUG_MODE:
             return CommandEnum.SHOW_ATTRIBUTES
         return None
+    if key == 15:  # ctrl-O
+        if constants.DEBUG_MODE:
+            return CommandEnum.PERF_OVERLAY
+        return None
 
     return None
 
@@ -409,12 +414,14 @@ class Gui:
                 self._keyboard_help.clear()
                 input_win.clear()
                 input_win.refresh()
+                self._window.touchwin()
                 return False, (0, 0)
 
             if key == 32:  # space
                 self._keyboard_help.clear()
                 input_win.clear()
                 input_win.refresh()
+                self._window.touchwin()
                 return True, (x_pos, y_pos)
 
             command = key2command(key)
@@ -427,29 +434,25 @@ class Gui:
             if command is CommandEnum.MOVE_DOWN:
                 y_pos += 1
                 if y_pos > constants.DUNGEON_HEIGHT - 1:
-                    curses.beep()  # does not work here ???
-                    curses.flash()
+                    mycurses.beep()
                     y_pos = constants.DUNGEON_HEIGHT - 1
 
             if command is CommandEnum.MOVE_UP:
                 y_pos -= 1
                 if y_pos < 0:
-                    curses.beep()  # does not work here ???
-                    curses.flash()
+                    mycurses.beep()
                     y_pos = 0
 
             if command is CommandEnum.MOVE_LEFT:
                 x_pos -= 1
                 if x_pos < 0:
-                    curses.beep()  # does not work here ???
-                    curses.flash()
+                    mycurses.beep()
                     x_pos = 0
 
             if command is CommandEnum.MOVE_RIGHT:
                 x_pos += 1
                 if x_pos > constants.DUNGEON_WIDTH - 1:
-                    curses.beep()  # does not work here ???
-                    curses.flash()
+                    mycurses.beep()
                     x_pos = constants.DUNGEON_WIDTH - 1
 
     def confirm(self, mess: str) -> bool:
@@ -524,29 +527,25 @@ class Gui:
             if command is CommandEnum.MOVE_DOWN:
                 y_pos += 1
                 if y_pos > max(0, nb_lines_present - CONTENT_WINDOW_HEIGHT):
-                    curses.beep()  # does not work here ???
-                    curses.flash()
+                    mycurses.beep()
                     y_pos = max(0, nb_lines_present - CONTENT_WINDOW_HEIGHT)
 
             if command is CommandEnum.MOVE_UP:
                 y_pos -= 1
                 if y_pos < 0:
-                    curses.beep()  # does not work here ???
-                    curses.flash()
+                    mycurses.beep()
                     y_pos = 0
 
             if command is CommandEnum.MOVE_RIGHT:
                 x_pos += 1
                 if x_pos > max(0, nb_cols_present - CONTENT_WINDOW_WIDTH):
-                    curses.beep()  # does not work here ???
-                    curses.flash()
+                    mycurses.beep()
                     x_pos = max(0, nb_cols_present - CONTENT_WINDOW_WIDTH)
 
             if command is CommandEnum.MOVE_LEFT:
                 x_pos -= 1
                 if x_pos < 0:
-                    curses.beep()  # does not work here ???
-                    curses.flash()
+                    mycurses.beep()
                     x_pos = 0
 
         # done
@@ -554,6 +553,9 @@ class Gui:
             self._stdscr.clear()
             self._stdscr.refresh()
 
+        # map only writes what changed : what was hidden must be written again
+        self._window.touchwin()
+
     def select_one(self, information_message: str, position: int, table: typing.Dict[str, typing.Any], clear_after: bool) -> typing.Any:
         """ Selection from user : exactly one possible """
 
@@ -627,8 +629,7 @@ class Gui:
                     loc_curs_pos = nb_lines_used - 1
                     y_pos += 1
                     if y_pos > nb_lines_present - nb_lines_used:
-                        curses.beep()  # does not work here ???
-                        curses.flash()
+                        mycurses.beep()
                         y_pos = nb_lines_present - nb_lines_used
                 curs_pos = y_pos + loc_curs_pos
 
@@ -638,8 +639,7 @@ class Gui:
                     loc_curs_pos = 0
                     y_pos -= 1
                     if y_pos < 0:
-                        curses.beep()  # does not work here ???
-                        curses.flash()
+                        mycurses.beep()
                         y_pos = 0
                 curs_pos = y_pos + loc_curs_pos
 
@@ -653,6 +653,9 @@ class Gui:
             self._stdscr.clear()
             self._stdscr.refresh()
 
+        # map only writes what changed : what was hidden must be written again
+        self._window.touchwin()
+
         return final_sel
 
     def select_some(self, information_message: str, table: typing.Dict[str, typing.Any], clear_after: bool) -> typing.Any:
@@ -745,8 +748,7 @@ class Gui:
                     loc_curs_pos = nb_lines_used - 1
                     y_pos += 1
                     if y_pos > nb_lines_present - nb_lines_used:
-                        curses.beep()  # does not work here ???
-                        curses.flash()
+                        mycurses.beep()
                         y_pos = nb_lines_present - nb_lines_used
                 curs_pos = y_pos + loc_curs_pos
 
@@ -756,8 +758,7 @@ class Gui:
                     loc_curs_pos = 0
                     y_pos -= 1
                     if y_pos < 0:
-                        curses.beep()  # does not work here ???
-                        curses.flash()
+                        mycurses.beep()
                         y_pos = 0
                 curs_pos = y_pos + loc_curs_pos
 
@@ -771,6 +772,9 @@ class Gui:
             self._stdscr.clear()
             self._stdscr.refresh()
 
+        # map only writes what changed : what was hidden must be written again
+        self._window.touchwin()
+
         return final_sel
 
 
@@ -791,16 +795,14 @@ class Messages:
         """ Ctrl-P / Previous messages """
         self._offset += 1
         if self._offset > len(self._table) - self._buffer_size:
-            curses.beep()  # does not work here ???
-            curses.flash()
+            mycurses.beep()
             self._offset = len(self._table) - self._buffer_size
 
     def lower(self) -> None:
         """ Ctrl-N / Next messages """
         self._offset -= 1
         if self._offset < 0:
-            curses.beep()  # does not work here ???
-            curses.flash()
+            mycurses.beep()
             self._offset = 0
 
     def store(self, mess: str) -> None:
@@ -840,6 +842,10 @@ class Messages:
                 return
             self._my_gui.prompt_user_noreturn("-- Press a key for more --")
 
+    def skip_unread(self) -> None:
+        """ Messages are considered read without being displayed (fast forward replay) """
+        self._nb_unread = 0
+
 
 class Status:
     """ Status information of hero """
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+
+"""
+File : headless.py
+
+Headless mode : the whole game runs without a terminal.
+
+Screen is replaced by windows that draw nothing, commands of hero come from a driver (script file or random explorer).
+At the end, speed of simulation and time spent in every subsystem are reported.
+"""
+
+# pylint: disable=global-statement
+
+import typing
+import random
+import time
+import collections
+
+import constants
+import mylogger
+import mycurses
+import gui
+import actions
+import command
+import instrument
+
+# default number of commands of random driver
+NB_RANDOM_COMMANDS = 2000
+
+
+class NullWindow:
+    """ Curses window that draws nothing """
+
+    def addstr(self, *args: typing.Any) -> None:
+        """ addstr """
+
+    def refresh(self) -> None:
+        """ refresh """
+
+    def clear(self) -> None:
+        """ clear """
+
+    def touchwin(self) -> None:
+        """ touchwin """
+
+    def getch(self) -> int:  # pylint: disable=no-self-use
+        """ getch (escape) """
+        return 27
+
+
+class Driver:
+    """ Gives commands of hero (and answers to questions) instead of player """
+
+    def next_command(self, hero: typing.Any) -> gui.CommandEnum:
+        """ next command (quit when none left) """
+        assert False, "Missing next_command for Driver"
+        return gui.CommandEnum.QUIT_GAME
+
+    def select_direction(self, hero: typing.Any, direction_mode: gui.DirectionModeEnum) -> typing.Optional[gui.CommandEnum]:  # pylint: disable=unused-argument,no-self-use
+        """ direction asked for (None to abort) """
+        return None
+
+    def select_one(self, table: typing.Dict[str, typing.Any]) -> typing.Any:  # pylint: disable=unused-argument,no-self-use
+        """ one item from table (None to abort) """
+        return None
+
+    def select_some(self, table: typing.Dict[str, typing.Any]) -> typing.Any:  # pylint: disable=unused-argument,no-self-use
+        """ some items from table (None to abort) """
+        return None
+
+    def select_position(self, hero: typing.Any) -> typing.Optional[typing.Tuple[int, int]]:  # pylint: disable=unused-argument,no-self-use
+        """ position asked for (None to abort) """
+        return None
+
+    def confirm(self) -> bool:  # pylint: disable=no-self-use
+        """ answer to yes/no question """
+        return True
+
+    def input_string(self) -> str:  # pylint: disable=no-self-use
+        """ string asked for """
+        return ""
+
+
+class ScriptDriver(Driver):
+    """
+    Commands read from a file : one command per line, name of gui command and optionally how many times, like "MOVE_LEFT 5"
+    Directions asked for are the next commands. Empty lines and lines starting with # are ignored.
+    """
+
+    def __init__(self, file_name: str) -> None:
+        self._commands: typing.Deque[gui.CommandEnum] = collections.deque([])
+        with open(file_name, encoding='utf-8') as file_ptr:
+            for line in file_ptr:
+                words = line.split()
+                if not words or words[0].startswith('#'):
+                    continue
+                assert words[0] in gui.CommandEnum.__members__, f"Unknown command '{words[0]}' in script {file_name}"
+                nb_times = int(words[1]) if len(words) > 1 else 1
+                self._commands.extend([gui.CommandEnum[words[0]]] * nb_times)
+
+    def next_command(self, hero: typing.Any) -> gui.CommandEnum:
+        """ next command (quit when none left) """
+        if not self._commands:
+            return gui.CommandEnum.QUIT_GAME
+        return self._commands.popleft()
+
+    def select_direction(self, hero: typing.Any, direction_mode: gui.DirectionModeEnum) -> typing.Optional[gui.CommandEnum]:
+        """ direction asked for (None to abort) """
+        if not self._commands or not self._commands[0].is_move_command(direction_mode):
+            return None
+        return self._commands.popleft()
+
+
+class RandomDriver(Driver):
+    """ Explores at random : goes on in same direction while possible, opens doors, searches, goes down stairs """
+
+    def __init__(self, seed_value: int, nb_commands: int) -> None:
+        # own random so that game is the same whatever the driver
+        self._random = random.Random(seed_value)
+        self._nb_commands_left = nb_commands
+        self._direction_command = gui.CommandEnum.MOVE_STAND
+
+    def next_command(self, hero: typing.Any) -> gui.CommandEnum:
+        """ next command (quit when none left) """
+
+        if self._nb_commands_left <= 0:
+            return gui.CommandEnum.QUIT_GAME
+        self._nb_commands_left -= 1
+
+        level = hero.dungeon_level
+        x_pos, y_pos = hero.position
+
+        # go down when possible (most of the time)
+        if level.data[hero.position].may_climb_down() and self._random.randint(0, 3):
+            return gui.CommandEnum.MOVE_CLIMB_DOWN
+
+        # sometimes search or rest
+        choice = self._random.randint(0, 99)
+        if choice < 3:
+            return gui.CommandEnum.SEARCH
+        if choice < 5:
+            return gui.CommandEnum.REST
+
+        # closed door ahead : open it
+        direction_command = self._direction_command
+        if direction_command is not gui.CommandEnum.MOVE_STAND:
+            delta_x, delta_y = actions.DIRECTION_2_DELTA[command.COMMAND_2_DIRECTION[direction_command]]
+            new_pos = (x_pos + delta_x, y_pos + delta_y)
+            if level.data.door_table.get(new_pos[1] * level.level_width + new_pos[0]) is not None and not level.data.may_access(*new_pos):
+                if direction_command.is_move_command(gui.DirectionModeEnum.DIR_ORTHOGONAL):
+                    return gui.CommandEnum.OPEN_DOOR
+
+        # same direction if possible, otherwise any possible one
+        possible_ones = list()
+        for candidate in MOVE_COMMANDS:
+            delta_x, delta_y = actions.DIRECTION_2_DELTA[command.COMMAND_2_DIRECTION[candidate]]
+            if level.data.may_access(x_pos + delta_x, y_pos + delta_y):
+                possible_ones.append(candidate)
+        if not possible_ones:
+            return gui.CommandEnum.REST
+        if direction_command not in possible_ones or not self._random.randint(0, 9):
+            direction_command = self._random.choice(possible_ones)
+        self._direction_command = direction_command
+        return direction_command
+
+    def select_direction(self, hero: typing.Any, direction_mode: gui.DirectionModeEnum) -> typing.Optional[gui.CommandEnum]:
+        """ direction asked for (None to abort) """
+        if self._direction_command.is_move_command(direction_mode):
+            return self._direction_command
+        return self._random.choice([c for c in MOVE_COMMANDS if c.is_move_command(direction_mode)])
+
+    def select_one(self, table: typing.Dict[str, typing.Any]) -> typing.Any:
+        """ one item from table (None to abort) """
+        return self._random.choice(list(table.values()))
+
+    def select_some(self, table: typing.Dict[str, typing.Any]) -> typing.Any:
+        """ some items from table (None to abort) """
+        return set(table.values())
+
+
+# moves on the same level
+MOVE_COMMANDS = [gui.CommandEnum.MOVE_DOWN, gui.CommandEnum.MOVE_UP, gui.CommandEnum.MOVE_LEFT, gui.CommandEnum.MOVE_RIGHT, gui.CommandEnum.MOVE_UPLEFT, gui.CommandEnum.MOVE_UPRIGHT, gui.CommandEnum.MOVE_DOWNLEFT, gui.CommandEnum.MOVE_DOWNRIGHT]
+
+# driver of headless game
+DRIVER: typing.Optional[Driver] = None
+
+
+class HeadlessGui(gui.Gui):
+    """ GUI toolbox with no screen nor keyboard : driver answers """
+
+    def __init__(self, window: typing.Any, stdscr: typing.Any, keyboard_help: gui.KeyboardHelp, hero: typing.Any) -> None:  # pylint: disable=super-init-not-called
+        self._window = window
+        self._stdscr = stdscr
+        self._keyboard_help = keyboard_help
+        self._hero = hero
+        assert DRIVER is not None, "Headless without driver"
+        self._driver = DRIVER
+
+    def get_command(self) -> typing.Optional[gui.CommandEnum]:
+        """ command from driver """
+        return self._driver.next_command(self._hero)
+
+    def prompt_user_noreturn(self, prompt: str) -> str:
+        """ nothing to answer """
+        return ""
+
+    def prompt_user_return(self, prompt: str, answer_len: int) -> str:
+        """ nothing to answer """
+        return ""
+
+    def select_direction(self, direction_mode: gui.DirectionModeEnum, information_message: str) -> typing.Tuple[bool, gui.CommandEnum]:
+        """ direction asked for (None to abort) """
+        direction_command = self._driver.select_direction(self._hero, direction_mode)
+        if direction_command is None:
+            return False, gui.CommandEnum.MOVE_STAND
+        return True, direction_command
+
+    def select_position(self, cursor_shape: str, information_message: str) -> typing.Tuple[bool, typing.Tuple[int, int]]:
+        """ position asked for (aborted if None) """
+        position = self._driver.select_position(self._hero)
+        if position is None:
+            return False, (0, 0)
+        return True, position
+
+    def confirm(self, mess: str) -> bool:
+        """ answer from driver """
+        return self._driver.confirm()
+
+    def input_string(self, prompt: str, answer_len: int) -> str:
+        """ string from driver """
+        return self._driver.input_string()
+
+    def show_content(self, content: typing.List[str], clear_after: bool) -> None:
+        """ nothing to show """
+
+    def select_one(self, information_message: str, position: int, table: typing.Dict[str, typing.Any], clear_after: bool) -> typing.Any:
+        """ one item from table (None to abort) """
+        return self._driver.select_one(table)
+
+    def select_some(self, information_message: str, table: typing.Dict[str, typing.Any], clear_after: bool) -> typing.Any:
+        """ some items from table (None to abort) """
+        return self._driver.select_some(table)
+
+
+# subsystems reported : name, timers of instrumentation
+SUBSYSTEMS: typing.List[typing.Tuple[str, typing.List[str]]] = [
+    ("dungeon generation", ['make_level', 'make_levels', 'take_level']),
+    ("hero commands", ['get_command']),
+    ("light effects", ['do_light_effects']),
+    ("field of view", ['do_update_fov', 'do_update_has_seen']),
+    ("display", ['display']),
+    ("monsters A.I.", ['give_action']),
+    ("actions", ['starts_doing']),
+    ("sequencer", ['tick']),
+    ("scheduling", ['due_actors']),
+]
+
+# when timing started
+T_START = 0.
+
+
+def restart_timing() -> None:
+    """ what was timed so far is forgotten (after fast forward replay for instance) """
+    global T_START
+    assert instrument.INSTRUMENTS is not None, "Timing without instrumentation"
+    instrument.INSTRUMENTS.reset_totals()
+    T_START = time.perf_counter()
+
+
+def report(wall_time: float) -> typing.List[str]:
+    """ speed of simulation and time per subsystem """
+
+    assert instrument.INSTRUMENTS is not None, "Report without instrumentation"
+    totals = instrument.INSTRUMENTS.totals()
+    calls = {n: sum(totals.get(t, (0, 0.))[0] for t in timers) for n, timers in SUBSYSTEMS}
+    times = {n: sum(totals.get(t, (0, 0.))[1] for t in timers) for n, timers in SUBSYSTEMS}
+
+    nb_segments = calls['sequencer']
+    nb_turns = nb_segments / constants.NB_SEGMENTS
+    lines = [
+        f"{wall_time:.2f} s : {nb_turns:.0f} turns ({nb_turns / wall_time:.1f} per s), {nb_segments} segments ({nb_segments / wall_time:.0f} per s), {calls['hero commands']} hero commands",
+    ]
+    for name, _ in SUBSYSTEMS:
+        lines.append(f"  {name:<20} {times[name]:8.3f} s {100 * times[name] / wall_time:5.1f} % {calls[name]:8d} calls")
+    lines.append(f"  {'other':<20} {wall_time - sum(times.values()):8.3f} s")
+    return lines
+
+
+def start(game_loop: typing.Callable[[typing.Any, typing.Any], None], driver: Driver) -> None:
+    """ runs the game loop without terminal then reports """
+
+    global DRIVER
+    DRIVER = driver
+    mycurses.HEADLESS = True
+
+    # subsystems timed by instrumentation (started here if not asked for, nothing written then)
+    if instrument.INSTRUMENTS is None:
+        instrument.start(True, False)
+    assert instrument.INSTRUMENTS is not None, "No instrumentation"
+    instrument.INSTRUMENTS.install("get_command", HeadlessGui, 'get_command')
+
+    restart_timing()
+    game_loop(NullWindow(), NullWindow())
+    wall_time = time.perf_counter() - T_START
+
+    for line in report(wall_time):
+        mylogger.LOGGER.info(line)
+        print(line)
+
+
+if __name__ == '__main__':
+    assert False, "Do not run this script"
@@ -232,8 +232,8 @@ class GenericHero(monsters.Monster, HeroParentClass):
         monsters.Monster.__init__(self, monsters.MonsterTypeEnum.HERO, dungeon_level, position, money_given)
         HeroParentClass.__init__(self)
 
-        # mapping memory
-        self._mapping_memory: typing.Dict[int, typing.Dict[typing.Tuple[int, int], bool]] = dict()
+        # mapping memory (per level, one bit per place seen)
+        self._mapping_memory: typing.Dict[int, int] = dict()
 
         # attributes
         self._hero_name = constants.HERO_NAME
@@ -247,7 +247,7 @@ class GenericHero(monsters.Monster, HeroParentClass):
         """ Store mapping info hero has in his head """
         self._mapping_memory[level.identifier] = the_mapping.has_seen
 
-    def recall_mapping(self, level: abstractlevel.AbstractLevel) -> typing.Dict[typing.Tuple[int, int], bool]:
+    def recall_mapping(self, level: abstractlevel.AbstractLevel) -> int:
         """ The hero changes level, note what he know the level he is leaving """
         return self._mapping_memory[level.identifier]
 
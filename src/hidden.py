@@ -19,10 +19,18 @@ class Secret:
     def __init__(self, position: typing.Tuple[int, int], secret: bool) -> None:
         self._position = position
         self._secret = secret
+        # level grid the feature is in (must be told about changes)
+        self._watcher: typing.Any = None
+
+    def _changed(self) -> None:
+        """ tell the level grid """
+        if self._watcher is not None:
+            self._watcher.secret_changed(self)
 
     def reveal_secret(self) -> None:
         """ Tile modifier - door is revealed """
         self._secret = False
+        self._changed()
 
     @property
     def position(self) -> typing.Tuple[int, int]:
@@ -34,6 +42,16 @@ class Secret:
         """ property """
         return self._secret
 
+    @property
+    def watcher(self) -> typing.Any:
+        """ property """
+        return self._watcher
+
+    @watcher.setter
+    def watcher(self, watcher: typing.Any) -> None:
+        """ setter """
+        self._watcher = watcher
+
 
 class Corridor(display.Displayable, Secret):
     """ A corridor object """
@@ -137,6 +155,7 @@ class Door(display.Displayable, Secret):
         if self._status is not DoorStatusEnum.CLOSED:
             return False
         self._status = DoorStatusEnum.OPENED
+        self._changed()
         return True
 
     def close_door(self) -> bool:
@@ -144,6 +163,7 @@ class Door(display.Displayable, Secret):
         if self._status is not DoorStatusEnum.OPENED:
             return False
         self._status = DoorStatusEnum.CLOSED
+        self._changed()
         return True
 
     def kick_door(self) -> bool:
@@ -151,6 +171,7 @@ class Door(display.Displayable, Secret):
         if self._status not in [DoorStatusEnum.CLOSED, DoorStatusEnum.LOCKED]:
             return False
         self._status = DoorStatusEnum.DESTROYED
+        self._changed()
         return True
 
     def may_access(self) -> bool:
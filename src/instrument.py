@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+
+"""
+File : instrument.py
+
+Instrumentation of the hot paths : named timers (time spent and number of calls) and named counters.
+
+Nothing is wrapped unless instrumentation is started, so it costs nothing when off.
+This is the only registry : headless mode builds its report per subsystem from it.
+When on (and written), aggregates of every turn are written, one json line each, next to the log file :
+  {"turn": 12, "timers": {"tick": [12, 0.0004], ...}, "counters": {"active monsters": 3, ...}}
+Gauges (hits of caches...) only go up : what they went up by in the turn is among counters.
+"""
+
+# pylint: disable=global-statement
+
+import typing
+import os
+import time
+import json
+import functools
+import collections
+
+import constants
+import mylogger
+import mapping
+import sequencer
+import monsters_ai
+import monsters_ai_tools
+import dungeon
+
+# methods timed : name of timer, class, method
+TIMED: typing.List[typing.Tuple[str, typing.Any, str]] = [
+    ("tick", sequencer.Sequencer, 'tick'),
+    ("due_actors", sequencer.Sequencer, 'due_actors'),
+    ("starts_doing", sequencer.Sequencer, 'starts_doing'),
+    ("give_action", monsters_ai.MonstersAI, 'give_action'),
+    ("do_update_fov", mapping.Mapping, 'do_update_fov'),
+    ("do_update_has_seen", mapping.Mapping, 'do_update_has_seen'),
+    ("do_light_effects", mapping.Mapping, 'do_light_effects'),
+    ("display", mapping.Mapping, 'display'),
+    ("path_towards", monsters_ai_tools.MonstersAITools, 'path_towards'),
+    ("can_see", monsters_ai_tools.MonstersAITools, 'can_see'),
+    ("make_level", dungeon.Dungeon, 'make_level'),
+    ("make_levels", dungeon.Dungeon, 'make_levels'),
+    ("take_level", dungeon.Prefetcher, 'take'),
+]
+
+
+class Instruments:
+    """ Registry of timers and counters """
+
+    def __init__(self, file_name: typing.Optional[str], gauges: typing.Dict[str, typing.Callable[[], int]]) -> None:
+
+        # gauges watched (more may be added later) and their values when last turn was over
+        self._gauges = gauges
+        self._gauge_values: typing.Dict[str, int] = dict()
+
+        # current turn : per timer number of calls and time spent, per counter value
+        self._calls: typing.Dict[str, int] = collections.defaultdict(int)
+        self._times: typing.Dict[str, float] = collections.defaultdict(float)
+        self._counters: typing.Dict[str, int] = collections.defaultdict(int)
+
+        # whole game
+        self._total_calls: typing.Dict[str, int] = collections.defaultdict(int)
+        self._total_times: typing.Dict[str, float] = collections.defaultdict(float)
+
+        # aggregates of last turn over
+        self._last_turn: typing.Dict[str, typing.Any] = {'turn': 0, 'timers': {}, 'counters': {}}
+
+        self._turn = 0
+        self._file_ptr = open(file_name, 'w', encoding='utf-8') if file_name is not None else None  # pylint: disable=consider-using-with
+
+    def timed(self, name: str, method: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+        """ method that adds time it takes to its timer """
+
+        calls = self._calls
+        times = self._times
+
+        @functools.wraps(method)
+        def timed_method(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            t_before = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times[name] += time.perf_counter() - t_before
+                calls[name] += 1
+
+        return timed_method
+
+    def install(self, name: str, class_timed: typing.Any, method_name: str) -> None:
+        """ method of class is timed from now on (static ones stay static) """
+        method = class_timed.__dict__[method_name]
+        if isinstance(method, staticmethod):
+            setattr(class_timed, method_name, staticmethod(self.timed(name, method.__func__)))
+        else:
+            setattr(class_timed, method_name, self.timed(name, method))
+
+    def count(self, name: str, value: int = 1) -> None:
+        """ adds to a counter """
+        self._counters[name] += value
+
+    def turn_over(self, turn: int) -> None:
+        """ writes aggregates of turn if a new turn started """
+
+        if turn == self._turn:
+            return
+
+        for name, gauge in self._gauges.items():
+            value = gauge()
+            self._counters[name] += value - self._gauge_values.get(name, value)
+            self._gauge_values[name] = value
+
+        self._last_turn = {
+            'turn': self._turn,
+            'timers': {n: [self._calls[n], round(self._times[n], 6)] for n in self._calls},
+            'counters': dict(self._counters),
+        }
+        if self._file_ptr is not None:
+            self._file_ptr.write(json.dumps(self._last_turn, separators=(',', ':')) + '\n')
+
+        for name, nb_calls in self._calls.items():
+            self._total_calls[name] += nb_calls
+            self._total_times[name] += self._times[name]
+        self._calls.clear()
+        self._times.clear()
+        self._counters.clear()
+        self._turn = turn
+
+    def totals(self) -> typing.Dict[str, typing.Tuple[int, float]]:
+        """ per timer number of calls and time spent since start (or reset) """
+        return {n: (self._total_calls[n] + self._calls[n], self._total_times[n] + self._times[n]) for n in set(self._total_calls) | set(self._calls)}
+
+    def reset_totals(self) -> None:
+        """ what was timed so far is forgotten (after fast forward replay for instance) """
+        self._total_calls.clear()
+        self._total_times.clear()
+        self._calls.clear()
+        self._times.clear()
+
+    def stop(self) -> None:
+        """ writes what is left and totals in log file """
+        self.turn_over(self._turn + 1)
+        if self._file_ptr is not None:
+            self._file_ptr.close()
+        for name, nb_calls in sorted(self._total_calls.items(), key=lambda t: -self._total_times[t[0]]):
+            mylogger.LOGGER.info("instrument %s : %d calls %f seconds", name, nb_calls, self._total_times[name])
+
+    @property
+    def last_turn(self) -> typing.Dict[str, typing.Any]:
+        """ property """
+        return self._last_turn
+
+
+# registry (None when instrumentation is off)
+INSTRUMENTS: typing.Optional[Instruments] = None
+
+# gauges : name, value so far
+GAUGES: typing.Dict[str, typing.Callable[[], int]] = {
+    "fov hits": lambda: mapping.fov_cache().hits,
+    "fov misses": lambda: mapping.fov_cache().misses,
+}
+
+# performance overlay shown (debug)
+OVERLAY = False
+
+
+def start(simpler: bool, written: bool = True) -> None:
+    """ Function to be called once to start instrumentation (file named like the log file, if written) """
+    global INSTRUMENTS
+    assert INSTRUMENTS is None, "Instrumentation started twice"
+    if not written:
+        file_name = None
+    elif simpler:
+        file_name = "./log/pnethack.perf.jsonl"
+    else:
+        file_name = f"./log/pnethack-{os.getpid()}.perf.jsonl"
+    INSTRUMENTS = Instruments(file_name, GAUGES)
+    for name, class_timed, method_name in TIMED:
+        INSTRUMENTS.install(name, class_timed, method_name)
+    mylogger.LOGGER.info("Instrumentation in %s", file_name if file_name is not None else "memory only")
+
+
+def watch_paths(tools: monsters_ai_tools.MonstersAITools) -> None:
+    """ Paths of monsters (found again, repaired, planned again) are watched """
+    GAUGES["path hits"] = lambda: tools.nb_path_hits
+    GAUGES["path repairs"] = lambda: tools.nb_path_repairs
+    GAUGES["path replans"] = lambda: tools.nb_path_replans
+
+
+def toggle_overlay() -> None:
+    """ Shows or hides performance overlay (instrumentation started if needed, nothing written then) """
+    global OVERLAY
+    OVERLAY = not OVERLAY
+    if OVERLAY and INSTRUMENTS is None:
+        start(False, False)
+
+
+def overlay_line(the_sequencer: sequencer.Sequencer) -> str:
+    """ Times of last turn (in ms), actors simulated and cache hit rates of last turn, in one line of status """
+
+    def _ms(name: str, per_call: bool) -> str:
+        """ time of a timer in last turn """
+        nb_calls, seconds = timers.get(name, (0, 0.))
+        if per_call:
+            seconds = seconds / nb_calls if nb_calls else 0.
+        return f"{1000 * seconds:.1f}"
+
+    def _percent(nb_hits: int, nb_all: int) -> str:
+        """ hit rate """
+        return f"{100 * nb_hits // nb_all}%" if nb_all else "-"
+
+    assert INSTRUMENTS is not None, "Overlay without instrumentation"
+    timers = INSTRUMENTS.last_turn['timers']
+    counters = INSTRUMENTS.last_turn['counters']
+    nb_ai_calls = timers.get('give_action', (0, 0.))[0]
+    nb_fov_hits = counters.get('fov hits', 0)
+    nb_path_hits = counters.get('path hits', 0)
+    nb_paths = nb_path_hits + counters.get('path repairs', 0) + counters.get('path replans', 0)
+    line = f"fov {_ms('do_update_fov', False)} draw {_ms('display', False)} ai {_ms('give_action', True)}x{nb_ai_calls} tick {_ms('tick', False)} ms, {the_sequencer.nb_actors} actors, hits fov {_percent(nb_fov_hits, nb_fov_hits + counters.get('fov misses', 0))} path {_percent(nb_path_hits, nb_paths)}"
+    # status lines must fit
+    return line[:constants.DUNGEON_WIDTH - 1]
+
+
+def stop() -> None:
+    """ Function to be called once at end """
+    if INSTRUMENTS is not None:
+        INSTRUMENTS.stop()
+
+
+if __name__ == '__main__':
+    assert False, "Do not run this script"
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+
+"""
+File : journal.py
+
+Journal of a game : what the player said (commands and answers to questions), one json line each, next to the log file.
+
+First line is what the game was started with (seed and options), so seed and journal are enough to play the game again.
+Replaying goes as fast as possible (nothing displayed) up to a turn, then player (or headless driver) takes over.
+Entries are :
+  {"c": name} command
+  {"d": name} direction (null if aborted)
+  {"p": [x, y]} position (null if aborted)
+  {"y": bool} confirmation
+  {"s": str} string typed
+  {"o": key} key of one selected (null if aborted)
+  {"m": [keys]} keys of some selected (null if aborted)
+"""
+
+# pylint: disable=global-statement
+
+import typing
+import os
+import json
+import collections
+
+import mylogger
+import mycurses
+import gui
+import headless
+
+# change it when format changes
+VERSION = 1
+
+
+class Journal:
+    """ Journal being written """
+
+    def __init__(self, file_name: str, header: typing.Dict[str, typing.Any]) -> None:
+        # flushed every line : journal of a crashed game is complete
+        self._file_ptr = open(file_name, 'w', encoding='utf-8', buffering=1)  # pylint: disable=consider-using-with
+        self.write(dict(header, version=VERSION))
+
+    def write(self, entry: typing.Dict[str, typing.Any]) -> None:
+        """ adds an entry """
+        self._file_ptr.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def record(self, the_gui: gui.Gui) -> None:
+        """ answers from now on given by gui are written """
+
+        def recorded_get_command() -> typing.Optional[gui.CommandEnum]:
+            command = get_command()
+            if command is not None:
+                self.write({'c': command.name})
+            return command
+
+        def recorded_select_direction(direction_mode: gui.DirectionModeEnum, information_message: str) -> typing.Tuple[bool, gui.CommandEnum]:
+            status, direction_command = select_direction(direction_mode, information_message)
+            self.write({'d': direction_command.name if status else None})
+            return status, direction_command
+
+        def recorded_select_position(cursor_shape: str, information_message: str) -> typing.Tuple[bool, typing.Tuple[int, int]]:
+            status, position = select_position(cursor_shape, information_message)
+            self.write({'p': list(position) if status else None})
+            return status, position
+
+        def recorded_confirm(mess: str) -> bool:
+            answer = confirm(mess)
+            self.write({'y': answer})
+            return answer
+
+        def recorded_input_string(prompt: str, answer_len: int) -> str:
+            answer = input_string(prompt, answer_len)
+            self.write({'s': answer})
+            return answer
+
+        def recorded_select_one(information_message: str, position: int, table: typing.Dict[str, typing.Any], clear_after: bool) -> typing.Any:
+            selected = select_one(information_message, position, table, clear_after)
+            keys = [k for k, v in table.items() if v is selected]
+            self.write({'o': keys[0] if selected is not None and keys else None})
+            return selected
+
+        def recorded_select_some(information_message: str, table: typing.Dict[str, typing.Any], clear_after: bool) -> typing.Any:
+            selected = select_some(information_message, table, clear_after)
+            self.write({'m': sorted(k for k, v in table.items() if v in selected) if selected is not None else None})
+            return selected
+
+        get_command = the_gui.get_command
+        select_direction = the_gui.select_direction
+        select_position = the_gui.select_position
+        confirm = the_gui.confirm
+        input_string = the_gui.input_string
+        select_one = the_gui.select_one
+        select_some = the_gui.select_some
+
+        the_gui.get_command = recorded_get_command  # type: ignore
+        the_gui.select_direction = recorded_select_direction  # type: ignore
+        the_gui.select_position = recorded_select_position  # type: ignore
+        the_gui.confirm = recorded_confirm  # type: ignore
+        the_gui.input_string = recorded_input_string  # type: ignore
+        the_gui.select_one = recorded_select_one  # type: ignore
+        the_gui.select_some = recorded_select_some  # type: ignore
+
+
+class ReplayDriver(headless.Driver):
+    """ Answers read from a journal """
+
+    def __init__(self, file_name: str, until: typing.Optional[int]) -> None:
+        with open(file_name, encoding='utf-8') as file_ptr:
+            lines = [json.loads(line) for line in file_ptr if line.strip()]
+        assert lines, f"Empty journal {file_name}"
+        self._header = lines[0]
+        assert self._header.get('version') == VERSION, f"Journal {file_name} is of another version"
+        self._entries: typing.Deque[typing.Tuple[str, typing.Any]] = collections.deque([next(iter(e.items())) for e in lines[1:]])
+        self._until = until
+        self._replaying = True
+
+    def _next(self, kind: str) -> typing.Any:
+        """ value of next entry that must be of that kind """
+        entry_kind, value = self._entries.popleft()
+        assert entry_kind == kind, f"Journal out of step : expected '{kind}' got '{entry_kind}'"
+        return value
+
+    def goes_on(self, turn: int) -> bool:
+        """ replay goes on at this turn (journal not exhausted and turn to stop at not reached) """
+        if self._replaying and (not self._entries or (self._until is not None and turn >= self._until)):
+            self._replaying = False
+            mylogger.LOGGER.info("replay over at turn %d (%d entries left)", turn, len(self._entries))
+            # profiling starts here
+            if mycurses.HEADLESS:
+                headless.restart_timing()
+        return self._replaying
+
+    def next_command(self, hero: typing.Any) -> gui.CommandEnum:
+        """ next command (quit when none left) """
+        if not self._entries:
+            return gui.CommandEnum.QUIT_GAME
+        return gui.CommandEnum[self._next('c')]
+
+    def select_direction(self, hero: typing.Any, direction_mode: gui.DirectionModeEnum) -> typing.Optional[gui.CommandEnum]:
+        """ direction asked for (None to abort) """
+        if not self._entries:
+            return None
+        name = self._next('d')
+        return gui.CommandEnum[name] if name is not None else None
+
+    def select_position(self, hero: typing.Any) -> typing.Optional[typing.Tuple[int, int]]:
+        """ position asked for (None to abort) """
+        if not self._entries:
+            return None
+        position = self._next('p')
+        return tuple(position) if position is not None else None  # type: ignore
+
+    def confirm(self) -> bool:
+        """ answer to yes/no question """
+        if not self._entries:
+            return True
+        return self._next('y')  # type: ignore
+
+    def input_string(self) -> str:
+        """ string asked for """
+        if not self._entries:
+            return ""
+        return self._next('s')  # type: ignore
+
+    def select_one(self, table: typing.Dict[str, typing.Any]) -> typing.Any:
+        """ one item from table (None to abort) """
+        if not self._entries:
+            return None
+        key = self._next('o')
+        return table[key] if key is not None else None
+
+    def select_some(self, table: typing.Dict[str, typing.Any]) -> typing.Any:
+        """ some items from table (None to abort) """
+        if not self._entries:
+            return None
+        keys = self._next('m')
+        return {table[k] for k in keys} if keys is not None else None
+
+    @property
+    def header(self) -> typing.Dict[str, typing.Any]:
+        """ property """
+        return self._header
+
+    @property
+    def replaying(self) -> bool:
+        """ property """
+        return self._replaying and bool(self._entries)
+
+
+class ReplayGui(gui.Gui):
+    """ GUI toolbox : answers from journal while replaying, from player afterwards """
+
+    def __init__(self, window: typing.Any, stdscr: typing.Any, keyboard_help: gui.KeyboardHelp, hero: typing.Any, driver: ReplayDriver) -> None:
+        gui.Gui.__init__(self, window, stdscr, keyboard_help, hero)
+        self._driver = driver
+
+    def get_command(self) -> typing.Optional[gui.CommandEnum]:
+        """ command from journal or player """
+        if self._driver.replaying:
+            return self._driver.next_command(self._hero)
+        return gui.Gui.get_command(self)
+
+    def select_direction(self, direction_mode: gui.DirectionModeEnum, information_message: str) -> typing.Tuple[bool, gui.CommandEnum]:
+        """ direction from journal or player """
+        if self._driver.replaying:
+            direction_command = self._driver.select_direction(self._hero, direction_mode)
+            if direction_command is None:
+                return False, gui.CommandEnum.MOVE_STAND
+            return True, direction_command
+        return gui.Gui.select_direction(self, direction_mode, information_message)
+
+    def select_position(self, cursor_shape: str, information_message: str) -> typing.Tuple[bool, typing.Tuple[int, int]]:
+        """ position from journal or player """
+        if self._driver.replaying:
+            position = self._driver.select_position(self._hero)
+            if position is None:
+                return False, (0, 0)
+            return True, position
+        return gui.Gui.select_position(self, cursor_shape, information_message)
+
+    def confirm(self, mess: str) -> bool:
+        """ confirmation from journal or player """
+        if self._driver.replaying:
+            return self._driver.confirm()
+        return gui.Gui.confirm(self, mess)
+
+    def input_string(self, prompt: str, answer_len: int) -> str:
+        """ string from journal or player """
+        if self._driver.replaying:
+            return self._driver.input_string()
+        return gui.Gui.input_string(self, prompt, answer_len)
+
+    def show_content(self, content: typing.List[str], clear_after: bool) -> None:
+        """ nothing shown while replaying """
+        if self._driver.replaying:
+            return
+        gui.Gui.show_content(self, content, clear_after)
+
+    def select_one(self, information_message: str, position: int, table: typing.Dict[str, typing.Any], clear_after: bool) -> typing.Any:
+        """ selection from journal or player """
+        if self._driver.replaying:
+            return self._driver.select_one(table)
+        return gui.Gui.select_one(self, information_message, position, table, clear_after)
+
+    def select_some(self, information_message: str, table: typing.Dict[str, typing.Any], clear_after: bool) -> typing.Any:
+        """ selection from journal or player """
+        if self._driver.replaying:
+            return self._driver.select_some(table)
+        return gui.Gui.select_some(self, information_message, table, clear_after)
+
+
+# journal being written and journal being replayed
+JOURNAL: typing.Optional[Journal] = None
+REPLAY: typing.Optional[ReplayDriver] = None
+
+
+def start_journal(simpler: bool, header: typing.Dict[str, typing.Any]) -> None:
+    """ Function to be called once to start the journal (named like the log file) """
+    global JOURNAL
+    if simpler:
+        file_name = "./log/pnethack.journal"
+    else:
+        file_name = f"./log/pnethack-{os.getpid()}.journal"
+    JOURNAL = Journal(file_name, header)
+    mylogger.LOGGER.info("Journal in %s", file_name)
+
+
+def start_replay(file_name: str, until: typing.Optional[int]) -> ReplayDriver:
+    """ Function to be called once to replay a journal (before starting a new one) """
+    global REPLAY
+    REPLAY = ReplayDriver(file_name, until)
+    mylogger.LOGGER.info("Replaying journal %s", file_name)
+    return REPLAY
+
+
+if __name__ == '__main__':
+    assert False, "Do not run this script"
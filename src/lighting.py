@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+
+"""
+File : lighting.py
+
+Light map of a level : what light sources make lit or dark.
+
+Light sources do not move so it is calculated once when level is made.
+Then only sources whose cone contains a place that changed opacity (door opened, boulder pushed...) are calculated again.
+"""
+
+import typing
+import random
+import time
+
+import constants
+import mylogger
+import myrandom
+import places
+import heavyrocks
+import fov
+import abstractlevel
+import mappedlevel
+import roomlevel
+import cavelevel
+
+NB_TEST_CHANGES = 200
+
+
+class LightMap:
+    """ Light map of a level, shared by all mappings of the level """
+
+    def __init__(self, level: abstractlevel.AbstractLevel) -> None:
+
+        self._level = level
+        self._width = level.level_width
+        self._fov_engine = fov.make_engine(level)
+
+        # light level per place (index is y * width + x)
+        self._light_levels = [places.LightLevelEnum.NORMAL] * (level.level_width * level.level_height)
+
+        # per light source (same order as in level) : places it lights and places where an opacity change may change that (cone)
+        self._source_lit: typing.List[typing.Set[typing.Tuple[int, int]]] = list()
+        self._source_cones: typing.List[typing.Set[int]] = list()
+        for num, _ in enumerate(level.level_light_sources):
+            self._source_lit.append(set())
+            self._source_cones.append(set())
+            self._cast_source(num)
+
+        # sources to calculate again
+        self._dirty_sources: typing.Set[int] = set()
+
+        self._compose()
+
+        # number of times a source was calculated again
+        self._nb_recasts = 0
+
+    def _cast_source(self, num: int) -> None:
+        """ calculates places lit by a source and its cone """
+
+        light_source = self._level.level_light_sources[num]
+        x_pos, y_pos = light_source.level_pos
+        result = self._fov_engine.cast_light(x_pos, y_pos, light_source.light_radius)
+        # the light source is seen, too
+        result.add(light_source.level_pos)
+        self._source_lit[num] = result
+
+        # cone : places lit and their neighbours (algorithm looks at neighbours of places it sees)
+        cone: typing.Set[int] = set()
+        for (x_lit, y_lit) in result:
+            for delta_x in [-1, 0, 1]:
+                for delta_y in [-1, 0, 1]:
+                    x_cone, y_cone = x_lit + delta_x, y_lit + delta_y
+                    if 0 <= x_cone < self._level.level_width and 0 <= y_cone < self._level.level_height:
+                        cone.add(y_cone * self._width + x_cone)
+        self._source_cones[num] = cone
+
+    def _compose(self) -> None:
+        """ light levels from all sources, in order of level sources (last one wins) """
+        for index in range(len(self._light_levels)):
+            self._light_levels[index] = places.LightLevelEnum.NORMAL
+        for num, light_source in enumerate(self._level.level_light_sources):
+            for (x_pos, y_pos) in self._source_lit[num]:
+                if 0 <= x_pos < self._level.level_width and 0 <= y_pos < self._level.level_height:
+                    self._light_levels[y_pos * self._width + x_pos] = light_source.light_level
+
+    def opacity_changed(self, index: int) -> None:
+        """ called by level grid """
+        for num, cone in enumerate(self._source_cones):
+            if index in cone:
+                self._dirty_sources.add(num)
+
+    def update(self) -> None:
+        """ calculates again sources that need it """
+        if not self._dirty_sources:
+            return
+        for num in sorted(self._dirty_sources):
+            self._cast_source(num)
+            self._nb_recasts += 1
+        self._dirty_sources.clear()
+        self._compose()
+
+    def light_level(self, x_pos: int, y_pos: int) -> places.LightLevelEnum:
+        """ light level at position (normal outside level) """
+        if x_pos < 0 or y_pos < 0 or x_pos >= self._level.level_width or y_pos >= self._level.level_height:
+            return places.LightLevelEnum.NORMAL
+        return self._light_levels[y_pos * self._width + x_pos]
+
+    @property
+    def nb_recasts(self) -> int:
+        """ property """
+        return self._nb_recasts
+
+
+def light_map(level: abstractlevel.AbstractLevel) -> LightMap:
+    """ Light map of a level, made the first time it is needed """
+    if level.light_map is None:
+        new_light_map = LightMap(level)
+        level.data.add_opacity_listener(new_light_map.opacity_changed)
+        level.light_map = new_light_map
+    return level.light_map  # type: ignore
+
+
+def test() -> None:
+    """ Incremental light map must be the same as a light map made from scratch after changes of opacity """
+
+    mylogger.start_logger(True)
+    constants.load_config()
+    myrandom.start_random()
+
+    levels: typing.List[abstractlevel.AbstractLevel] = list()
+    for level_class in roomlevel.RoomLevel, cavelevel.CaveLevel:
+        for num in range(5):
+            generated_level = level_class(f"dummy {level_class.__name__} {num}", 1, "X", None)
+            generated_level.convert_to_places()
+            levels.append(generated_level)
+    mapped_level = mappedlevel.MappedLevel("BIG_ROOM", 1, "X", None)
+    mapped_level.convert_to_places()
+    levels.append(mapped_level)
+
+    nb_changes = 0
+    nb_recasts = 0
+    nb_casts = 0
+    t_incremental = 0.
+    for level in levels:
+        incremental = light_map(level)
+        doors = list(level.data.door_table.values())
+        boulder = heavyrocks.Boulder(level, (0, 0))
+        for _ in range(NB_TEST_CHANGES):
+
+            # open/close/kick some door or put/remove an occupant that blocks vision
+            if doors and random.choice([True, False]):
+                door = random.choice(doors)
+                random.choice([door.open_door, door.close_door, door.kick_door, door.reveal_secret])()
+            else:
+                pos = random.choice(list(level.data))
+                place = level.data[pos]
+                place.occupant = None if place.occupant else boulder
+            nb_changes += 1
+
+            t_before = time.perf_counter()
+            incremental.update()
+            t_incremental += time.perf_counter() - t_before
+
+            from_scratch = LightMap(level)
+            nb_casts += len(level.level_light_sources)
+            for pos in level.data:
+                assert incremental.light_level(*pos) == from_scratch.light_level(*pos), f"Light map differs on {level.name} at {pos}"
+        nb_recasts += incremental.nb_recasts
+
+    print(f"{nb_changes} changes on {len(levels)} levels : light maps always agree")
+    print(f"{nb_recasts} sources calculated again instead of {nb_casts} ({t_incremental:.3f} s for all updates)")
+
+
+if __name__ == '__main__':
+    test()
@@ -36,7 +36,7 @@ class Layer:
 class MappedLevel(abstractlevel.AbstractLevel):
     """ A mapped level object """
 
-    def __init__(self, level_name: str, depth: int, branch: str, already_special_rooms: typing.Set[abstractlevel.SpecialRoomEnum], nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False) -> None:  # pylint: disable=unused-argument
+    def __init__(self, level_name: str, depth: int, branch: str, planned_special_room: typing.Optional[abstractlevel.SpecialRoomEnum], nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False, identifier: typing.Optional[int] = None) -> None:  # pylint: disable=unused-argument
 
         def read_level(loaded_content: typing.Dict[str, typing.Any]) -> None:
             """ reads a level from json file """
@@ -329,7 +329,7 @@ class MappedLevel(abstractlevel.AbstractLevel):
 
         #  start of init here
 
-        abstractlevel.AbstractLevel.__init__(self, level_name, depth, branch, nb_down_stairs, nb_up_stairs, entry_level)
+        abstractlevel.AbstractLevel.__init__(self, level_name, depth, branch, nb_down_stairs, nb_up_stairs, entry_level, identifier)
 
         self._layers: typing.Dict[int, Layer] = dict()
         for ind_layer in range(NB_LAYERS + 1):
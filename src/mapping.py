@@ -6,25 +6,86 @@ File : mapping.py
 
 In charge of displaying to screen what is seen of a dungeon level.
 
-The algorithm used is "recursive shadowcasting FOV" from Bjorn Bergstrom.
-source : roguebasin
-It is not symetric and has the best indoor performances.
+The field of view is calculated by one of the engines of fov.py (Adam Milazzo's algorithm).
+Fields of view are remembered (same level, same origin, same opacity : same result).
 """
 
 import typing
+import collections
 import curses
 import random
-import fractions
-import math
-import sys
 
 import constants
 import mycurses
+import fov
+import lighting
 import places
 import alignment
 import abstractlevel
 
-LOS_FULLY_SYMETRICAL = False
+
+class FovCache:
+    """ Last fields of view calculated, shared by the mappings and the monsters (least recently used ones are forgotten) """
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        # key is level identifier, origin, radius, opacity version of level
+        self._fields: typing.OrderedDict[typing.Tuple[int, typing.Tuple[int, int], typing.Optional[int], int], typing.Dict[typing.Tuple[int, int], int]] = collections.OrderedDict()
+        # one engine per level
+        self._fov_engines: typing.Dict[int, fov.FovEngine] = dict()
+        self._hits = 0
+        self._misses = 0
+
+    def field_of_view(self, level: abstractlevel.AbstractLevel, origin: typing.Tuple[int, int], radius: typing.Optional[int]) -> typing.Dict[typing.Tuple[int, int], int]:
+        """
+        Positions seen from origin within radius (None for no limit) with their square distance to origin
+        Result is shared : do not modify it
+        """
+
+        key = (level.identifier, origin, radius, level.opacity_version)
+        field = self._fields.get(key)
+        if field is not None:
+            self._hits += 1
+            self._fields.move_to_end(key)
+            return field
+        self._misses += 1
+
+        if radius is None:
+            if level.identifier not in self._fov_engines:
+                self._fov_engines[level.identifier] = fov.make_engine(level)
+            x_origin, y_origin = origin
+            field = self._fov_engines[level.identifier].cast_light_distances(x_origin, y_origin)
+        else:
+            # seen within radius is seen with no limit at square distance within square radius (see fov.py)
+            radius2 = radius * radius
+            field = {pos: distance2 for pos, distance2 in self.field_of_view(level, origin, None).items() if distance2 <= radius2}
+
+        self._fields[key] = field
+        while len(self._fields) > self._size:
+            self._fields.popitem(last=False)
+        return field
+
+    @property
+    def hits(self) -> int:
+        """ property """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """ property """
+        return self._misses
+
+
+# created when first needed (size is in ini file)
+FOV_CACHE: typing.Optional[FovCache] = None
+
+
+def fov_cache() -> FovCache:
+    """ The cache of fields of view shared by everyone """
+    global FOV_CACHE
+    if FOV_CACHE is None:
+        FOV_CACHE = FovCache(constants.FOV_CACHE_SIZE)
+    return FOV_CACHE
 
 
 class Mapping:
@@ -34,229 +95,68 @@ class Mapping:
 
         self._level = level
 
-        # says if place is currently seen
-        self._sees: typing.Dict[typing.Tuple[int, int], bool] = dict()
+        # opacity bitmap of level (kept up to date by level)
+        self._opacity = level.opacity
 
-        # says if place is currently remembered (has been seen once)
-        self._has_seen: typing.Dict[typing.Tuple[int, int], bool] = dict()
+        # says if place is currently seen (one bit per place, bit number is y * width + x)
+        self._sees = 0
 
-        # says if place is currently lit
-        self._lit: typing.Dict[typing.Tuple[int, int], places.LightLevelEnum] = dict()
+        # says if place is currently remembered (has been seen once) (same)
+        self._has_seen = 0
+
+        # all bits of places (for debug)
+        self._all_places = (1 << (level.level_width * level.level_height)) - 1
+
+        # says if place is currently lit (shared by all mappings of level)
+        self._light_map = lighting.light_map(level)
 
         # will be updated later
         self._hero_pos: typing.Optional[typing.Tuple[int, int]] = None
         self._hero_prev_pos: typing.Optional[typing.Tuple[int, int]] = None
         self._knows_all = False  # for debug
-        for x_pos in range(self._level.level_width):
-            for y_pos in range(self._level.level_height):
-                self._sees[(x_pos, y_pos)] = False
-                self._has_seen[(x_pos, y_pos)] = False
+
+        # what was drawn at previous frame per place (index is y * width + x), nothing yet
+        self._drawn_glyphs: typing.List[typing.Optional[str]] = [None] * (level.level_width * level.level_height)
+        self._drawn_attrs: typing.List[typing.Optional[int]] = [None] * (level.level_width * level.level_height)
+
+        # the four attributes of display (hero, seen, has seen, unknown)
+        self._attrs: typing.Optional[typing.Tuple[int, int, int, int]] = None
+
+        # places and curses writes of last display
+        self._cells_written = 0
+        self._runs_written = 0
 
     def _blocks_vision(self, x_pos: int, y_pos: int) -> bool:
         if x_pos < 0 or y_pos < 0 or x_pos >= self._level.level_width or y_pos >= self._level.level_height:
             return True
-        return self._level.data[(x_pos, y_pos)].blocks_vision()
+        return self._opacity[y_pos * self._level.level_width + x_pos] == 1
 
     def _lit_now(self, x_pos: int, y_pos: int) -> places.LightLevelEnum:
-        if x_pos < 0 or y_pos < 0 or x_pos >= self._level.level_width or y_pos >= self._level.level_height:
-            return places.LightLevelEnum.NORMAL
-        return self._lit[(x_pos, y_pos)]
-
-    def _sees_now(self, x_pos: int, y_pos: int) -> bool:
-        return self._sees[(x_pos, y_pos)]
-
-    def _reinit_light(self) -> None:
-        for x_pos in range(self._level.level_width):
-            for y_pos in range(self._level.level_height):
-                self._lit[(x_pos, y_pos)] = places.LightLevelEnum.NORMAL
+        return self._light_map.light_level(x_pos, y_pos)
 
     def _reinit_sees(self) -> None:
-        for x_pos in range(self._level.level_width):
-            for y_pos in range(self._level.level_height):
-                self._sees[(x_pos, y_pos)] = False
-
-    def _set_lit(self, x_pos: int, y_pos: int, light_level: places.LightLevelEnum) -> None:
-        if 0 <= x_pos < self._level.level_width and 0 <= y_pos < self._level.level_height:
-            self._lit[(x_pos, y_pos)] = light_level
+        self._sees = 0
 
     def _set_seeing(self, x_pos: int, y_pos: int) -> None:
         if 0 <= x_pos < self._level.level_width and 0 <= y_pos < self._level.level_height:
-            self._sees[(x_pos, y_pos)] = True
+            self._sees |= 1 << (y_pos * self._level.level_width + x_pos)
 
     def _has_already_seen(self, x_pos: int, y_pos: int) -> bool:
-        return self._has_seen[(x_pos, y_pos)]
-
-    def _set_has_seen(self, x_pos: int, y_pos: int) -> None:
-        if 0 <= x_pos < self._level.level_width and 0 <= y_pos < self._level.level_height:
-            self._has_seen[(x_pos, y_pos)] = True
-
-    def _cast_light_rec(self, octant: int, origin: typing.Tuple[int, int], range_limit: typing.Optional[int], x_start: int, top: fractions.Fraction, bottom: fractions.Fraction, result: typing.Set[typing.Tuple[int, int]]) -> None:
-        """ Recursive part of lightcasting function """
-
-        def _get_distance(x_val: int, y_val: int) -> float:
-            """ get_distance """
-            return math.sqrt(x_val ** 2 + y_val ** 2)
-
-        def _translate_octant(x_val: int, y_val: int, octant: int, origin: typing.Tuple[int, int]) -> typing.Tuple[int, int]:
-            """ translate_octant """
-            new_x, new_y = origin
-            if octant == 0:
-                new_x += x_val
-                new_y -= y_val
-            elif octant == 1:
-                new_x += y_val
-                new_y -= x_val
-            elif octant == 2:
-                new_x -= y_val
-                new_y -= x_val
-            elif octant == 3:
-                new_x -= x_val
-                new_y -= y_val
-            elif octant == 4:
-                new_x -= x_val
-                new_y += y_val
-            elif octant == 5:
-                new_x -= y_val
-                new_y += x_val
-            elif octant == 6:
-                new_x += y_val
-                new_y += x_val
-            elif octant == 7:
-                new_x += x_val
-                new_y += y_val
-            return new_x, new_y
-
-        def _blocks_light(x_val: int, y_val: int, octant: int, origin: typing.Tuple[int, int]) -> bool:
-            """ blocksLight """
-            new_x, new_y = _translate_octant(x_val, y_val, octant, origin)
-            return self._blocks_vision(new_x, new_y)
-
-        def _set_visible(x_val: int, y_val: int, octant: int, origin: typing.Tuple[int, int]) -> None:
-            """ setVisible """
-            viewed = _translate_octant(x_val, y_val, octant, origin)
-            result.add(viewed)
-
-        # start of _cast_light_rec method
-
-        for x_val in range(x_start, range_limit + 1 if range_limit else sys.maxsize):
-
-            top_y = 0
-            if top.denominator == 1:
-                top_y = x_val
-            else:
-                top_y = int(((x_val * 2 - 1) * top.numerator + top.denominator) / (top.denominator * 2))
-                if _blocks_light(x_val, top_y, octant, origin):
-                    if top >= fractions.Fraction(top_y * 2 + 1, x_val * 2) and not _blocks_light(x_val, top_y + 1, octant, origin):
-                        top_y += 1
-                else:
-                    a_for_x = x_val * 2
-                    if _blocks_light(x_val + 1, top_y + 1, octant, origin):
-                        a_for_x += 1
-                    if top > fractions.Fraction(top_y * 2 + 1, a_for_x):
-                        top_y += 1
-
-            bottom_y = 0
-            if bottom.numerator == 0:
-                bottom_y = 0
-            else:
-                bottom_y = int(((x_val * 2 - 1) * bottom.numerator + bottom.denominator) / (bottom.denominator * 2))
-                if bottom >= fractions.Fraction(bottom_y * 2 + 1, x_val * 2) and _blocks_light(x_val, bottom_y, octant, origin) and not _blocks_light(x_val, bottom_y + 1, octant, origin):
-                    bottom_y += 1
-
-            was_opaque: typing.Optional[bool] = None
-
-            for y_val in range(top_y, bottom_y - 1, -1):
-                if range_limit is None or _get_distance(x_val, y_val) <= range_limit:
-                    is_opaque = _blocks_light(x_val, y_val, octant, origin)
-
-                    is_visible = False
-                    if not LOS_FULLY_SYMETRICAL:
-                        is_visible = is_opaque or ((y_val != top_y or top > fractions.Fraction(y_val * 4 - 1, x_val * 4 + 1)) and (y_val != bottom_y or bottom < fractions.Fraction(y_val * 4 + 1, x_val * 4 - 1)))
-                    else:
-                        is_visible = (y_val != top_y or top >= fractions.Fraction(y_val, x_val)) and (y_val != bottom_y or bottom <= fractions.Fraction(y_val, x_val))
-
-                    if is_visible:
-                        _set_visible(x_val, y_val, octant, origin)
-                    if x_val != range_limit:
-                        if is_opaque:
-                            if was_opaque is not None and not was_opaque:
-                                new_x, new_y = x_val * 2, y_val * 2 + 1
-
-                                if not LOS_FULLY_SYMETRICAL:
-                                    if _blocks_light(x_val, y_val + 1, octant, origin):
-                                        new_x -= 1
-
-                                if top > fractions.Fraction(new_y, new_x):
-                                    if y_val == bottom_y:
-                                        bottom = fractions.Fraction(new_y, new_x)
-                                        break
-                                    else:
-                                        self._cast_light_rec(octant, origin, range_limit, x_val + 1, top, fractions.Fraction(new_y, new_x), result)
-                                else:
-                                    if y_val == bottom_y:
-                                        return
-                            was_opaque = True
-                        else:  # isOpaque
-                            if was_opaque is not None and was_opaque:
-                                new_x, new_y = x_val * 2, y_val * 2 + 1
-                                if _blocks_light(x_val + 1, y_val + 1, octant, origin):
-                                    new_x += 1
-                                if bottom >= fractions.Fraction(new_y, new_x):
-                                    return
-                                top = fractions.Fraction(new_y, new_x)
-                            was_opaque = False
-
-            if was_opaque is None or was_opaque:
-                break
-
-    def _cast_light(self, x_origin: int, y_origin: int, range_limit: typing.Optional[int]) -> typing.Set[typing.Tuple[int, int]]:
-        """
-        Adam Milazzo's algorith for line of sight
-
-        http://www.adammil.net/blog/v125_Roguelike_Vision_Algorithms.html
-        On his site he compares :
-         - Ray casting
-         - Shadow casting
-         - Diamond walls
-         - Permissive field of view
-        - "My algorithm"
-
-        Algorithm below is a Python strict translation of the C Sharp code implementing "My algorithm".
-
-        It can be made fully symmetrical using LOS_FULLY_SYMETRICAL
-        """
-
-        result: typing.Set[typing.Tuple[int, int]] = set()
-        origin = (x_origin, y_origin)
-        result.add(origin)
-        for octant in range(8):
-            self._cast_light_rec(octant, origin, range_limit, 1, fractions.Fraction(1, 1), fractions.Fraction(0, 1), result)
-        return result
+        return (self._has_seen >> (y_pos * self._level.level_width + x_pos)) & 1 == 1
 
     # now the methods visible from outside the module
 
     def knows(self, x_pos: int, y_pos: int) -> bool:
         """ need to know if players know about that tile """
-        return self._has_seen[(x_pos, y_pos)]
+        return self._has_already_seen(x_pos, y_pos)
 
     def set_knows_all(self) -> None:
         """ sets that hero know all (debug)  """
         self._knows_all = not self._knows_all
 
     def do_light_effects(self) -> None:
-        """ Do the light effects """
-
-        self._reinit_light()
-
-        for light_source in self._level.level_light_sources:
-            # calculates places that are lit/darkened
-            x_pos, y_pos = light_source.level_pos
-            result = self._cast_light(x_pos, y_pos, light_source.light_radius)
-            # the light source is seen, too
-            result.add(light_source.level_pos)
-            # lit them
-            for (x_pos, y_pos) in result:
-                self._set_lit(x_pos, y_pos, light_source.light_level)
+        """ Do the light effects (only light sources affected by changes of opacity are calculated again) """
+        self._light_map.update()
 
     def do_place_observer(self, obs_pos: typing.Tuple[int, int]) -> None:
         """ Place observer """
@@ -279,33 +179,25 @@ class Mapping:
         for (x_pos, y_pos) in result:
             self._set_seeing(x_pos, y_pos)
 
-        # places at vision radius are seen unless dark
-        result = self._cast_light(x_hero, y_hero, constants.FOV_RADIUS)
-        for (x_pos, y_pos) in result:
-            if self._lit_now(x_pos, y_pos) != places.LightLevelEnum.DARK:
-                self._set_seeing(x_pos, y_pos)
-
-        # places at infinite radius are seen if lit
-        infinite = constants.DUNGEON_WIDTH + constants.DUNGEON_HEIGHT
-        result = self._cast_light(x_hero, y_hero, infinite)
-        for (x_pos, y_pos) in result:
-            if self._lit_now(x_pos, y_pos) == places.LightLevelEnum.LIT:
-                self._set_seeing(x_pos, y_pos)
+        # one single pass : places at vision radius are seen unless dark, further places are seen if lit
+        radius2 = constants.FOV_RADIUS * constants.FOV_RADIUS
+        width = self._level.level_width
+        sees = self._sees
+        for (x_pos, y_pos), distance2 in fov_cache().field_of_view(self._level, self._hero_pos, None).items():
+            light_level = self._lit_now(x_pos, y_pos)
+            if light_level == places.LightLevelEnum.LIT or (distance2 <= radius2 and light_level != places.LightLevelEnum.DARK):
+                sees |= 1 << (y_pos * width + x_pos)
+        self._sees = sees
 
     def do_update_has_seen(self) -> None:
         """ Remembers what was seen """
 
         # what is seen will be remembered
-        for x_pos in range(self._level.level_width):
-            for y_pos in range(self._level.level_height):
-                if self._sees_now(x_pos, y_pos):
-                    self._set_has_seen(x_pos, y_pos)
+        self._has_seen |= self._sees
 
         # for debug
         if self._knows_all:
-            for x_pos in range(self._level.level_width):
-                for y_pos in range(self._level.level_height):
-                    self._set_has_seen(x_pos, y_pos)
+            self._has_seen = self._all_places
 
     def enter_level(self) -> typing.List[str]:
         """ When hero enters level """
@@ -350,28 +242,82 @@ class Mapping:
         return place.engraving_messages()
 
     def display(self, window: typing.Any) -> None:
-        """ Displays the map on the given curses screen (utterly unoptimized) """
+        """ Displays the map on the given curses screen (only places that changed since previous frame are written) """
 
         assert self._hero_pos, "Unknown hero position for display()"
         hero_x_pos, hero_y_pos = self._hero_pos
 
-        for x_pos in range(self._level.level_width):
-            for y_pos in range(self._level.level_height):
-
-                # attr
+        # the four attributes (need curses to be started)
+        if self._attrs is None:
+            self._attrs = (
+                mycurses.color(curses.COLOR_WHITE, curses.COLOR_BLACK),
+                mycurses.color(curses.COLOR_WHITE, curses.COLOR_BLACK) | curses.A_BOLD,
+                mycurses.color(curses.COLOR_WHITE, curses.COLOR_BLACK) | curses.A_DIM,
+                mycurses.color(curses.COLOR_BLACK, curses.COLOR_BLACK))
+        attr_hero, attr_seen, attr_has_seen, attr_unknown = self._attrs
+
+        width = self._level.level_width
+        data = self._level.data
+        drawn_glyphs = self._drawn_glyphs
+        drawn_attrs = self._drawn_attrs
+        self._cells_written = 0
+        self._runs_written = 0
+        row_mask = (1 << width) - 1
+
+        for y_pos in range(self._level.level_height):
+
+            # bits of this row only
+            row_sees = (self._sees >> (y_pos * width)) & row_mask
+            row_has_seen = (self._has_seen >> (y_pos * width)) & row_mask
+
+            # run of changed places with same attr being built on this row
+            run_x_pos = 0
+            run_chars: typing.List[str] = list()
+            run_attr = 0
+
+            for x_pos in range(width):
+
+                # attr and glyph (what is unknown is not worth getting)
                 if x_pos == hero_x_pos and y_pos == hero_y_pos:
-                    attr = mycurses.color(curses.COLOR_WHITE, curses.COLOR_BLACK)
-                elif self._sees_now(x_pos, y_pos):
-                    attr = mycurses.color(curses.COLOR_WHITE, curses.COLOR_BLACK) | curses.A_BOLD
-                elif self._has_already_seen(x_pos, y_pos):
-                    attr = mycurses.color(curses.COLOR_WHITE, curses.COLOR_BLACK) | curses.A_DIM
+                    attr = attr_hero
+                    char = data[(x_pos, y_pos)].display_glyph()
+                elif (row_sees >> x_pos) & 1:
+                    attr = attr_seen
+                    char = data[(x_pos, y_pos)].display_glyph()
+                elif (row_has_seen >> x_pos) & 1:
+                    attr = attr_has_seen
+                    char = data[(x_pos, y_pos)].display_glyph()
                 else:
-                    attr = mycurses.color(curses.COLOR_BLACK, curses.COLOR_BLACK)
-
-                place = self._level.data[(x_pos, y_pos)]
-                char = place.display_glyph()
-
-                window.addstr(constants.MESSAGES_BUFFER_SIZE + constants.PROMPT_BUFFER_SIZE + y_pos, x_pos, char, attr)
+                    attr = attr_unknown
+                    char = ' '
+
+                index = y_pos * width + x_pos
+                if drawn_glyphs[index] == char and drawn_attrs[index] == attr:
+                    # unchanged : ends the run
+                    if run_chars:
+                        self._write_run(window, run_x_pos, y_pos, run_chars, run_attr)
+                        run_chars = list()
+                    continue
+
+                drawn_glyphs[index] = char
+                drawn_attrs[index] = attr
+
+                # changed : extends the run or starts a new one
+                if run_chars and attr != run_attr:
+                    self._write_run(window, run_x_pos, y_pos, run_chars, run_attr)
+                    run_chars = list()
+                if not run_chars:
+                    run_x_pos = x_pos
+                    run_attr = attr
+                run_chars.append(char)
+
+            if run_chars:
+                self._write_run(window, run_x_pos, y_pos, run_chars, run_attr)
+
+    def _write_run(self, window: typing.Any, x_pos: int, y_pos: int, chars: typing.List[str], attr: int) -> None:
+        window.addstr(constants.MESSAGES_BUFFER_SIZE + constants.PROMPT_BUFFER_SIZE + y_pos, x_pos, ''.join(chars), attr)
+        self._cells_written += len(chars)
+        self._runs_written += 1
 
     @property
     def level(self) -> abstractlevel.AbstractLevel:
@@ -379,12 +325,22 @@ class Mapping:
         return self._level
 
     @property
-    def has_seen(self) -> typing.Dict[typing.Tuple[int, int], bool]:
+    def cells_written(self) -> int:
+        """ property """
+        return self._cells_written
+
+    @property
+    def runs_written(self) -> int:
+        """ property """
+        return self._runs_written
+
+    @property
+    def has_seen(self) -> int:
         """ property """
         return self._has_seen
 
     @has_seen.setter
-    def has_seen(self, has_seen: typing.Dict[typing.Tuple[int, int], bool]) -> None:
+    def has_seen(self, has_seen: int) -> None:
         """ setter """
         self._has_seen = has_seen
 
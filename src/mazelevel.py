@@ -164,7 +164,7 @@ class Corner(AbstractCase):
 class MazeLevel(abstractlevel.AbstractLevel):
     """ A maze level object """
 
-    def __init__(self, level_name: str, depth: int, branch: str, already_special_rooms: typing.Set[abstractlevel.SpecialRoomEnum], nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False) -> None:  # pylint: disable=unused-argument
+    def __init__(self, level_name: str, depth: int, branch: str, planned_special_room: typing.Optional[abstractlevel.SpecialRoomEnum], nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False, identifier: typing.Optional[int] = None) -> None:  # pylint: disable=unused-argument
 
         def outside_maze(pos: typing.Tuple[int, int]) -> bool:
             """ detects outside positions """
@@ -178,7 +178,7 @@ class MazeLevel(abstractlevel.AbstractLevel):
 
         #  start of init here
 
-        abstractlevel.AbstractLevel.__init__(self, level_name, depth, branch, nb_down_stairs, nb_up_stairs, entry_level)
+        abstractlevel.AbstractLevel.__init__(self, level_name, depth, branch, nb_down_stairs, nb_up_stairs, entry_level, identifier)
 
         self._empty_tiles: typing.Set[Empty] = set()
         self._posswall_tiles: typing.Set[PossWall] = set()
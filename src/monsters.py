@@ -9,7 +9,6 @@ Hero is a monster too.
 """
 
 import typing
-import collections
 import enum
 
 import myrandom
@@ -20,6 +19,10 @@ import pickables
 # how long monster position stays in monster's memory
 MAX_MEMORY_FRESHNESS = 20
 
+# while dormant (level of hero is another one) : rounds to get a hit point back and rounds to have surely wandered away
+DORMANT_ROUNDS_PER_HIT_POINT = 20
+DORMANT_ROUNDS_TO_WANDER = 50
+
 
 class Backsack:
     """ Purse object """
@@ -287,15 +290,20 @@ class MonsterTypeEnum(display.SomethingSeen, enum.Enum):
         return self._statue_possible
 
 
+@enum.unique
+class LifeStateEnum(enum.Enum):
+    """ Where a monster is in its life """
+
+    RISING = enum.auto()    # just made, not simulated yet
+    ACTIVE = enum.auto()    # simulated
+    SLEEPING = enum.auto()  # not simulated until woken up
+    DORMANT = enum.auto()   # not simulated because hero is on another level
+    DEAD = enum.auto()
+
+
 class Monster(Occupant):
     """ A monster """
 
-    rising_ones: typing.Deque['Monster'] = collections.deque([])
-    ready_ones: typing.Deque['Monster'] = collections.deque([])
-    standby_ones: typing.Deque['Monster'] = collections.deque([])
-    sleeping_ones: typing.Deque['Monster'] = collections.deque([])
-    dead_ones: typing.Deque['Monster'] = collections.deque([])
-
     def __init__(self, mytype: MonsterTypeEnum, dungeon_level: typing.Any, position: typing.Tuple[int, int], money_given: int) -> None:
 
         Occupant.__init__(self, dungeon_level, position)
@@ -324,7 +332,8 @@ class Monster(Occupant):
             self._dungeon_level.data[self._position].occupant = self
 
         # that will make it "live"
-        Monster.rising_ones.append(self)
+        self._life_state = LifeStateEnum.RISING
+        LIFECYCLE.rise(self)
 
     def glyph(self) -> str:
         """ glyph """
@@ -350,18 +359,8 @@ class Monster(Occupant):
         old_pos = self._position
         old_level.data[old_pos].occupant = None
 
-        # make it inactive and put it list to handle as dead
-        if self in Monster.ready_ones:
-            Monster.ready_ones.remove(self)
-            Monster.dead_ones.append(self)
-        elif self in Monster.standby_ones:
-            Monster.standby_ones.remove(self)
-            Monster.dead_ones.append(self)
-        elif self in Monster.rising_ones:
-            # special case : does not die, just birth is cancelled
-            Monster.rising_ones.remove(self)
-        else:
-            assert False, "Dying monster un strange state"
+        # make it inactive
+        LIFECYCLE.die(self)
 
     def blocks_vision(self) -> bool:
         """ blocks_vision """
@@ -408,10 +407,30 @@ class Monster(Occupant):
         if myrandom.toss_coin():
             self.hit_points.credit(1)
 
+    def catch_up(self, nb_rounds: int) -> None:
+        """ What monster did while dormant, by chance rather than round by round """
+
+        if nb_rounds <= 0:
+            return
+
+        # resting : a hit point every so many rounds (the remainder by chance)
+        hit_points_back, remainder = divmod(nb_rounds, DORMANT_ROUNDS_PER_HIT_POINT)
+        if myrandom.randint(0, DORMANT_ROUNDS_PER_HIT_POINT - 1) < remainder:
+            hit_points_back += 1
+        self.hit_points.credit(hit_points_back)
+
+        # wandering : somewhere else on level, surely if dormant long enough
+        if myrandom.randint(0, DORMANT_ROUNDS_TO_WANDER - 1) < nb_rounds:
+            self.moves_to(self._dungeon_level, self._dungeon_level.random_position())
+
+        # what monster remembers is too old now
+        self._memory_position = MemoryPosition()
+
     def considers_passable(self, position: typing.Tuple[int, int]) -> bool:
         """ function saying if monsters thinks a tile is passable """
 
-        if not self._dungeon_level.data[position].may_access():
+        x_pos, y_pos = position
+        if not self._dungeon_level.data.may_access(x_pos, y_pos):
             return False
 
         # Occupant is extracted from the monsters' memory
@@ -435,6 +454,16 @@ class Monster(Occupant):
     def __str__(self) -> str:
         return self.whatis()
 
+    @property
+    def life_state(self) -> 'LifeStateEnum':
+        """ property """
+        return self._life_state
+
+    @life_state.setter
+    def life_state(self, life_state: 'LifeStateEnum') -> None:
+        """ setter """
+        self._life_state = life_state
+
     @property
     def mytype(self) -> MonsterTypeEnum:
         """ property """
@@ -461,5 +490,98 @@ class Monster(Occupant):
         return self._memory_position
 
 
+class Lifecycle:
+    """
+    Monsters per state of their life, each in order it got into the state.
+    Changing state is done in constant time and told to listeners (sequencer, A.I.)
+    Dead ones are forgotten once listeners are told.
+    """
+
+    def __init__(self) -> None:
+        self._monsters: typing.Dict[LifeStateEnum, typing.Dict[Monster, None]] = {life_state: dict() for life_state in LifeStateEnum if life_state is not LifeStateEnum.DEAD}
+
+        # per level (identifier) : monsters dormant there and round they fell dormant
+        self._dormant_rounds: typing.Dict[int, typing.Dict[Monster, int]] = dict()
+
+        # told of every change : monster, state before, state after
+        self._listeners: typing.List[typing.Callable[[Monster, LifeStateEnum, LifeStateEnum], None]] = list()
+
+    def add_listener(self, listener: typing.Callable[[Monster, LifeStateEnum, LifeStateEnum], None]) -> None:
+        """ listener will be told of every change of state from now on """
+        self._listeners.append(listener)
+
+    def _change(self, monster: Monster, life_state: LifeStateEnum) -> None:
+        """ monster changes state """
+        previous_state = monster.life_state
+        del self._monsters[previous_state][monster]
+        if life_state is not LifeStateEnum.DEAD:
+            self._monsters[life_state][monster] = None
+        monster.life_state = life_state
+        for listener in self._listeners:
+            listener(monster, previous_state, life_state)
+
+    def rise(self, monster: Monster) -> None:
+        """ monster was just made """
+        self._monsters[LifeStateEnum.RISING][monster] = None
+
+    def activate_rising(self, hero_level: typing.Any, round_now: int) -> None:
+        """ monsters just made are simulated (dormant if not on level of hero) """
+        for monster in list(self._monsters[LifeStateEnum.RISING]):
+            self._change(monster, LifeStateEnum.ACTIVE)
+            if monster.dungeon_level is not hero_level:
+                self.fall_dormant(monster, round_now)
+
+    def fall_asleep(self, monster: Monster) -> None:
+        """ monster is not simulated until woken up """
+        assert monster.life_state is LifeStateEnum.ACTIVE, "Monster falling asleep in strange state"
+        self._change(monster, LifeStateEnum.SLEEPING)
+
+    def wake_up(self, monster: Monster) -> None:
+        """ monster is simulated again """
+        assert monster.life_state is LifeStateEnum.SLEEPING, "Monster waking up in strange state"
+        self._change(monster, LifeStateEnum.ACTIVE)
+
+    def fall_dormant(self, monster: Monster, round_now: int) -> None:
+        """ hero is not on level of monster : it is not simulated any more """
+        assert monster.life_state is LifeStateEnum.ACTIVE, "Monster falling dormant in strange state"
+        self._dormant_rounds.setdefault(monster.dungeon_level.identifier, dict())[monster] = round_now
+        self._change(monster, LifeStateEnum.DORMANT)
+
+    def fall_dormant_level(self, dungeon_level: typing.Any, round_now: int) -> None:
+        """ hero left the level : monsters simulated there are not simulated any more """
+        for monster in list(self._monsters[LifeStateEnum.ACTIVE]):
+            if monster.dungeon_level is dungeon_level:
+                self.fall_dormant(monster, round_now)
+
+    def wake_up_level(self, dungeon_level: typing.Any, round_now: int) -> None:
+        """ hero entered the level : monsters dormant there catch up and are simulated again """
+        for monster, round_dormant in self._dormant_rounds.pop(dungeon_level.identifier, {}).items():
+            monster.catch_up(round_now - round_dormant)
+            self._change(monster, LifeStateEnum.ACTIVE)
+
+    def die(self, monster: Monster) -> None:
+        """ monster dies (if it was rising, its birth is just cancelled) """
+        if monster.life_state is LifeStateEnum.RISING:
+            del self._monsters[LifeStateEnum.RISING][monster]
+            monster.life_state = LifeStateEnum.DEAD
+            return
+        if monster.life_state is LifeStateEnum.DORMANT:
+            del self._dormant_rounds[monster.dungeon_level.identifier][monster]
+        assert monster.life_state is not LifeStateEnum.DEAD, "Dying monster in strange state"
+        self._change(monster, LifeStateEnum.DEAD)
+
+    def rising_ones(self) -> typing.List[Monster]:
+        """ monsters just made, in order """
+        return list(self._monsters[LifeStateEnum.RISING])
+
+    def active_ones(self) -> typing.List[Monster]:
+        """ monsters simulated, in order """
+        return list(self._monsters[LifeStateEnum.ACTIVE])
+
+
+# where every monster is in its life
+LIFECYCLE = Lifecycle()
+
+
 if __name__ == '__main__':
     assert False, "Do not run this script"
@@ -57,27 +57,19 @@ class MonsterAIData:
         def keep_note() -> None:
             """ Take a good note of what monster sees """
 
-            # restrict to a square around monster pos (optimisation)
-            x_monster, y_monster = self._monster.position
-            for x_pos in range(x_monster - RANGE_SEARCH, x_monster + RANGE_SEARCH + 1):
-                for y_pos in range(y_monster - RANGE_SEARCH, y_monster + RANGE_SEARCH + 1):
-                    pos = x_pos, y_pos
-                    if pos not in level.data:
-                        continue
-                    place = level.data[pos]
-                    if not place.may_access():
-                        continue
-                    if pos == self._monster.position:
-                        continue
-                    success, _ = self._tools.can_see(self._monster, pos)
-                    if not success:
-                        continue
-                    if not place.occupant:
-                        self._seen_not_there.add(pos)
-                        continue
-                    self._monster.memory_position.note_position(place.occupant)
-                    if place.occupant != self._hero:
-                        self._seen_not_there.add(pos)
+            # only what is in field of view (calculated once)
+            for pos in self._tools.visible_positions(self._monster):
+                if not level.data.may_access(*pos):
+                    continue
+                if pos == self._monster.position:
+                    continue
+                place = level.data[pos]
+                if not place.occupant:
+                    self._seen_not_there.add(pos)
+                    continue
+                self._monster.memory_position.note_position(place.occupant)
+                if place.occupant != self._hero:
+                    self._seen_not_there.add(pos)
 
         def make_guess() -> typing.List[typing.Tuple[int, int]]:
             """ Intelligent part of tracking : target dissapeared, what do I do ?
@@ -85,6 +77,10 @@ class MonsterAIData:
             """
 
             possible_positions: typing.Dict[typing.Tuple[int, int], int] = dict()
+            visible_positions = self._tools.visible_positions(self._monster)
+
+            # one search for all places (closest ones are within range search moves when there are some)
+            distances = self._tools.distances_within(self._monster, RANGE_SEARCH)
 
             # restrict to a square around monster pos (optimisation)
             x_monster, y_monster = self._monster.position
@@ -104,16 +100,14 @@ class MonsterAIData:
                     if pos in self._seen_not_there:
                         continue
                     # must not be seen
-                    success, _ = self._tools.can_see(self._monster, pos)
-                    if success:
+                    if pos in visible_positions:
                         continue
                     # must be accessible
-                    success, _, path = self._tools.path_towards(self._monster, pos)
-                    if not success:
+                    if pos not in distances:
                         continue
                     # special
                     # TODO : avoid going back
-                    possible_positions[pos] = len(path)
+                    possible_positions[pos] = distances[pos]
 
             if not possible_positions:
                 return list()
@@ -141,8 +135,7 @@ class MonsterAIData:
 
         if self._state == StateEnum.SLEEPING:
 
-            success, _ = self._tools.can_see(self._monster, self._hero.position)
-            if success:
+            if self._tools.sees(self._monster, self._hero.position):
                 self._seen_not_there = set()
                 self._target = self._hero.position
                 self._state = StateEnum.FOLLOWING
@@ -157,8 +150,7 @@ class MonsterAIData:
 
         elif self._state == StateEnum.FOLLOWING:
 
-            success, _ = self._tools.can_see(self._monster, self._hero.position)
-            if success:
+            if self._tools.sees(self._monster, self._hero.position):
                 self._seen_not_there = set()
                 self._target = self._hero.position
                 if DEBUG_TRACKING:
@@ -179,8 +171,7 @@ class MonsterAIData:
 
         elif self._state == StateEnum.TRACKING:
 
-            success, _ = self._tools.can_see(self._monster, self._hero.position)
-            if success:
+            if self._tools.sees(self._monster, self._hero.position):
                 self._seen_not_there = set()
                 self._target = self._hero.position
                 self._state = StateEnum.FOLLOWING
@@ -206,8 +197,7 @@ class MonsterAIData:
 
         elif self._state == StateEnum.SEARCHING:
 
-            success, _ = self._tools.can_see(self._monster, self._hero.position)
-            if success:
+            if self._tools.sees(self._monster, self._hero.position):
                 self._seen_not_there = set()
                 self._target = self._hero.position
                 self._state = StateEnum.FOLLOWING
@@ -232,8 +222,7 @@ class MonsterAIData:
                         mylogger.LOGGER.debug("monster on %s searching reached target assigns new target %s", self._monster.position, self._target)
 
         elif self._state == StateEnum.WANDERING:
-            success, _ = self._tools.can_see(self._monster, self._hero.position)
-            if success:
+            if self._tools.sees(self._monster, self._hero.position):
                 self._seen_not_there = set()
                 self._target = self._hero.position
                 self._state = StateEnum.FOLLOWING
@@ -246,7 +235,7 @@ class MonsterAIData:
                     mylogger.LOGGER.debug("monster on %s reached target and stops wandering falls asleep", self._monster.position)
             else:
                 assert self._target, "Wandering but no target"
-                success, _, _ = self._tools.path_towards(self._monster, self._target)
+                success, _ = self._tools.follow_path(self._monster, self._target)
                 if not success:
                     self._target = self._monster.dungeon_level.random_position()
                     if DEBUG_TRACKING:
@@ -259,8 +248,11 @@ class MonsterAIData:
 
         assert self._target != self._monster.position
 
-        # now apply target
-        success, direction, _ = self._tools.path_towards(self._monster, self._target)
+        # now apply target (all monsters going to hero share the same flow field)
+        if self._target == self._hero.position:
+            success, direction = self._tools.step_towards(self._monster, self._target)
+        else:
+            success, direction = self._tools.follow_path(self._monster, self._target)
         if not success:
             if DEBUG_TRACKING:
                 mylogger.LOGGER.debug("monster %s cannot reach target", self._monster.position)
@@ -292,6 +284,14 @@ class MonstersAI:
     def unregister(self, monster: monsters.Monster) -> None:
         """ unregister a monster  """
         del self._actor_table[monster]
+        self._tools.forget(monster)
+
+    def life_changed(self, monster: monsters.Monster, previous_state: monsters.LifeStateEnum, life_state: monsters.LifeStateEnum) -> None:
+        """ called by lifecycle of monsters """
+        if previous_state is monsters.LifeStateEnum.RISING:
+            self.register(monster)
+        elif life_state is monsters.LifeStateEnum.DEAD:
+            self.unregister(monster)
 
     @property
     def tools(self) -> monsters_ai_tools.MonstersAITools:
@@ -8,24 +8,186 @@ Useful tools for monster ia
 """
 
 import typing
+import collections
 import heapq
 import math
+import time
 
 import constants
+import mylogger
+import myrandom
 import actions
 import monsters
 import abstractlevel
+import mapping
+import navigation
+import roomlevel
+import cavelevel
+
+NB_TEST_POSITIONS = 100
+
+
+def _bresenham(width: int, height: int) -> typing.Tuple[typing.Tuple[int, int], ...]:
+    """ Bresenham algorim for drawing a line from (0, 0) to a point : offsets of the points after (0, 0) """
+
+    def _sign(val: int) -> int:
+        """ sign """
+        if val < 0:
+            return -1
+        if val > 0:
+            return 1
+        return 0
+
+    delta_x1 = _sign(width)
+    delta_y1 = _sign(height)
+
+    longest = max(abs(width), abs(height))
+    shortest = min(abs(width), abs(height))
+
+    delta_x2 = _sign(width)
+    delta_y2 = 0
+    if not abs(width) > abs(height):
+        delta_x2 = 0
+        delta_y2 = _sign(height)
+
+    numerator = longest // 2
+
+    line: typing.List[typing.Tuple[int, int]] = list()
+    x_cur, y_cur = 0, 0
+    for _ in range(longest):
+        numerator += shortest
+        if not numerator < longest:
+            numerator -= longest
+            x_cur += delta_x1
+            y_cur += delta_y1
+        else:
+            x_cur += delta_x2
+            y_cur += delta_y2
+        line.append((x_cur, y_cur))
+
+    return tuple(line)
+
+
+# line of sight for every offset from viewer within vision radius (made when first needed since radius is in ini file)
+LOS_RAYS: typing.Dict[typing.Tuple[int, int], typing.Tuple[typing.Tuple[int, int], ...]] = dict()
+LOS_RAYS_RADIUS = -1
+
+
+def los_rays() -> typing.Dict[typing.Tuple[int, int], typing.Tuple[typing.Tuple[int, int], ...]]:
+    """ The table of lines of sight """
+    global LOS_RAYS_RADIUS
+    if LOS_RAYS_RADIUS != constants.FOV_RADIUS:
+        LOS_RAYS.clear()
+        radius = constants.FOV_RADIUS
+        for delta_x in range(-radius, radius + 1):
+            for delta_y in range(-radius, radius + 1):
+                if delta_x * delta_x + delta_y * delta_y <= radius * radius:
+                    LOS_RAYS[(delta_x, delta_y)] = _bresenham(delta_x, delta_y)
+        LOS_RAYS_RADIUS = radius
+    return LOS_RAYS
+
+
+class VisibilityService:
+    """ What monsters see : one field of view per monster, calculated again only when monster moved or opacity of level changed """
+
+    def __init__(self) -> None:
+        # per monster : level identifier, position, opacity version of level and positions seen
+        self._fields: typing.Dict[monsters.Monster, typing.Tuple[int, typing.Tuple[int, int], int, typing.Dict[typing.Tuple[int, int], int]]] = dict()
+
+    def visible_positions(self, monster: monsters.Monster) -> typing.Dict[typing.Tuple[int, int], int]:
+        """ Positions monster sees with their square distance (do not modify) """
+        monster_level = monster.dungeon_level
+        memo = self._fields.get(monster)
+        if memo is not None:
+            identifier, position, opacity_version, field = memo
+            if identifier == monster_level.identifier and position == monster.position and opacity_version == monster_level.opacity_version:
+                return field
+        field = mapping.fov_cache().field_of_view(monster_level, monster.position, constants.FOV_RADIUS)
+        self._fields[monster] = (monster_level.identifier, monster.position, monster_level.opacity_version, field)
+        return field
+
+    def forget(self, monster: monsters.Monster) -> None:
+        """ monster is gone """
+        self._fields.pop(monster, None)
+
+
+# to find direction of a move
+DELTA_2_DIRECTION = {delta: direction for direction, delta in actions.DIRECTION_2_DELTA.items()}
+
+
+class FlowField:
+    """ Number of moves to reach a target from every place of a level that can reach it (places where monsters may walk, monsters not considered) """
+
+    def __init__(self, level: abstractlevel.AbstractLevel, target_pos: typing.Tuple[int, int]) -> None:
+
+        self._level = level
+        self._target_pos = target_pos
+        self._version = level.version
+
+        width = level.level_width
+        height = level.level_height
+        walkability = level.walkability
+        diagonal_passability = level.diagonal_passability
+
+        # breadth first from target (moves are reversible)
+        self._distances = [-1] * (width * height)
+        x_target, y_target = target_pos
+        target_index = y_target * width + x_target
+        self._distances[target_index] = 0
+        queue = collections.deque([target_index])
+        while queue:
+            index = queue.popleft()
+            y_pos, x_pos = divmod(index, width)
+            distance = self._distances[index] + 1
+            for delta_x, delta_y in actions.DIRECTION_2_DELTA.values():
+                new_x, new_y = x_pos + delta_x, y_pos + delta_y
+                if new_x < 0 or new_y < 0 or new_x >= width or new_y >= height:
+                    continue
+                new_index = new_y * width + new_x
+                if self._distances[new_index] != -1:
+                    continue
+                if not walkability[new_index]:
+                    continue
+                if delta_x and delta_y and not (diagonal_passability[index] and diagonal_passability[new_index]):
+                    continue
+                self._distances[new_index] = distance
+                queue.append(new_index)
+
+    def distance(self, position: typing.Tuple[int, int]) -> typing.Optional[int]:
+        """ number of moves to target (None if cannot reach) """
+        x_pos, y_pos = position
+        if x_pos < 0 or y_pos < 0 or x_pos >= self._level.level_width or y_pos >= self._level.level_height:
+            return None
+        distance = self._distances[y_pos * self._level.level_width + x_pos]
+        if distance == -1:
+            return None
+        return distance
+
+    def up_to_date(self, level: abstractlevel.AbstractLevel, target_pos: typing.Tuple[int, int]) -> bool:
+        """ still good for this level and target (nothing changed on level) """
+        return level is self._level and target_pos == self._target_pos and level.version == self._version
 
 
 class MonstersAITools:
     """ class providing Tools for monsters AI """
 
+    def __init__(self) -> None:
+        self._visibility = VisibilityService()
+        # per level identifier : last flow field calculated (towards hero)
+        self._flow_fields: typing.Dict[int, FlowField] = dict()
+        self._nb_flow_fields = 0
+        # per monster : level identifier, target, version of level and path being followed
+        self._paths: typing.Dict[monsters.Monster, typing.Tuple[int, typing.Tuple[int, int], int, typing.List[typing.Tuple[int, int]]]] = dict()
+        self._nb_path_hits = 0
+        self._nb_path_repairs = 0
+        self._nb_path_replans = 0
+
     @staticmethod
     def _blocks_vision(monster_level: abstractlevel.AbstractLevel, x_pos: int, y_pos: int) -> bool:
         """ function saying if a tile blocks vision """
         if x_pos < 0 or y_pos < 0 or x_pos >= monster_level.level_width or y_pos >= monster_level.level_height:
             return True
-        return monster_level.data[(x_pos, y_pos)].blocks_vision()
+        return monster_level.opacity[y_pos * monster_level.level_width + x_pos] == 1
 
     @staticmethod
     def can_reach(monster: monsters.Monster, reached_pos: typing.Tuple[int, int]) -> typing.Tuple[bool, actions.DirectionEnum]:
@@ -40,80 +202,243 @@ class MonstersAITools:
             new_x, new_y = reacher_x + delta_x, reacher_y + delta_y
             new_pos = new_x, new_y
             if direction.diagonal:
-                if not monster_level.data[new_pos].may_access_diagonally() or not monster_level.data[reacher_pos].may_access_diagonally():
+                if not monster_level.data.may_access_diagonally(new_x, new_y) or not monster_level.data.may_access_diagonally(reacher_x, reacher_y):
                     continue
             if new_pos == reached_pos:
                 return True, direction
         return False, actions.DirectionEnum.CLIMB_UP
 
-    def can_see(self, monster: monsters.Monster, viewed_pos: typing.Tuple[int, int]) -> typing.Tuple[bool, typing.List[typing.Tuple[int, int]]]:
-        """ Bresenham algorim for drawing a line between two points """
+    def sees(self, monster: monsters.Monster, viewed_pos: typing.Tuple[int, int]) -> bool:
+        """ Monster sees the position (from its field of view) """
+        return viewed_pos in self._visibility.visible_positions(monster)
+
+    def visible_positions(self, monster: monsters.Monster) -> typing.Dict[typing.Tuple[int, int], int]:
+        """ Positions monster sees with their square distance (do not modify) """
+        return self._visibility.visible_positions(monster)
+
+    def forget(self, monster: monsters.Monster) -> None:
+        """ monster is gone """
+        self._visibility.forget(monster)
+        self._paths.pop(monster, None)
+
+    def flow_field(self, level: abstractlevel.AbstractLevel, target_pos: typing.Tuple[int, int]) -> FlowField:
+        """ Flow field towards target on level, calculated again only if target moved or level changed """
+        flow_field = self._flow_fields.get(level.identifier)
+        if flow_field is None or not flow_field.up_to_date(level, target_pos):
+            flow_field = FlowField(level, target_pos)
+            self._flow_fields[level.identifier] = flow_field
+            self._nb_flow_fields += 1
+        return flow_field
+
+    def step_towards(self, monster: monsters.Monster, target_pos: typing.Tuple[int, int]) -> typing.Tuple[bool, actions.DirectionEnum]:
+        """
+        Like path_towards but going down the flow field of the target (shared by all monsters going there)
+        Returns :
+          - is there a path ?
+          - the direction to start using path
+        """
 
-        def _get_distance2(from_pos: typing.Tuple[int, int], to_pos: typing.Tuple[int, int]) -> float:
-            """ get_distance """
-            x_from, y_from = from_pos
-            x_to, y_to = to_pos
-            return math.sqrt((x_to - x_from) ** 2 + (y_to - y_from) ** 2)
+        monster_level = monster.dungeon_level
+        flow_field = self.flow_field(monster_level, target_pos)
 
-        def _sign(val: int) -> int:
-            """ sign """
-            if val < 0:
-                return -1
-            if val > 0:
-                return 1
-            return 0
+        distance = flow_field.distance(monster.position)
+        if distance is None:
+            return False, actions.DirectionEnum.CLIMB_UP
 
-        line: typing.List[typing.Tuple[int, int]] = list()
-        viewer_pos = monster.position
+        x_monster, y_monster = monster.position
+        for direction, (delta_x, delta_y) in actions.DIRECTION_2_DELTA.items():
+            new_x, new_y = x_monster + delta_x, y_monster + delta_y
+            new_pos = new_x, new_y
+            new_distance = flow_field.distance(new_pos)
+            if new_distance is None or new_distance >= distance:
+                continue
+            if direction.diagonal:
+                if not monster_level.data.may_access_diagonally(new_x, new_y) or not monster_level.data.may_access_diagonally(x_monster, y_monster):
+                    continue
+            # what monster remembers is not in the flow field
+            if new_pos != target_pos and not monster.considers_passable(new_pos):
+                continue
+            return True, direction
 
-        # Rules that out
-        if _get_distance2(viewer_pos, viewed_pos) > constants.FOV_RADIUS:
-            return False, list()
+        # local correction : something monster remembers is in the way, look for a way around it
+        success, direction, _ = self.path_towards(monster, target_pos)
+        return success, direction
 
-        x_orig, y_orig = viewer_pos
-        x_dest, y_dest = viewed_pos
+    @staticmethod
+    def _first_blocked(monster: monsters.Monster, target_pos: typing.Tuple[int, int], path: typing.List[typing.Tuple[int, int]]) -> typing.Optional[int]:
+        """ index in path of first position monster cannot go to now (same rules as path_towards) """
+        monster_level = monster.dungeon_level
+        previous_x, previous_y = monster.position
+        for index, (x_pos, y_pos) in enumerate(path):
+            if x_pos != previous_x and y_pos != previous_y:
+                if not monster_level.data.may_access_diagonally(x_pos, y_pos) or not monster_level.data.may_access_diagonally(previous_x, previous_y):
+                    return index
+            if (x_pos, y_pos) != target_pos and not monster.considers_passable((x_pos, y_pos)):
+                return index
+            previous_x, previous_y = x_pos, y_pos
+        return None
+
+    def follow_path(self, monster: monsters.Monster, target_pos: typing.Tuple[int, int]) -> typing.Tuple[bool, actions.DirectionEnum]:
+        """
+        Like path_towards but path is kept to be followed next time
+        Searched again only if target moved, path is blocked or level changed (if blocked near the end only the end is searched again)
+        Returns :
+          - is there a path ?
+          - the direction to start using path
+        """
 
-        width = x_dest - x_orig
-        height = y_dest - y_orig
+        monster_level = monster.dungeon_level
 
-        delta_x1 = _sign(width)
-        delta_y1 = _sign(height)
+        path: typing.Optional[typing.List[typing.Tuple[int, int]]] = None
+        memo = self._paths.get(monster)
+        if memo is not None:
+            identifier, memo_target_pos, version, memo_path = memo
+            if identifier == monster_level.identifier and memo_target_pos == target_pos:
+
+                # monster did the first move of path
+                if memo_path and memo_path[0] == monster.position:
+                    memo_path = memo_path[1:]
+
+                # monster is still on path
+                x_monster, y_monster = monster.position
+                if memo_path and max(abs(memo_path[0][0] - x_monster), abs(memo_path[0][1] - y_monster)) == 1:
+                    blocked_index = self._first_blocked(monster, target_pos, memo_path)
+                    if blocked_index is None:
+                        # a shorter path may have appeared if level changed
+                        if version == monster_level.version:
+                            path = memo_path
+                            self._nb_path_hits += 1
+                    elif blocked_index > len(memo_path) // 2:
+                        # repair : keep beginning, search end again
+                        success, _, tail = self.path_towards(monster, target_pos, memo_path[blocked_index - 1])
+                        if success:
+                            path = memo_path[:blocked_index] + tail
+                            self._nb_path_repairs += 1
+
+        if path is None:
+            # long way : only to first door on navigation graph (next part will be searched when there)
+            success, _, path = self.path_towards_far(monster, target_pos)
+            self._nb_path_replans += 1
+            if not success:
+                self._paths.pop(monster, None)
+                return False, actions.DirectionEnum.CLIMB_UP
+
+        self._paths[monster] = (monster_level.identifier, target_pos, monster_level.version, path)
+
+        x_monster, y_monster = monster.position
+        x_next, y_next = path[0]
+        return True, DELTA_2_DIRECTION[(x_next - x_monster, y_next - y_monster)]
+
+    @property
+    def nb_flow_fields(self) -> int:
+        """ property """
+        return self._nb_flow_fields
+
+    @property
+    def nb_path_hits(self) -> int:
+        """ property """
+        return self._nb_path_hits
+
+    @property
+    def nb_path_repairs(self) -> int:
+        """ property """
+        return self._nb_path_repairs
+
+    @property
+    def nb_path_replans(self) -> int:
+        """ property """
+        return self._nb_path_replans
 
-        longest = max(abs(width), abs(height))
-        shortest = min(abs(width), abs(height))
+    def can_see(self, monster: monsters.Monster, viewed_pos: typing.Tuple[int, int]) -> typing.Tuple[bool, typing.List[typing.Tuple[int, int]]]:
+        """ Bresenham line between two points (line of sight, used for debug) : lines are taken from table """
 
-        delta_x2 = _sign(width)
-        delta_y2 = 0
-        if not abs(width) > abs(height):
-            delta_x2 = 0
-            delta_y2 = _sign(height)
+        x_orig, y_orig = monster.position
+        x_dest, y_dest = viewed_pos
 
-        numerator = longest // 2
+        # Rules that out
+        ray = los_rays().get((x_dest - x_orig, y_dest - y_orig))
+        if ray is None:
+            return False, list()
 
-        dist = 0
-        x_cur, y_cur = x_orig, y_orig
-        while True:
-            if dist >= longest:
-                break
-            numerator += shortest
-            if not numerator < longest:
-                numerator -= longest
-                x_cur += delta_x1
-                y_cur += delta_y1
-            else:
-                x_cur += delta_x2
-                y_cur += delta_y2
-            if self._blocks_vision(monster.dungeon_level, x_cur, y_cur):
+        monster_level = monster.dungeon_level
+        width = monster_level.level_width
+        height = monster_level.level_height
+        opacity = monster_level.opacity
+
+        line: typing.List[typing.Tuple[int, int]] = list()
+        for delta_x, delta_y in ray:
+            x_cur, y_cur = x_orig + delta_x, y_orig + delta_y
+            if x_cur < 0 or y_cur < 0 or x_cur >= width or y_cur >= height or opacity[y_cur * width + x_cur]:
                 return False, line
             line.append((x_cur, y_cur))
-            dist += 1
 
         return True, line
 
     @staticmethod
-    def path_towards(monster: monsters.Monster, target_pos: typing.Tuple[int, int]) -> typing.Tuple[bool, actions.DirectionEnum, typing.List[typing.Tuple[int, int]]]:
+    def distances_within(monster: monsters.Monster, max_distance: int) -> typing.Dict[typing.Tuple[int, int], int]:
+        """
+        Number of moves for monster to reach every position it can reach within max_distance moves (one breadth first search)
+        Same rules as path_towards : a position not passable (or considered so) can be reached but not gone through
+        """
+
+        monster_level = monster.dungeon_level
+
+        distances = {monster.position: 0}
+        queue = collections.deque([monster.position])
+        while queue:
+            considered_pos = queue.popleft()
+            distance = distances[considered_pos] + 1
+            if distance > max_distance:
+                break
+            considered_x, considered_y = considered_pos
+            for direction, (delta_x, delta_y) in actions.DIRECTION_2_DELTA.items():
+                new_x, new_y = considered_x + delta_x, considered_y + delta_y
+                new_pos = new_x, new_y
+                if new_pos in distances:
+                    continue
+                if new_pos not in monster_level.data:
+                    continue
+                if direction.diagonal:
+                    if not monster_level.data.may_access_diagonally(new_x, new_y) or not monster_level.data.may_access_diagonally(considered_x, considered_y):
+                        continue
+                distances[new_pos] = distance
+                if monster.considers_passable(new_pos):
+                    queue.append(new_pos)
+
+        return distances
+
+    def path_towards_far(self, monster: monsters.Monster, target_pos: typing.Tuple[int, int]) -> typing.Tuple[bool, actions.DirectionEnum, typing.List[typing.Tuple[int, int]]]:
+        """
+        Like path_towards but doors to go through are first found on navigation graph of level
+        Then path is only searched to the first door (on places of the current region)
+        """
+
+        graph = navigation.navigation_graph(monster.dungeon_level)
+
+        # not known by graph (target not walkable or door...) : search on places
+        if not graph.knows(monster.position) or graph.region(target_pos) is None:
+            return self.path_towards(monster, target_pos)
+
+        doors = graph.route(monster.position, target_pos)
+
+        # no way even without considering what monster remembers
+        if doors is None:
+            return False, actions.DirectionEnum.CLIMB_UP, list()
+
+        # same region : search on places
+        if not doors:
+            return self.path_towards(monster, target_pos)
+
+        success, direction, path = self.path_towards(monster, doors[0])
+        if not success:
+            # something monster remembers in the way : search on places
+            return self.path_towards(monster, target_pos)
+        return success, direction, path
+
+    @staticmethod
+    def path_towards(monster: monsters.Monster, target_pos: typing.Tuple[int, int], from_pos: typing.Optional[typing.Tuple[int, int]] = None) -> typing.Tuple[bool, actions.DirectionEnum, typing.List[typing.Tuple[int, int]]]:
         """
-        An "A-star"-like home made algorithm for reaching a target
+        An "A-star"-like home made algorithm for reaching a target (from monster position or from given position)
         Returns :
           - is there a path ?
           - the direction to start using path
@@ -134,7 +459,7 @@ class MonstersAITools:
 
         infinite = math.sqrt(constants.DUNGEON_WIDTH**2 + constants.DUNGEON_HEIGHT**2)
 
-        mover_pos = monster.position
+        mover_pos = monster.position if from_pos is None else from_pos
         monster_level = monster.dungeon_level
 
         # set to remember where we have been
@@ -171,11 +496,12 @@ class MonstersAITools:
             for direction, (delta_x, delta_y) in actions.DIRECTION_2_DELTA.items():
 
                 # position
-                new_pos = considered_x + delta_x, considered_y + delta_y
+                new_x, new_y = considered_x + delta_x, considered_y + delta_y
+                new_pos = new_x, new_y
 
                 # ignore if diagonally and not diagonally passable
                 if direction.diagonal:
-                    if not monster_level.data[new_pos].may_access_diagonally() or not monster_level.data[considered_pos].may_access_diagonally():
+                    if not monster_level.data.may_access_diagonally(new_x, new_y) or not monster_level.data.may_access_diagonally(considered_x, considered_y):
                         continue
 
                 # ignore if not passable (or considered so) except for target
@@ -224,5 +550,106 @@ class MonstersAITools:
         return False, actions.DirectionEnum.CLIMB_UP, empty_path
 
 
+def test() -> None:
+    """ Lines of sight from table are the same as lines calculated each time (and faster) """
+
+    mylogger.start_logger(True)
+    constants.load_config()
+    myrandom.start_random()
+
+    def can_see_reference(monster: monsters.Monster, viewed_pos: typing.Tuple[int, int]) -> typing.Tuple[bool, typing.List[typing.Tuple[int, int]]]:
+        """ Bresenham algorim for drawing a line between two points (as it was before table) """
+
+        def _get_distance2(from_pos: typing.Tuple[int, int], to_pos: typing.Tuple[int, int]) -> float:
+            """ get_distance """
+            x_from, y_from = from_pos
+            x_to, y_to = to_pos
+            return math.sqrt((x_to - x_from) ** 2 + (y_to - y_from) ** 2)
+
+        def _sign(val: int) -> int:
+            """ sign """
+            if val < 0:
+                return -1
+            if val > 0:
+                return 1
+            return 0
+
+        line: typing.List[typing.Tuple[int, int]] = list()
+        viewer_pos = monster.position
+
+        # Rules that out
+        if _get_distance2(viewer_pos, viewed_pos) > constants.FOV_RADIUS:
+            return False, list()
+
+        x_orig, y_orig = viewer_pos
+        x_dest, y_dest = viewed_pos
+
+        width = x_dest - x_orig
+        height = y_dest - y_orig
+
+        delta_x1 = _sign(width)
+        delta_y1 = _sign(height)
+
+        longest = max(abs(width), abs(height))
+        shortest = min(abs(width), abs(height))
+
+        delta_x2 = _sign(width)
+        delta_y2 = 0
+        if not abs(width) > abs(height):
+            delta_x2 = 0
+            delta_y2 = _sign(height)
+
+        numerator = longest // 2
+
+        dist = 0
+        x_cur, y_cur = x_orig, y_orig
+        while True:
+            if dist >= longest:
+                break
+            numerator += shortest
+            if not numerator < longest:
+                numerator -= longest
+                x_cur += delta_x1
+                y_cur += delta_y1
+            else:
+                x_cur += delta_x2
+                y_cur += delta_y2
+            if MonstersAITools._blocks_vision(monster.dungeon_level, x_cur, y_cur):
+                return False, line
+            line.append((x_cur, y_cur))
+            dist += 1
+
+        return True, line
+
+    tools = MonstersAITools()
+
+    nb_checks = 0
+    t_table = 0.
+    t_reference = 0.
+    for level_class in roomlevel.RoomLevel, cavelevel.CaveLevel:
+        for num in range(3):
+            level = level_class(f"dummy {level_class.__name__} {num}", 1, "X", None)
+            level.convert_to_places()
+            for _ in range(NB_TEST_POSITIONS):
+                monster = monsters.Monster(monsters.MonsterTypeEnum.ORC, level, level.random_position(), 0)
+                x_monster, y_monster = monster.position
+                viewed_positions = [(x_monster + delta_x, y_monster + delta_y) for delta_x in range(-10, 11) for delta_y in range(-10, 11)]
+
+                t_before = time.perf_counter()
+                from_table = [tools.can_see(monster, pos) for pos in viewed_positions]
+                t_table += time.perf_counter() - t_before
+
+                t_before = time.perf_counter()
+                from_reference = [can_see_reference(monster, pos) for pos in viewed_positions]
+                t_reference += time.perf_counter() - t_before
+
+                assert from_table == from_reference, f"Lines of sight differ on {level.name} from {monster.position}"
+                nb_checks += len(viewed_positions)
+                level.data[monster.position].occupant = None
+
+    print(f"{nb_checks} lines of sight agree")
+    print(f"{t_table:.3f} s from table, {t_reference:.3f} s calculated each time")
+
+
 if __name__ == '__main__':
-    assert False, "Do not run this script"
+    test()
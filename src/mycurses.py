@@ -14,14 +14,27 @@ import os
 import constants
 import mylogger
 
+# no terminal at all (see headless.py)
+HEADLESS = False
+
 
 def color(front: int, back: int) -> int:
     """ color """
+    if HEADLESS:
+        return 0
     if front == 0 and back == 0:
         return curses.color_pair(8 * 8)
     return curses.color_pair(front * 8 + back)
 
 
+def beep() -> None:
+    """ tells user something is wrong (makes screen flash too) """
+    if HEADLESS:
+        return
+    curses.beep()  # does not work here ???
+    curses.flash()
+
+
 def curses_loop(stdscr: typing.Any, game_loop: typing.Callable[[typing.Any, typing.Any], None]) -> int:
     """ curses_loop """
 
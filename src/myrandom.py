@@ -12,6 +12,8 @@ import typing
 import time
 import random
 import sys
+import hashlib
+import contextlib
 
 import mylogger
 
@@ -176,6 +178,24 @@ def start_random() -> None:
     random.seed(SEED_VALUE)
 
 
+def derived_seed(name: str) -> int:
+    """ Seed of an independent stream (generation of a level...) : same seed value and same name give same seed """
+    assert SEED_VALUE is not None, "Random not started"
+    digest = hashlib.sha256(f"{SEED_VALUE} {name}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+@contextlib.contextmanager
+def derived_stream(name: str) -> typing.Iterator[None]:
+    """ Random module gives the independent stream of that name, then goes on where it was """
+    state = random.getstate()
+    random.seed(derived_seed(name))
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
 def restart_random() -> None:
     """ Get random seed from time and store it in logfile - used only in testing context """
     global SEED_VALUE
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+
+"""
+File : navigation.py
+
+Navigation graph of a level : regions (rooms, corridors, caves...) linked by doors.
+
+Regions are the parts of the level where one can walk without going through a door.
+They are got from the level itself so every type of level has a graph.
+Opening, closing or kicking a door does not change the regions, only says if the door may be gone through.
+Only a change elsewhere (secret corridor revealed...) makes regions be calculated again.
+
+Long paths are first found on the graph (from door to door) then on the places of the current region only.
+"""
+
+import typing
+import heapq
+import random
+import time
+
+import constants
+import mylogger
+import myrandom
+import actions
+import abstractlevel
+import roomlevel
+import cavelevel
+import mazelevel
+
+NB_TEST_POSITIONS = 100
+
+
+class NavigationGraph:
+    """ Navigation graph of a level """
+
+    def __init__(self, level: abstractlevel.AbstractLevel) -> None:
+
+        self._level = level
+        self._width = level.level_width
+        self._height = level.level_height
+
+        # region of every place (index is y * width + x), -1 for none (not walkable or door)
+        self._regions: typing.List[int] = list()
+
+        # doors (index) of every region, regions of every door (index) and doors next to every door
+        self._region_doors: typing.List[typing.Set[int]] = list()
+        self._door_regions: typing.Dict[int, typing.Set[int]] = dict()
+        self._door_doors: typing.Dict[int, typing.Set[int]] = dict()
+
+        # what regions were calculated from (walkability without doors) and last version of level seen
+        self._signature = b''
+        self._version = -1
+
+        # number of times regions were calculated
+        self._nb_builds = 0
+
+        self.update()
+
+    def _make_signature(self) -> bytes:
+        """ walkability of places except doors """
+        walkability = bytearray(self._level.walkability)
+        for index in self._level.data.door_table:
+            walkability[index] = 0
+        return bytes(walkability)
+
+    def _build(self) -> None:
+        """ calculates regions and links between them """
+
+        width = self._width
+        height = self._height
+        walkability = self._signature
+        diagonal_passability = self._level.diagonal_passability
+
+        self._regions = [-1] * (width * height)
+        self._region_doors = list()
+        self._door_regions = {index: set() for index in self._level.data.door_table}
+        self._door_doors = {index: set() for index in self._level.data.door_table}
+
+        # flood every region
+        for start_index in range(width * height):
+            if not walkability[start_index] or self._regions[start_index] != -1:
+                continue
+            region = len(self._region_doors)
+            self._region_doors.append(set())
+            self._regions[start_index] = region
+            stack = [start_index]
+            while stack:
+                index = stack.pop()
+                y_pos, x_pos = divmod(index, width)
+                for delta_x, delta_y in actions.DIRECTION_2_DELTA.values():
+                    new_x, new_y = x_pos + delta_x, y_pos + delta_y
+                    if new_x < 0 or new_y < 0 or new_x >= width or new_y >= height:
+                        continue
+                    new_index = new_y * width + new_x
+                    if delta_x and delta_y and not (diagonal_passability[index] and diagonal_passability[new_index]):
+                        continue
+                    if new_index in self._level.data.door_table:
+                        self._region_doors[region].add(new_index)
+                        self._door_regions[new_index].add(region)
+                        continue
+                    if not walkability[new_index] or self._regions[new_index] != -1:
+                        continue
+                    self._regions[new_index] = region
+                    stack.append(new_index)
+
+        # doors next to doors
+        for index in self._level.data.door_table:
+            y_pos, x_pos = divmod(index, width)
+            for delta_x, delta_y in actions.DIRECTION_2_DELTA.values():
+                new_x, new_y = x_pos + delta_x, y_pos + delta_y
+                if new_x < 0 or new_y < 0 or new_x >= width or new_y >= height:
+                    continue
+                new_index = new_y * width + new_x
+                if delta_x and delta_y and not (diagonal_passability[index] and diagonal_passability[new_index]):
+                    continue
+                if new_index in self._level.data.door_table:
+                    self._door_doors[index].add(new_index)
+
+        self._nb_builds += 1
+
+    def update(self) -> None:
+        """ calculates regions again if something else than a door changed """
+        if self._level.version == self._version:
+            return
+        self._version = self._level.version
+        signature = self._make_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._build()
+
+    def knows(self, position: typing.Tuple[int, int]) -> bool:
+        """ position is in a region or is a door """
+        x_pos, y_pos = position
+        if x_pos < 0 or y_pos < 0 or x_pos >= self._width or y_pos >= self._height:
+            return False
+        index = y_pos * self._width + x_pos
+        return self._regions[index] != -1 or index in self._door_regions
+
+    def region(self, position: typing.Tuple[int, int]) -> typing.Optional[int]:
+        """ region of position (None if not walkable or door) """
+        x_pos, y_pos = position
+        if x_pos < 0 or y_pos < 0 or x_pos >= self._width or y_pos >= self._height:
+            return None
+        region = self._regions[y_pos * self._width + x_pos]
+        if region == -1:
+            return None
+        return region
+
+    def route(self, from_pos: typing.Tuple[int, int], to_pos: typing.Tuple[int, int]) -> typing.Optional[typing.List[typing.Tuple[int, int]]]:
+        """
+        Doors to go through to go from a position to another (Dijkstra on doors, diagonal distance between them)
+        None if no route (or positions not known), empty list if same region
+        """
+
+        def _get_distance(index: int, position: typing.Tuple[int, int]) -> int:
+            """ get_distance (diagonal distance) """
+            y_index, x_index = divmod(index, self._width)
+            return max(abs(position[0] - x_index), abs(position[1] - y_index))
+
+        walkability = self._level.walkability
+
+        # starting on a door : from that door
+        from_door: typing.Optional[int] = from_pos[1] * self._width + from_pos[0]
+        if from_door not in self._door_regions:
+            from_door = None
+
+        from_region = self.region(from_pos)
+        to_region = self.region(to_pos)
+        if (from_region is None and from_door is None) or to_region is None:
+            return None
+        if from_region == to_region or (from_door is not None and to_region in self._door_regions[from_door]):
+            return list()
+
+        # nodes are doors (-1 is destination)
+        costs: typing.Dict[int, int] = dict()
+        predecessor: typing.Dict[int, int] = dict()
+        heap: typing.List[typing.Tuple[int, int]] = list()
+        start_doors = [(from_door, 0)] if from_door is not None else [(d, _get_distance(d, from_pos)) for d in self._region_doors[from_region] if walkability[d]]
+        for door, cost in start_doors:
+            costs[door] = cost
+            heapq.heappush(heap, (cost, door))
+
+        while heap:
+            cost, door = heapq.heappop(heap)
+            if cost > costs[door]:
+                continue
+            if door == -1:
+                break
+            door_pos = (door % self._width, door // self._width)
+            next_doors = [(d, 1) for d in self._door_doors[door] if walkability[d]]
+            for region in self._door_regions[door]:
+                next_doors.extend([(d, _get_distance(d, door_pos)) for d in self._region_doors[region] if d != door and walkability[d]])
+                if region == to_region:
+                    next_doors.append((-1, _get_distance(door, to_pos)))
+            for next_door, distance in next_doors:
+                next_cost = cost + distance
+                if next_door in costs and costs[next_door] <= next_cost:
+                    continue
+                costs[next_door] = next_cost
+                predecessor[next_door] = door
+                heapq.heappush(heap, (next_cost, next_door))
+
+        if -1 not in costs:
+            return None
+
+        doors = list()
+        door = predecessor[-1]
+        while True:
+            # door started from is not to go to
+            if door != from_door:
+                doors.append((door % self._width, door // self._width))
+            if door not in predecessor:
+                break
+            door = predecessor[door]
+        return list(reversed(doors))
+
+    @property
+    def nb_regions(self) -> int:
+        """ property """
+        return len(self._region_doors)
+
+    @property
+    def nb_builds(self) -> int:
+        """ property """
+        return self._nb_builds
+
+
+def navigation_graph(level: abstractlevel.AbstractLevel) -> NavigationGraph:
+    """ Navigation graph of a level, made the first time it is needed, up to date """
+    if level.navigation_graph is None:
+        level.navigation_graph = NavigationGraph(level)
+    level.navigation_graph.update()
+    return level.navigation_graph  # type: ignore
+
+
+def test() -> None:
+    """ Walking with graph reaches the same places as paths searched on places only """
+
+    # cannot import it at top (cycle)
+    import monsters
+    import monsters_ai_tools
+
+    mylogger.start_logger(True)
+    constants.load_config()
+    myrandom.start_random()
+
+    tools = monsters_ai_tools.MonstersAITools()
+
+    nb_paths = 0
+    nb_moves_graph = 0
+    nb_moves_places = 0
+    t_graph = 0.
+    t_places = 0.
+    for level_class in roomlevel.RoomLevel, cavelevel.CaveLevel, mazelevel.MazeLevel:
+        for num in range(3):
+            level = level_class(f"dummy {level_class.__name__} {num}", 1, "X", None)
+            level.convert_to_places()
+            doors = list(level.data.door_table.values())
+            for _ in range(NB_TEST_POSITIONS):
+
+                # open/close/kick some door
+                if doors:
+                    door = random.choice(doors)
+                    random.choice([door.open_door, door.close_door, door.kick_door])()
+
+                start_pos = level.random_position()
+                target_pos = level.random_position()
+                if target_pos == start_pos:
+                    continue
+                monster = monsters.Monster(monsters.MonsterTypeEnum.ORC, level, start_pos, 0)
+
+                # first move searched on places only
+                t_before = time.perf_counter()
+                success, _, path = tools.path_towards(monster, target_pos)
+                t_places += time.perf_counter() - t_before
+
+                # first move from graph
+                t_before = time.perf_counter()
+                success_graph, _, _ = tools.path_towards_far(monster, target_pos)
+                t_graph += time.perf_counter() - t_before
+                assert success_graph == success, f"Graph and places do not agree on {level.name} from {start_pos} to {target_pos}"
+
+                # walk along with graph
+                if success:
+                    nb_moves = 0
+                    while monster.position != target_pos:
+                        _, direction, _ = tools.path_towards_far(monster, target_pos)
+                        delta_x, delta_y = actions.DIRECTION_2_DELTA[direction]
+                        monster.moves_to(level, (monster.position[0] + delta_x, monster.position[1] + delta_y))
+                        nb_moves += 1
+                    nb_paths += 1
+                    nb_moves_graph += nb_moves
+                    nb_moves_places += len(path)
+
+                level.data[monster.position].occupant = None
+
+            print(f"{level.name} : {navigation_graph(level).nb_regions} regions {len(doors)} doors, so far first move : {t_graph:.3f} s with graph, {t_places:.3f} s on places only")
+
+    print(f"{nb_paths} paths walked : {nb_moves_graph} moves with graph, {nb_moves_places} moves searched on places")
+    print(f"first move : {t_graph:.3f} s with graph, {t_places:.3f} s on places only")
+
+
+if __name__ == '__main__':
+    test()
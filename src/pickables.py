@@ -8,6 +8,7 @@ Objects to be picked up and dropped
 """
 import typing
 import enum
+import contextlib
 
 import display
 
@@ -73,6 +74,27 @@ class Pickable(display.Displayable):
         return self._ident
 
 
+@contextlib.contextmanager
+def idents_from(first_ident: int, nb_idents: int) -> typing.Iterator[None]:
+    """ Items made meanwhile are numbered from that identifier (no more than that number of each class), then numbering goes on where it was """
+    saved_idents = {c: c.cur_ident for c in Pickable.__subclasses__()}
+    for item_class in saved_idents:
+        item_class.cur_ident = first_ident
+    try:
+        yield
+        for item_class in saved_idents:
+            assert item_class.cur_ident <= first_ident + nb_idents, f"More than {nb_idents} items of class {item_class.__name__} made, identifiers overlap"
+    finally:
+        for item_class, cur_ident in saved_idents.items():
+            item_class.cur_ident = cur_ident
+
+
+def keep_idents_below(ident: int) -> None:
+    """ Items made from now on are numbered from that identifier at least (those below are kept for others) """
+    for item_class in Pickable.__subclasses__():
+        item_class.cur_ident = max(item_class.cur_ident, ident)
+
+
 class Putable:
     """ Any thing that can be put  """
     pass
@@ -8,8 +8,10 @@ Handle tiles, things that are sitting in the dungeon.
 """
 
 import typing
+import abc
 import enum
 import itertools
+import array
 
 import display
 import hidden
@@ -105,78 +107,72 @@ class LightSourceRecord(typing.NamedTuple):
     light_radius: int
 
 
-class Place:
-    """ A place object """
+# items of a place without items (shared, never modified)
+NO_ITEMS: typing.Tuple[pickables.Pickable, ...] = ()
 
-    def __init__(self, tile: Tile) -> None:
-        self._tile = tile
-        self._inscription = ""
-        self._trap: typing.Optional[traps.Trap] = None
-        self._feature: typing.Optional[features.Feature] = None
-        self._door: typing.Optional[hidden.Door] = None
-        self._corridor: typing.Optional[hidden.Corridor] = None
-        self._items: typing.List[pickables.Pickable] = list()
-        self._occupant: typing.Optional[monsters.Occupant] = None
+
+class AbstractPlace(abc.ABC):
+    """ What is at a position of a level : all places must derive from this class """
 
     def display_glyph(self) -> str:
         """ what to display """
-        if self._occupant:
-            return self._occupant.glyph()
-        if self._items:
-            return self._items[0].glyph()
-        if self._corridor:
-            return self._corridor.glyph()
-        if self._door:
-            return self._door.glyph()
-        if self._feature:
-            return self._feature.glyph()
-        if self._trap:
-            return self._trap.glyph()
-        if self._inscription:
+        if self.occupant:
+            return self.occupant.glyph()
+        if self.items:
+            return self.items[0].glyph()
+        if self.corridor:
+            return self.corridor.glyph()
+        if self.door:
+            return self.door.glyph()
+        if self.feature:
+            return self.feature.glyph()
+        if self.trap:
+            return self.trap.glyph()
+        if self.inscription:
             return ","
-        return self._tile.glyph()
+        return self.tile.glyph()
 
     def bumped_into(self) -> str:
         """ bumped into what ? """
-        if self._corridor:
-            return self._corridor.whatis()
-        if self._door:
-            return self._door.whatis()
-        if self._feature:
-            return self._feature.whatis()
-        return self._tile.whatis()
+        if self.corridor:
+            return self.corridor.whatis()
+        if self.door:
+            return self.door.whatis()
+        if self.feature:
+            return self.feature.whatis()
+        return self.tile.whatis()
 
     def all_that_is_there(self) -> typing.List[str]:
         """ what to say whe saying all that is there """
         is_there = list()
-        if self._occupant:
-            desc = self._occupant.whatis()
+        if self.occupant:
+            desc = self.occupant.whatis()
             is_there.append(f"There is {desc} at this position")
-        elif self._items:
-            if len(self._items) > 1:
+        elif self.items:
+            if len(self.items) > 1:
                 is_there.append(f"There are several objects at this position")
             else:
-                item = self._items[0]
+                item = self.items[0]
                 desc = item.whatis()
                 is_there.append(f"There is {desc} at this position")
-        elif self._corridor:
-            desc = self._corridor.whatis()
+        elif self.corridor:
+            desc = self.corridor.whatis()
             is_there.append(f"There is {desc} at this position")
-        elif self._door:
-            desc = self._door.whatis()
+        elif self.door:
+            desc = self.door.whatis()
             is_there.append(f"There is {desc} at this position")
-        elif self._feature:
-            desc = self._feature.whatis()
+        elif self.feature:
+            desc = self.feature.whatis()
             is_there.append(f"There is {desc} at this position")
         if not is_there:
-            desc = self._tile.whatis()
+            desc = self.tile.whatis()
             is_there.append(f"There is {desc} at this position")
         return is_there
 
     def blocks_vision(self) -> bool:
         """
         Does place block vision ?
-        Note : this seems to be the method by far cosuming the most CPU time...
+        Note : places of a level grid answer from the opacity bitmap instead (this used to be the method by far consuming the most CPU time)
         """
 
         # matter or walls block vision
@@ -254,11 +250,73 @@ class Place:
                 messages.append(f"It says : \"{headstone.inscription}\" ")
 
         # from tile directly
-        if self._inscription:
+        if self.inscription:
             messages.append("There is a graffiti written here...")
-            messages.append(f"It says : \"{self._inscription}\" ")
+            messages.append(f"It says : \"{self.inscription}\" ")
         return messages
 
+    @property
+    @abc.abstractmethod
+    def tile(self) -> Tile:
+        """ property """
+
+    @property
+    @abc.abstractmethod
+    def corridor(self) -> typing.Optional[hidden.Corridor]:
+        """ property """
+
+    @property
+    @abc.abstractmethod
+    def door(self) -> typing.Optional[hidden.Door]:
+        """ property """
+
+    @property
+    @abc.abstractmethod
+    def feature(self) -> typing.Optional[features.Feature]:
+        """ property """
+
+    @property
+    @abc.abstractmethod
+    def trap(self) -> typing.Optional[traps.Trap]:
+        """ property """
+
+    @property
+    @abc.abstractmethod
+    def inscription(self) -> str:
+        """ property """
+
+    @property
+    @abc.abstractmethod
+    def items(self) -> typing.Sequence[pickables.Pickable]:
+        """ property """
+
+    @abc.abstractmethod
+    def add_item(self, item: pickables.Pickable) -> None:
+        """ item put there """
+
+    @abc.abstractmethod
+    def remove_item(self, item: pickables.Pickable) -> None:
+        """ item taken from there """
+
+    @property
+    @abc.abstractmethod
+    def occupant(self) -> typing.Optional[monsters.Occupant]:
+        """ property """
+
+
+class Place(AbstractPlace):
+    """ A place object (standalone, used when building levels) """
+
+    def __init__(self, tile: Tile) -> None:
+        self._tile = tile
+        self._inscription = ""
+        self._trap: typing.Optional[traps.Trap] = None
+        self._feature: typing.Optional[features.Feature] = None
+        self._door: typing.Optional[hidden.Door] = None
+        self._corridor: typing.Optional[hidden.Corridor] = None
+        self._items: typing.List[pickables.Pickable] = list()
+        self._occupant: typing.Optional[monsters.Occupant] = None
+
     @property
     def tile(self) -> Tile:
         """ property """
@@ -294,6 +352,11 @@ class Place:
         """ setter """
         self._feature = feature
 
+    @property
+    def trap(self) -> typing.Optional[traps.Trap]:
+        """ property """
+        return self._trap
+
     @property
     def inscription(self) -> str:
         """ property """
@@ -305,10 +368,18 @@ class Place:
         self._inscription = inscription
 
     @property
-    def items(self) -> typing.List[pickables.Pickable]:
+    def items(self) -> typing.Sequence[pickables.Pickable]:
         """ property """
         return self._items
 
+    def add_item(self, item: pickables.Pickable) -> None:
+        """ item put there """
+        self._items.append(item)
+
+    def remove_item(self, item: pickables.Pickable) -> None:
+        """ item taken from there """
+        self._items.remove(item)
+
     @property
     def occupant(self) -> typing.Optional[monsters.Occupant]:
         """ property """
@@ -320,6 +391,453 @@ class Place:
         self._occupant = occupant
 
 
+# tile types are stored in the level grid as their rank in this table (so matter is 0)
+TILE_TYPES = list(TileTypeEnum)
+TILE_TYPE_CODES = {t: n for n, t in enumerate(TILE_TYPES)}
+
+# tiles have no state : one shared tile per type is enough
+TILES = [Tile(t) for t in TILE_TYPES]
+
+# per tile type code, what the tile says without considering what is on it
+TILE_BLOCKS_VISION = bytes(t.blocks_vision for t in TILE_TYPES)
+TILE_MAY_ACCESS = bytes(t in [TileTypeEnum.GROUND_TILE, TileTypeEnum.STAIRS_DOWN, TileTypeEnum.STAIRS_UP] for t in TILE_TYPES)
+GROUND_TILE_CODE = TILE_TYPE_CODES[TileTypeEnum.GROUND_TILE]
+
+# door statuses in door plane (0 means no door)
+DOOR_CODES_ACCESS = frozenset(s.value for s in [hidden.DoorStatusEnum.OPENED, hidden.DoorStatusEnum.DESTROYED])
+DOOR_CODES_BLOCK = frozenset(s.value for s in [hidden.DoorStatusEnum.CLOSED, hidden.DoorStatusEnum.LOCKED])
+
+
+class GridPlace(AbstractPlace):
+    """ A place of a level grid : just a view on the planes of the grid """
+
+    __slots__ = ('_grid', '_index')
+
+    def __init__(self, grid: 'LevelGrid', index: int) -> None:
+        self._grid = grid
+        self._index = index
+
+    def blocks_vision(self) -> bool:
+        """ Does place block vision ? (answered from the bitmaps) """
+        return bool(self._grid.opacity[self._index])
+
+    def may_access(self) -> bool:
+        """ Can place be accessed (walked on) ? (answered from the bitmaps) """
+        return bool(self._grid.walkability[self._index])
+
+    def may_access_diagonally(self) -> bool:
+        """ may_access_diagonally (answered from the bitmaps) """
+        return bool(self._grid.diagonal_passability[self._index])
+
+    @property
+    def tile(self) -> Tile:
+        """ property """
+        return TILES[self._grid.tile_plane[self._index]]
+
+    @property
+    def corridor(self) -> typing.Optional[hidden.Corridor]:
+        """ property """
+        return self._grid.corridor_table.get(self._index)
+
+    @corridor.setter
+    def corridor(self, corridor: typing.Optional[hidden.Corridor]) -> None:
+        """ setter """
+        self._grid.set_corridor(self._index, corridor)
+
+    @property
+    def door(self) -> typing.Optional[hidden.Door]:
+        """ property """
+        return self._grid.door_table.get(self._index)
+
+    @door.setter
+    def door(self, door: typing.Optional[hidden.Door]) -> None:
+        """ setter """
+        self._grid.set_door(self._index, door)
+
+    @property
+    def feature(self) -> typing.Optional[features.Feature]:
+        """ property """
+        return self._grid.feature_table.get(self._index)
+
+    @feature.setter
+    def feature(self, feature: typing.Optional[features.Feature]) -> None:
+        """ setter """
+        self._grid.set_feature(self._index, feature)
+
+    @property
+    def trap(self) -> typing.Optional[traps.Trap]:
+        """ property """
+        return self._grid.trap_table.get(self._index)
+
+    @property
+    def inscription(self) -> str:
+        """ property """
+        return self._grid.inscription_table.get(self._index, "")
+
+    @inscription.setter
+    def inscription(self, inscription: str) -> None:
+        """ setter """
+        self._grid.set_inscription(self._index, inscription)
+
+    @property
+    def items(self) -> typing.Sequence[pickables.Pickable]:
+        """ property (nothing stored when reading a place without items) """
+        return self._grid.item_table.get(self._index, NO_ITEMS)
+
+    def add_item(self, item: pickables.Pickable) -> None:
+        """ item put there """
+        self._grid.add_item(self._index, item)
+
+    def remove_item(self, item: pickables.Pickable) -> None:
+        """ item taken from there """
+        self._grid.remove_item(self._index, item)
+
+    @property
+    def occupant(self) -> typing.Optional[monsters.Occupant]:
+        """ property """
+        return self._grid.occupant_table.get(self._grid.occupant_plane[self._index])
+
+    @occupant.setter
+    def occupant(self, occupant: typing.Optional[monsters.Occupant]) -> None:
+        """ setter """
+        self._grid.set_occupant(self._index, occupant)
+
+
+class LevelGrid:
+    """
+    Actual data of a level.
+    Dense information is in planes indexed by y * width + x, the rest is in sparse tables indexed the same way.
+    Reading it at a position gives a place (view) so it can be used as a dict of places.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+
+        self._width = width
+        self._height = height
+        size = width * height
+
+        # planes : all tiles on level are matter until otherwise specified
+        self._tile_plane = bytearray(size)
+        # door status value (0 : no door)
+        self._door_plane = bytearray(size)
+        # door or corridor is secret
+        self._secret_plane = bytearray(size)
+        # key in occupant table (0 : no occupant)
+        self._occupant_plane = array.array('I', bytes(4 * size))
+
+        # bitmaps derived from the planes, kept up to date when a place changes (matter blocks vision, cannot be walked on)
+        self._opacity = bytearray(b'\x01' * size)
+        self._walkability = bytearray(size)
+        self._diagonal_passability = bytearray(b'\x01' * size)
+
+        # changes each time one of the bitmaps changes (to detect stale caches)
+        self._version = 0
+
+        # changes each time opacity bitmap changes (to detect stale fields of view)
+        self._opacity_version = 0
+
+        # called with index of place each time opacity changes there
+        self._opacity_listeners: typing.List[typing.Callable[[int], None]] = list()
+
+        # sparse tables
+        self._doors: typing.Dict[int, hidden.Door] = dict()
+        self._corridors: typing.Dict[int, hidden.Corridor] = dict()
+        self._features: typing.Dict[int, features.Feature] = dict()
+        self._traps: typing.Dict[int, traps.Trap] = dict()
+        self._inscriptions: typing.Dict[int, str] = dict()
+        self._items: typing.Dict[int, typing.List[pickables.Pickable]] = dict()
+        self._occupant_table: typing.Dict[int, monsters.Occupant] = dict()
+        self._occupant_identifier = itertools.count(1)
+
+    def _index(self, pos: typing.Tuple[int, int]) -> int:
+        """ index in planes of a position (KeyError if outside like a dict) """
+        x_pos, y_pos = pos
+        if not (0 <= x_pos < self._width and 0 <= y_pos < self._height):
+            raise KeyError(pos)
+        return y_pos * self._width + x_pos
+
+    def __getitem__(self, pos: typing.Tuple[int, int]) -> GridPlace:
+        return GridPlace(self, self._index(pos))
+
+    def __setitem__(self, pos: typing.Tuple[int, int], place: AbstractPlace) -> None:
+        """ the place is decomposed in the planes and tables """
+        index = self._index(pos)
+        self._tile_plane[index] = TILE_TYPE_CODES[place.tile.mytype]
+        self.set_door(index, place.door)
+        self.set_corridor(index, place.corridor)
+        self.set_feature(index, place.feature)
+        self._store(self._traps, index, place.trap)
+        self.set_inscription(index, place.inscription)
+        self._store(self._items, index, list(place.items))
+        self.set_occupant(index, place.occupant)
+        self._refresh(index)
+
+    def __contains__(self, pos: typing.Any) -> bool:
+        x_pos, y_pos = pos
+        return 0 <= x_pos < self._width and 0 <= y_pos < self._height
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[int, int]]:
+        # same order as the dict this replaces
+        for x_pos in range(self._width):
+            for y_pos in range(self._height):
+                yield x_pos, y_pos
+
+    def __len__(self) -> int:
+        return self._width * self._height
+
+    def values(self) -> typing.Iterator[GridPlace]:
+        """ like a dict """
+        for pos in self:
+            yield self[pos]
+
+    @staticmethod
+    def _store(table: typing.Dict[int, typing.Any], index: int, value: typing.Any) -> None:
+        """ put in a sparse table, nothing is not stored """
+        if value:
+            table[index] = value
+        else:
+            table.pop(index, None)
+
+    def _refresh_secret(self, index: int) -> None:
+        """ update planes from the door or corridor at index """
+        door = self._doors.get(index)
+        corridor = self._corridors.get(index)
+        self._door_plane[index] = door.status.value if door else 0
+        self._secret_plane[index] = bool((door and door.secret) or (corridor and corridor.secret))
+
+    def _refresh(self, index: int) -> None:
+        """ update bitmaps at index from the planes """
+        opaque = self._compute_blocks_vision(index)
+        walkable = self._compute_may_access(index)
+        diagonal = self._compute_may_access_diagonally(index)
+        if opaque != self._opacity[index] or walkable != self._walkability[index] or diagonal != self._diagonal_passability[index]:
+            opacity_changed = opaque != self._opacity[index]
+            self._opacity[index] = opaque
+            self._walkability[index] = walkable
+            self._diagonal_passability[index] = diagonal
+            self._version += 1
+            if opacity_changed:
+                self._opacity_changed(index)
+
+    def secret_changed(self, secret: hidden.Secret) -> None:
+        """ called by a door or corridor of the level that changed """
+        index = self._index(secret.position)
+        self._refresh_secret(index)
+        self._refresh(index)
+
+    def set_door(self, index: int, door: typing.Optional[hidden.Door]) -> None:
+        """ setter """
+        old_door = self._doors.get(index)
+        if old_door is not None and old_door is not door:
+            old_door.watcher = None
+        self._store(self._doors, index, door)
+        if door:
+            door.watcher = self
+        self._refresh_secret(index)
+        self._refresh(index)
+
+    def set_corridor(self, index: int, corridor: typing.Optional[hidden.Corridor]) -> None:
+        """ setter """
+        old_corridor = self._corridors.get(index)
+        if old_corridor is not None and old_corridor is not corridor:
+            old_corridor.watcher = None
+        self._store(self._corridors, index, corridor)
+        if corridor:
+            corridor.watcher = self
+        self._refresh_secret(index)
+        self._refresh(index)
+
+    def set_feature(self, index: int, feature: typing.Optional[features.Feature]) -> None:
+        """ setter """
+        self._store(self._features, index, feature)
+
+    def set_inscription(self, index: int, inscription: str) -> None:
+        """ setter """
+        self._store(self._inscriptions, index, inscription)
+
+    def set_occupant(self, index: int, occupant: typing.Optional[monsters.Occupant]) -> None:
+        """ setter """
+        old_identifier = self._occupant_plane[index]
+        if old_identifier:
+            del self._occupant_table[old_identifier]
+        if occupant:
+            identifier = next(self._occupant_identifier)
+            self._occupant_table[identifier] = occupant
+            self._occupant_plane[index] = identifier
+        else:
+            self._occupant_plane[index] = 0
+        # only opacity depends on occupant
+        opaque = self._compute_blocks_vision(index)
+        if opaque != self._opacity[index]:
+            self._opacity[index] = opaque
+            self._version += 1
+            self._opacity_changed(index)
+
+    def _opacity_changed(self, index: int) -> None:
+        """ tell listeners """
+        self._opacity_version += 1
+        for listener in self._opacity_listeners:
+            listener(index)
+
+    def add_opacity_listener(self, listener: typing.Callable[[int], None]) -> None:
+        """ listener will be called with index of place each time opacity changes there """
+        self._opacity_listeners.append(listener)
+
+    def add_item(self, index: int, item: pickables.Pickable) -> None:
+        """ item put at index (list of items made then) """
+        self._items.setdefault(index, list()).append(item)
+
+    def remove_item(self, index: int, item: pickables.Pickable) -> None:
+        """ item taken from index (list of items removed when empty) """
+        items = self._items[index]
+        items.remove(item)
+        if not items:
+            del self._items[index]
+
+    def _compute_blocks_vision(self, index: int) -> bool:
+        """ Does place at index block vision ? """
+
+        # matter or walls block vision
+        tile_code = self._tile_plane[index]
+        if TILE_BLOCKS_VISION[tile_code]:
+            return True
+
+        # secret door or corridor or closed door block vision
+        if tile_code == GROUND_TILE_CODE:
+            if self._secret_plane[index] or self._door_plane[index] in DOOR_CODES_BLOCK:
+                return True
+
+        # some occupants may block vision
+        identifier = self._occupant_plane[index]
+        if identifier:
+            return self._occupant_table[identifier].blocks_vision()
+
+        return False
+
+    def _compute_may_access(self, index: int) -> bool:
+        """ Can place at index be accessed (walked on) ? """
+        tile_code = self._tile_plane[index]
+        if not TILE_MAY_ACCESS[tile_code]:
+            return False
+        if tile_code == GROUND_TILE_CODE:
+            if self._secret_plane[index]:
+                return False
+            door_code = self._door_plane[index]
+            if door_code and index not in self._corridors:
+                return door_code in DOOR_CODES_ACCESS
+        return True
+
+    def _compute_may_access_diagonally(self, index: int) -> bool:
+        """ may_access_diagonally for place at index """
+        return not (self._door_plane[index] and self._tile_plane[index] == GROUND_TILE_CODE)
+
+    def blocks_vision(self, x_pos: int, y_pos: int) -> bool:
+        """ Does place block vision ? (outside level does) """
+        if x_pos < 0 or y_pos < 0 or x_pos >= self._width or y_pos >= self._height:
+            return True
+        return bool(self._opacity[y_pos * self._width + x_pos])
+
+    def may_access(self, x_pos: int, y_pos: int) -> bool:
+        """ Can place be accessed (walked on) ? (outside level cannot) """
+        if x_pos < 0 or y_pos < 0 or x_pos >= self._width or y_pos >= self._height:
+            return False
+        return bool(self._walkability[y_pos * self._width + x_pos])
+
+    def may_access_diagonally(self, x_pos: int, y_pos: int) -> bool:
+        """ may_access_diagonally (outside level cannot) """
+        if x_pos < 0 or y_pos < 0 or x_pos >= self._width or y_pos >= self._height:
+            return False
+        return bool(self._diagonal_passability[y_pos * self._width + x_pos])
+
+    def free_accessible_positions(self) -> typing.List[typing.Tuple[int, int]]:
+        """ positions that can be accessed and have no occupant """
+        return [(x_pos, y_pos) for (x_pos, y_pos) in self if self._walkability[y_pos * self._width + x_pos] and not self._occupant_plane[y_pos * self._width + x_pos]]
+
+    def secrets(self) -> typing.List[hidden.Secret]:
+        """ all doors and corridors of the level """
+        return [*self._doors.values(), *self._corridors.values()]
+
+    @property
+    def width(self) -> int:
+        """ property """
+        return self._width
+
+    @property
+    def height(self) -> int:
+        """ property """
+        return self._height
+
+    @property
+    def opacity(self) -> bytearray:
+        """ property """
+        return self._opacity
+
+    @property
+    def walkability(self) -> bytearray:
+        """ property """
+        return self._walkability
+
+    @property
+    def diagonal_passability(self) -> bytearray:
+        """ property """
+        return self._diagonal_passability
+
+    @property
+    def version(self) -> int:
+        """ property """
+        return self._version
+
+    @property
+    def opacity_version(self) -> int:
+        """ property """
+        return self._opacity_version
+
+    @property
+    def tile_plane(self) -> bytearray:
+        """ property """
+        return self._tile_plane
+
+    @property
+    def occupant_plane(self) -> array.array:  # type: ignore
+        """ property """
+        return self._occupant_plane
+
+    @property
+    def occupant_table(self) -> typing.Dict[int, monsters.Occupant]:
+        """ property """
+        return self._occupant_table
+
+    @property
+    def door_table(self) -> typing.Dict[int, hidden.Door]:
+        """ property """
+        return self._doors
+
+    @property
+    def corridor_table(self) -> typing.Dict[int, hidden.Corridor]:
+        """ property """
+        return self._corridors
+
+    @property
+    def feature_table(self) -> typing.Dict[int, features.Feature]:
+        """ property """
+        return self._features
+
+    @property
+    def trap_table(self) -> typing.Dict[int, traps.Trap]:
+        """ property """
+        return self._traps
+
+    @property
+    def inscription_table(self) -> typing.Dict[int, str]:
+        """ property """
+        return self._inscriptions
+
+    @property
+    def item_table(self) -> typing.Dict[int, typing.List[pickables.Pickable]]:
+        """ property """
+        return self._items
+
+
 def test() -> None:
     """ test """
 
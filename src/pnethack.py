@@ -18,8 +18,6 @@ import argparse
 import os
 import collections
 
-import cProfile
-import pstats
 
 import constants
 import mylogger
@@ -38,15 +36,15 @@ import actions
 import command
 import monsters
 import monsters_ai
+import headless
+import journal
+import instrument
 
 # to use debugger with wing ide
 # 1) edit/preferences/Debugger/listening/accept_debug_connections  must be set
 # 2) uncomment line below
 # import debug.wingdbstub
 
-# Set this to true to profile functions
-PROFILE = False
-
 
 def game_loop(stdscr: typing.Any, window: typing.Any) -> None:
     """ game loop """
@@ -56,24 +54,41 @@ def game_loop(stdscr: typing.Any, window: typing.Any) -> None:
         # loops until game command is issued (command that affects simulation)
         while True:
 
+            # fast forward : nothing displayed while replaying journal
+            replaying = journal.REPLAY is not None and journal.REPLAY.goes_on(my_sequencer.round_now + 1)
+
             # evaluate and display mapping
             my_map.do_place_observer(current_position)
             my_map.do_light_effects()
             my_map.do_update_fov()
             my_map.do_update_has_seen()
-            my_map.display(window)
+            if not replaying:
+                my_map.display(window)
             messages = my_map.check_special_rooms(my_hero.hero_alignment) + my_map.check_engravings()
             for message in messages:
                 my_messages.store(message)
 
-            # display all stored messages on screen (must be after)
-            my_messages.display()
+            if replaying:
+                my_messages.skip_unread()
+
+            else:
+
+                # display all stored messages on screen (must be after)
+                my_messages.display()
+
+                # evaluate and display status of hero
+                turn = my_sequencer.turn()
+                content = my_hero.give_status(turn)
 
-            # evaluate and display status of hero
-            turn = my_sequencer.turn()
-            content = my_hero.give_status(turn)
-            my_status.store(content)
-            my_status.display()
+                # performance overlay (debug) instead of last line
+                if instrument.OVERLAY:
+                    content = (content[0], content[1], instrument.overlay_line(my_sequencer))
+
+                my_status.store(content)
+                my_status.display()
+
+            # levels next to this one made in background while player thinks
+            my_dungeon.prefetch_around(my_hero.dungeon_level)
 
             # loops until input from player is correct
             while True:
@@ -99,7 +114,7 @@ def game_loop(stdscr: typing.Any, window: typing.Any) -> None:
 
     # ========== begin ============
 
-    # create the whole dungeon
+    # create the dungeon (levels made when first reached)
     my_dungeon = dungeon.Dungeon()
     mylogger.LOGGER.info("dungeon created")
 
@@ -126,8 +141,17 @@ def game_loop(stdscr: typing.Any, window: typing.Any) -> None:
     # engine for keyboard help
     my_keyboard_help = gui.KeyboardHelp(window, constants.MESSAGES_BUFFER_SIZE + constants.PROMPT_BUFFER_SIZE + constants.DUNGEON_HEIGHT + constants.STATUS_INFORMATION_SIZE, constants.DUNGEON_WIDTH)
 
-    # gui singleton
-    my_gui = gui.Gui(window, stdscr, my_keyboard_help, my_hero)
+    # gui singleton (answers come from driver when headless, from journal when replaying)
+    if mycurses.HEADLESS:
+        my_gui: gui.Gui = headless.HeadlessGui(window, stdscr, my_keyboard_help, my_hero)
+    elif journal.REPLAY is not None:
+        my_gui = journal.ReplayGui(window, stdscr, my_keyboard_help, my_hero, journal.REPLAY)
+    else:
+        my_gui = gui.Gui(window, stdscr, my_keyboard_help, my_hero)
+
+    # what player says is written in journal
+    if journal.JOURNAL is not None:
+        journal.JOURNAL.record(my_gui)
 
     # engine for messages
     my_messages = gui.Messages(window, my_gui, 0, constants.MESSAGES_BUFFER_SIZE, constants.DUNGEON_WIDTH)
@@ -147,11 +171,15 @@ def game_loop(stdscr: typing.Any, window: typing.Any) -> None:
     # artifical intelligence tool for monsters
     my_monsters_ai = monsters_ai.MonstersAI(my_hero)
 
+    # paths of monsters watched by instrumentation (performance overlay)
+    instrument.watch_paths(my_monsters_ai.tools)
+
     # object that will handle command from player
     my_command_handler = command.CommandHandler(my_hero, my_messages, my_gui, my_dungeon, my_monsters_ai)
 
     # part that is constant for actions
     actions.Action.the_messages = my_messages
+    actions.Action.the_dungeon = my_dungeon
 
     # actions to do from command
     my_actions: typing.Deque[actions.Action] = collections.deque([])
@@ -159,55 +187,51 @@ def game_loop(stdscr: typing.Any, window: typing.Any) -> None:
     # sequencer
     my_sequencer = sequencer.Sequencer()
 
+    # sequencer and artifical intelligence follow lives of monsters
+    monsters.LIFECYCLE.add_listener(my_sequencer.life_changed)
+    monsters.LIFECYCLE.add_listener(my_monsters_ai.life_changed)
+
     # over all game loop
     while True:
 
         # simulation loop
         while True:
 
-            # monsters standby -> ready (back)
-            while monsters.Monster.standby_ones:
-                monster = monsters.Monster.standby_ones.popleft()
-                monsters.Monster.ready_ones.append(monster)
-
-            # monsters rising -> ready + register
-            while monsters.Monster.rising_ones:
-                monster = monsters.Monster.rising_ones.popleft()
-                my_sequencer.register(monster)
-                my_monsters_ai.register(monster)
-                monsters.Monster.ready_ones.append(monster)
-
-            # monsters ready -> standby + action
-            while monsters.Monster.ready_ones:
-                monster = monsters.Monster.ready_ones.popleft()
-
-                if my_sequencer.can_do_something(monster):
-
-                    if monster.is_hero():
-                        # in this case we need player to say what to do
-                        if not my_actions:
-                            get_instructions()
-                        if my_command_handler.must_quit:
-                            return
-                        action = my_actions.popleft()
-                        my_sequencer.starts_doing(monster, action)
+            # monsters rising -> active (only monsters on level of hero are simulated)
+            monsters.LIFECYCLE.activate_rising(my_hero.dungeon_level, my_sequencer.round_now)
 
-                    else:
-                        # in this case we monster A.I. to say what to do
-                        action = my_monsters_ai.give_action(monster)
-                        my_sequencer.starts_doing(monster, action)
+            # monsters that can do something -> action
+            for monster in my_sequencer.due_actors():
+
+                # killed by one that did something before
+                if monster.life_state is monsters.LifeStateEnum.DEAD:
+                    continue
 
-                monsters.Monster.standby_ones.append(monster)
+                if monster.is_hero():
+                    # in this case we need player to say what to do
+                    if not my_actions:
+                        get_instructions()
+                    if my_command_handler.must_quit:
+                        return
+                    action = my_actions.popleft()
+                    my_sequencer.starts_doing(monster, action)
+                    if instrument.INSTRUMENTS is not None:
+                        instrument.INSTRUMENTS.count("hero actions")
 
-            # monsters dead -> void + unregister
-            while monsters.Monster.dead_ones:
-                monster = monsters.Monster.dead_ones.popleft()
-                my_sequencer.unregister(monster)
-                my_monsters_ai.unregister(monster)
+                else:
+                    # in this case we monster A.I. to say what to do
+                    action = my_monsters_ai.give_action(monster)
+                    my_sequencer.starts_doing(monster, action)
+                    if instrument.INSTRUMENTS is not None:
+                        instrument.INSTRUMENTS.count("monster actions")
 
             # makes everyone progress
             my_sequencer.tick()
 
+            # aggregates of instrumentation written every turn
+            if instrument.INSTRUMENTS is not None:
+                instrument.INSTRUMENTS.turn_over(my_sequencer.round_now)
+
             # where is my hero now ?
             current_level = my_hero.dungeon_level
             current_position = my_hero.position
@@ -237,6 +261,12 @@ def game_loop(stdscr: typing.Any, window: typing.Any) -> None:
                     if previous_level:
                         my_hero.note_mapping(previous_level, my_map)
 
+                        # monsters of level quitted are not simulated any more
+                        monsters.LIFECYCLE.fall_dormant_level(previous_level, my_sequencer.round_now)
+
+                    # monsters of level entered catch up and are simulated again
+                    monsters.LIFECYCLE.wake_up_level(current_level, my_sequencer.round_now)
+
                     # store messages from entering level to display
                     my_map = mapping.Mapping(current_level)
                     messages = my_map.enter_level()
@@ -270,6 +300,14 @@ def main() -> None:
     parser.add_argument('-l', '--load', required=False, help='load a special level to test it')
     parser.add_argument('-r', '--reverse', required=False, help='start level in stairs going down instead of up', action='store_true')
     parser.add_argument('-f', '--force', required=False, help='force log file to be simpler', action='store_true')
+    parser.add_argument('-H', '--headless', required=False, help='run without terminal, hero moved by a driver, report speed at end', action='store_true')
+    parser.add_argument('-S', '--script', required=False, help='when headless read commands of hero from file instead of exploring at random')
+    parser.add_argument('-n', '--commands', required=False, help='when headless and exploring at random give the number of commands')
+    parser.add_argument('-R', '--replay', required=False, help='play again game of a journal (seed and options from journal)')
+    parser.add_argument('-u', '--until', required=False, help='when replaying display nothing until that turn')
+    parser.add_argument('-i', '--instrument', required=False, help='time hot paths and write aggregates of every turn in log directory', action='store_true')
+    parser.add_argument('-P', '--parallel', required=False, help='build levels of dungeon on all cores (same dungeon anyway)', action='store_true')
+    parser.add_argument('-b', '--nobackground', required=False, help='do not build levels next to the one of hero in background (never done when headless or replaying)', action='store_true')
     args = parser.parse_args()
     # print(args)
 
@@ -277,6 +315,13 @@ def main() -> None:
     mylogger.start_logger(force_simpler)
     mylogger.LOGGER.info("Normal start.=============================")
 
+    # replaying : game is started as it was
+    if args.replay:
+        print("Replaying a journal")
+        replay = journal.start_replay(args.replay, int(args.until) if args.until else None)
+        for option in 'seed', 'debug', 'generate', 'depth', 'load', 'reverse':
+            setattr(args, option, replay.header[option])
+
     if args.seed:
         myrandom.force_seed(int(args.seed))
 
@@ -302,16 +347,52 @@ def main() -> None:
         if args.reverse:
             constants.REVERSE = True
 
+    if args.parallel:
+        print("Building levels in parallel")
+        mylogger.LOGGER.info("Building levels in parallel")
+        constants.PARALLEL_GENERATION = True
+
     # random god
     myrandom.start_random()
 
+    # journal of what player says
+    journal.start_journal(force_simpler, {'seed': myrandom.SEED_VALUE, 'debug': args.debug, 'generate': args.generate, 'depth': args.depth, 'load': args.load, 'reverse': args.reverse})
+
     # important to work in unicode !
     locale.setlocale(locale.LC_ALL, '')
 
     # load constants from file to constants module
     constants.load_config()
 
-    mycurses.start(game_loop)
+    # timers and counters
+    if args.instrument:
+        print("Instrumenting")
+        mylogger.LOGGER.info("Instrumenting")
+        instrument.start(force_simpler)
+
+    # levels next to the one of hero made in background (all made at start when parallel, not when measuring or replaying)
+    if not (args.nobackground or args.parallel or args.headless or args.replay):
+        dungeon.start_prefetch()
+
+    try:
+        if args.headless:
+            print("Running headless")
+            mylogger.LOGGER.info("Running headless")
+            if journal.REPLAY is not None:
+                driver: headless.Driver = journal.REPLAY
+            elif args.script:
+                driver = headless.ScriptDriver(args.script)
+            else:
+                nb_commands = int(args.commands) if args.commands else headless.NB_RANDOM_COMMANDS
+                driver = headless.RandomDriver(myrandom.SEED_VALUE, nb_commands)
+            headless.start(game_loop, driver)
+        else:
+            mycurses.start(game_loop)
+
+    finally:
+        # levels not started cancelled and what was timed written even if game crashed
+        dungeon.stop_prefetch()
+        instrument.stop()
 
     mylogger.LOGGER.info("Normal termination.===========================")
 
@@ -322,19 +403,6 @@ if __name__ == '__main__':
         print("Ok to debug")
         time.sleep(1)
 
-    # this if script too slow and profile it
-    if PROFILE:
-        PR = cProfile.Profile()
-
-        PR.enable()  # uncomment to have profile stats
     main()
-    if PROFILE:
-        PR.disable()
-
-        # stats
-        PS = pstats.Stats(PR)
-        PS.strip_dirs()
-        PS.sort_stats('time')
-        PS.print_stats()  # uncomment to have profile stats
 
     sys.exit(0)
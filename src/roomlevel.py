@@ -582,10 +582,28 @@ class CorridorSuite(Occupier):
         return self._extended_cells
 
 
+def plan_special_room(depth: int, already_special_rooms: typing.Set[abstractlevel.SpecialRoomEnum]) -> typing.Optional[abstractlevel.SpecialRoomEnum]:
+    """
+    Special room (not shop) a room level at this depth will have if it has a room for it (None for none)
+    Chosen before the levels are generated so that they can be generated apart from one another
+    """
+
+    # only after level 1
+    if depth <= 1 or not myrandom.percent_chance(PROBA_SPECIAL_ROOM):
+        return None
+
+    # select special room type randomy (according to difficulty and frequency)
+    relevances = [(srt.frequency * 100) / (1 + abs(srt.difficulty - depth)) if srt not in already_special_rooms else 0 for srt in abstractlevel.SpecialRoomEnum]
+    special_room_choices = random.choices(list(abstractlevel.SpecialRoomEnum), relevances)
+    special_room_choice = special_room_choices[0]
+    already_special_rooms.add(special_room_choice)
+    return special_room_choice
+
+
 class RoomLevel(abstractlevel.AbstractLevel):
     """ A room level object """
 
-    def __init__(self, level_name: str, depth: int, branch: str, already_special_rooms: typing.Set[abstractlevel.SpecialRoomEnum], nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False) -> None:
+    def __init__(self, level_name: str, depth: int, branch: str, planned_special_room: typing.Optional[abstractlevel.SpecialRoomEnum], nb_down_stairs: int = 1, nb_up_stairs: int = 1, entry_level: bool = False, identifier: typing.Optional[int] = None) -> None:
 
         def rooms_indirectly_connected(a_room: Room, connections: typing.List[typing.Set[Room]]) -> typing.Set[Room]:
             """ Yields set of rooms connected to 'a_room' """
@@ -606,7 +624,7 @@ class RoomLevel(abstractlevel.AbstractLevel):
 
         #  start of init here
 
-        abstractlevel.AbstractLevel.__init__(self, level_name, depth, branch, nb_down_stairs, nb_up_stairs, entry_level)
+        abstractlevel.AbstractLevel.__init__(self, level_name, depth, branch, nb_down_stairs, nb_up_stairs, entry_level, identifier)
 
         assert nb_up_stairs + nb_down_stairs + 1 <= MAX_NB_ROOM, "Asking too many stairs for a  level"
 
@@ -682,7 +700,7 @@ class RoomLevel(abstractlevel.AbstractLevel):
                 possible_rooms.remove(room)
 
             # select entry room (used as base to make sure all connect)
-            self._entry_room = next(iter(self._up_rooms)) if self._up_rooms else next(iter(self._down_rooms))
+            self._entry_room = min(self._up_rooms) if self._up_rooms else min(self._down_rooms)
 
             # will be created later
             self._corridors: typing.List[CorridorSuite] = list()
@@ -841,14 +859,11 @@ class RoomLevel(abstractlevel.AbstractLevel):
             # add stuff into special room
             shop_special_room_choice.make_special(abstractlevel.SpecialRoomEnum.SHOP)
 
-        # promote one room as special room (not shop) after level 1
-        if depth > 1 and candidates_rooms and myrandom.percent_chance(PROBA_SPECIAL_ROOM):
+        # promote one room as special room (not shop) if planned for level
+        if planned_special_room is not None and candidates_rooms:
 
-            # select special room type randomy (according to difficulty and frequency)
-            relevances = [(srt.frequency * 100) / (1 + abs(srt.difficulty - depth)) if srt not in already_special_rooms else 0 for srt in abstractlevel.SpecialRoomEnum]
-            special_room_choices = random.choices(list(abstractlevel.SpecialRoomEnum), relevances)
-            special_room_choice = special_room_choices[0]
-            already_special_rooms.add(special_room_choice)
+            # special room type was chosen by dungeon
+            special_room_choice = planned_special_room
 
             # select room randomy (the smaller with  fewer doors the better)
             relevances = [1. / (r.container_width * r.container_height * len(r.room_doors)) for r in candidates_rooms]
@@ -5,25 +5,144 @@
 File : sequencer.py
 
 Sequencer.
+
+Actors are not looked at every segment : the sequencer knows when each one may do something again
+and when what it is doing will be finished (two heaps), so only actors that are due are touched.
+Move credit is given lazily (segment by segment since last time actor was looked at) so it is the same as if given every segment.
 """
 
 import typing
+import collections
+import heapq
+import itertools
+import random
+import time
 
 import myrandom
+import mylogger
 import actions
 import monsters
 import constants
 
+NB_TEST_ACTORS = 300
+NB_TEST_TICKS = 3000
+
+
+class SpeedSchedule:
+    """ Move credit got segment after segment by actors of a speed """
+
+    def __init__(self, speed: int) -> None:
+
+        self._speed = speed
+
+        # calculate move credit
+        # the aim is to be as close as possible as ideal value
+        # which is : actor.speed/constants.NB_SEGMENTS
+
+        # step one : credit you get every time
+        credit = speed // constants.NB_SEGMENTS
+        first_reminder_max = speed % constants.NB_SEGMENTS
+        # find biggest value that divides
+        for first_reminder in range(first_reminder_max, 1, -1):
+            if constants.NB_SEGMENTS % first_reminder == 0:
+                break
+        else:
+            first_reminder = 0
+
+        # step two : credit you get once every n segments
+        # (index is segment reference minus segment, modulo NB_SEGMENTS)
+        divide = constants.NB_SEGMENTS // first_reminder if first_reminder else 0
+        self._credits = [credit + (1 if divide and delta % divide == 0 else 0) for delta in range(constants.NB_SEGMENTS)]
+
+        # step three : credit you get randomly
+        self._second_reminder = first_reminder_max - first_reminder if first_reminder else 0
+
+        # credit got on first segments from a delta (index is number of segments)
+        self._credit_sums: typing.List[typing.List[int]] = list()
+        for delta in range(constants.NB_SEGMENTS):
+            sums = [0]
+            for num in range(constants.NB_SEGMENTS):
+                sums.append(sums[-1] + self._credits[(delta - num) % constants.NB_SEGMENTS])
+            self._credit_sums.append(sums)
+
+        # segments to get full credit from a credit and a delta, lucky every time (None if never)
+        self._segments_to_full: typing.List[typing.List[typing.Optional[int]]] = list()
+        lucky_credit = 1 if self._second_reminder else 0
+        for start_credit in range(constants.NB_SEGMENTS):
+            row: typing.List[typing.Optional[int]] = list()
+            for start_delta in range(constants.NB_SEGMENTS):
+                if not sum(self._credits) + lucky_credit:
+                    row.append(None)
+                    continue
+                credit, delta, nb_segments = start_credit, start_delta, 0
+                while credit < constants.NB_SEGMENTS:
+                    credit += self._credits[delta] + lucky_credit
+                    delta = (delta - 1) % constants.NB_SEGMENTS
+                    nb_segments += 1
+                row.append(nb_segments)
+            self._segments_to_full.append(row)
+
+    def credit_over(self, delta: int, nb_segments: int) -> int:
+        """ credit got (no luck) on a number of segments starting from a delta """
+        nb_rounds, nb_left = divmod(nb_segments, constants.NB_SEGMENTS)
+        return nb_rounds * self._credit_sums[delta][constants.NB_SEGMENTS] + self._credit_sums[delta][nb_left]
+
+    def segments_to_full(self, credit: int, delta: int) -> typing.Optional[int]:
+        """ segments to get full credit (lucky every time), None if never """
+        if credit >= constants.NB_SEGMENTS:
+            return 0
+        return self._segments_to_full[credit][delta]
+
+    @property
+    def speed(self) -> int:
+        """ property """
+        return self._speed
+
+    @property
+    def credits(self) -> typing.List[int]:
+        """ property """
+        return self._credits
+
+    @property
+    def second_reminder(self) -> int:
+        """ property """
+        return self._second_reminder
+
+
+# schedule of every speed met so far
+SPEED_SCHEDULES: typing.Dict[int, SpeedSchedule] = dict()
+
+
+def speed_schedule(speed: int) -> SpeedSchedule:
+    """ Schedule of a speed, made the first time it is needed """
+    if speed not in SPEED_SCHEDULES:
+        SPEED_SCHEDULES[speed] = SpeedSchedule(speed)
+    return SPEED_SCHEDULES[speed]
+
 
 class ActorData:
     """ Data relative to an actor of simulation """
 
-    def __init__(self, segment_reference: int) -> None:
+    def __init__(self, segment_reference: int, tick_now: int, order: int, schedule: SpeedSchedule, luck: random.Random) -> None:
         self._move_credit = 0
-        self._action_debt = 0
         self._segment_reference = segment_reference
+        self._schedule = schedule
+
+        # random part of move credit : own stream of actor (so order in which actors are looked at does not matter)
+        self._luck = luck
         self._now_doing: typing.Optional[actions.Action] = None
 
+        # ticks move credit was given for, tick when action debt will be paid
+        self._credit_tick = tick_now
+        self._debt_paid_tick = tick_now
+
+        # order of actor in simulation (changes when parked) and tick when what it does is finished
+        self._order = order
+        self._completion_tick = -1
+
+        # tick when actor may do something again
+        self._wakeup_tick = -1
+
     # move credit related methods
 
     def move_credit_full(self) -> bool:
@@ -40,36 +159,101 @@ class ActorData:
 
     # action debt related methods
 
-    def increase_action_debt(self, action_cost: int) -> None:
-        """ increase debt """
-        self._action_debt += action_cost
+    def increase_action_debt(self, action_cost: int, tick_now: int) -> None:
+        """ increase debt (paid one every tick) """
+        self._debt_paid_tick = max(self._debt_paid_tick, tick_now) + action_cost
 
-    def decrease_action_debt(self) -> None:
-        """ decrease debt """
-        if self._action_debt > 0:
-            self._action_debt -= 1
-
-    def no_action_debt(self) -> bool:
+    def no_action_debt(self, tick_now: int) -> bool:
         """ no debt """
-        return self._action_debt == 0
+        return tick_now >= self._debt_paid_tick
+
+    def forget_action(self, tick_now: int) -> None:
+        """ what was being done is over (not enclenched) """
+        self._debt_paid_tick = tick_now
+        self._now_doing = None
 
     # properties
 
+    @property
+    def move_credit(self) -> int:
+        """ property """
+        return self._move_credit
+
     @property
     def segment_reference(self) -> int:
         """ property """
         return self._segment_reference
 
+    @property
+    def luck(self) -> random.Random:
+        """ property """
+        return self._luck
+
+    @property
+    def schedule(self) -> SpeedSchedule:
+        """ property """
+        return self._schedule
+
+    @schedule.setter
+    def schedule(self, schedule: SpeedSchedule) -> None:
+        """ setter """
+        self._schedule = schedule
+
     @property
     def now_doing(self) -> typing.Optional[actions.Action]:
         """ property """
         return self._now_doing
 
     @now_doing.setter
-    def now_doing(self, now_doing: actions.Action) -> None:
+    def now_doing(self, now_doing: typing.Optional[actions.Action]) -> None:
         """ setter """
         self._now_doing = now_doing
 
+    @property
+    def credit_tick(self) -> int:
+        """ property """
+        return self._credit_tick
+
+    @credit_tick.setter
+    def credit_tick(self, credit_tick: int) -> None:
+        """ setter """
+        self._credit_tick = credit_tick
+
+    @property
+    def debt_paid_tick(self) -> int:
+        """ property """
+        return self._debt_paid_tick
+
+    @property
+    def order(self) -> int:
+        """ property """
+        return self._order
+
+    @order.setter
+    def order(self, order: int) -> None:
+        """ setter """
+        self._order = order
+
+    @property
+    def completion_tick(self) -> int:
+        """ property """
+        return self._completion_tick
+
+    @completion_tick.setter
+    def completion_tick(self, completion_tick: int) -> None:
+        """ setter """
+        self._completion_tick = completion_tick
+
+    @property
+    def wakeup_tick(self) -> int:
+        """ property """
+        return self._wakeup_tick
+
+    @wakeup_tick.setter
+    def wakeup_tick(self, wakeup_tick: int) -> None:
+        """ setter """
+        self._wakeup_tick = wakeup_tick
+
 
 class Sequencer:
     """ Sequencer """
@@ -78,76 +262,123 @@ class Sequencer:
         # we start a round 1
         self._round = 0
         self._segment = 0
+        self._nb_ticks = 0
         self._actor_table: typing.Dict[monsters.Monster, ActorData] = dict()
+        # actors not simulated (on a level where hero is not)
+        self._parked_table: typing.Dict[monsters.Monster, ActorData] = dict()
 
-    def tick(self) -> None:
-        """ tick """
+        # order of actors is the one of registration
+        self._orders = itertools.count(0)
 
-        # give move credit to actors
-        for actor, actor_data in self._actor_table.items():
+        # number of registration gives stream of luck of actor
+        self._registrations = itertools.count(0)
 
-            # no move credit if full already
-            if actor_data.move_credit_full():
-                continue
+        # heaps of (tick, order, actor) : when actor may do something again, when what it does is finished
+        self._wakeups: typing.List[typing.Tuple[int, int, monsters.Monster]] = list()
+        self._completions: typing.List[typing.Tuple[int, int, monsters.Monster]] = list()
 
-            # calculate move credit
-            # the aim is to be as close as possible as ideal value
-            # which is : actor.speed/constants.NB_SEGMENTS
-
-            # step one : credit you get every time
-            credit = actor.speed_value() // constants.NB_SEGMENTS
-            first_reminder_max = actor.speed_value() % constants.NB_SEGMENTS
-            # find biggest value that divides
-            for first_reminder in range(first_reminder_max, 1, -1):
-                if constants.NB_SEGMENTS % first_reminder == 0:
-                    break
-            else:
-                first_reminder = 0
-
-            # step two : credit you get once every n segments
-            if first_reminder:
-                divide = constants.NB_SEGMENTS // first_reminder
-                assert constants.NB_SEGMENTS % first_reminder == 0
-                delta_seg_now = actor_data.segment_reference - self._segment
-                if delta_seg_now < 0:
-                    delta_seg_now += constants.NB_SEGMENTS
-                if delta_seg_now % divide == 0:
+        # actors per segment reference (in order) to tick them
+        self._segment_actors: typing.List[typing.Dict[monsters.Monster, None]] = [dict() for _ in range(constants.NB_SEGMENTS)]
+
+    def _give_move_credit(self, actor_data: ActorData) -> None:
+        """ move credit actor would have got on every tick since last time """
+
+        tick = actor_data.credit_tick
+        if tick >= self._nb_ticks:
+            return
+
+        credit = actor_data.move_credit
+        schedule = actor_data.schedule
+        delta = (actor_data.segment_reference - tick) % constants.NB_SEGMENTS
+
+        # no move credit if full already
+        if not schedule.second_reminder:
+            nb_segments = self._nb_ticks - tick
+            segments_to_full = schedule.segments_to_full(credit, delta)
+            if segments_to_full is not None and segments_to_full < nb_segments:
+                nb_segments = segments_to_full
+            credit += schedule.credit_over(delta, nb_segments)
+        else:
+            credits = schedule.credits
+            second_reminder = schedule.second_reminder
+            luck = actor_data.luck
+            while tick < self._nb_ticks and credit < constants.NB_SEGMENTS:
+                credit += credits[delta]
+                if luck.randint(0, constants.NB_SEGMENTS - 1) < second_reminder:
                     credit += 1
-                second_reminder = first_reminder_max - first_reminder
+                delta = (delta - 1) % constants.NB_SEGMENTS
+                tick += 1
 
-                # step three : credit you get randomly
-                if second_reminder:
-                    if myrandom.randint(0, constants.NB_SEGMENTS - 1) < second_reminder:
-                        credit += 1
+        actor_data.give_move_credit(credit - actor_data.move_credit)
+        actor_data.credit_tick = self._nb_ticks
+
+    def _wake_up_at(self, actor: monsters.Monster, actor_data: ActorData, tick: int) -> None:
+        """ actor will be looked at again then (and not before) """
+        if actor_data.wakeup_tick == tick:
+            return
+        actor_data.wakeup_tick = tick
+        heapq.heappush(self._wakeups, (tick, actor_data.order, actor))
 
-            # give calculated move credit
-            actor_data.give_move_credit(credit)
+    def _schedule(self, actor: monsters.Monster, actor_data: ActorData, soonest: int) -> None:
+        """ first tick from soonest when actor may do something (move credit full, lucky every time, and no action debt) """
 
-        # diminish actors' action debt (much simpler)
-        for actor, actor_data in self._actor_table.items():
-            actor_data.decrease_action_debt()
-            if actor_data.no_action_debt():
-                action = actor_data.now_doing
-                # enclenches result of action  since finished doing it
-                if action:
-                    action.execute()
-                    actor_data.now_doing = None
+        delta = (actor_data.segment_reference - self._nb_ticks) % constants.NB_SEGMENTS
+        segments_to_full = actor_data.schedule.segments_to_full(actor_data.move_credit, delta)
+
+        # too slow to ever do anything
+        if segments_to_full is None:
+            actor_data.wakeup_tick = -1
+            return
+
+        self._wake_up_at(actor, actor_data, max(self._nb_ticks + segments_to_full, actor_data.debt_paid_tick, soonest))
+
+    def tick(self) -> None:
+        """ tick """
+
+        # enclenches result of actions finished doing
+        while self._completions and self._completions[0][0] <= self._nb_ticks:
+            completion_tick, order, actor = heapq.heappop(self._completions)
+            actor_data = self._actor_table.get(actor)
+            if actor_data is None or actor_data.order != order or actor_data.completion_tick != completion_tick:
+                continue
+            action = actor_data.now_doing
+            if action:
+                action.execute()
+                actor_data.now_doing = None
 
         # tick actors that are on "their" segment
-        for actor, actor_data in self._actor_table.items():
-            if actor_data.segment_reference == self._segment:
-                actor.tick()
+        for actor in list(self._segment_actors[self._segment]):
+            actor.tick()
 
         # move clock time
+        self._nb_ticks += 1
         self._segment += 1
         if self._segment == constants.NB_SEGMENTS:
             self._segment = 0
             self._round += 1
 
+    def due_actors(self) -> typing.List[monsters.Monster]:
+        """ actors that can do something now, in order (each one must start doing something) """
+
+        due_ones: typing.List[typing.Tuple[int, monsters.Monster]] = list()
+        while self._wakeups and self._wakeups[0][0] <= self._nb_ticks:
+            wakeup_tick, order, actor = heapq.heappop(self._wakeups)
+            actor_data = self._actor_table.get(actor)
+            if actor_data is None or actor_data.order != order or actor_data.wakeup_tick != wakeup_tick:
+                continue
+            actor_data.wakeup_tick = -1
+            if self.can_do_something(actor):
+                due_ones.append((order, actor))
+            else:
+                self._schedule(actor, actor_data, self._nb_ticks)
+
+        return [a for _, a in sorted(due_ones, key=lambda d: d[0])]
+
     def can_do_something(self, actor: monsters.Monster) -> bool:
         """ not just moved nor doing anything """
         action_data = self._actor_table[actor]
-        return action_data.move_credit_full() and action_data.no_action_debt()
+        self._give_move_credit(action_data)
+        return action_data.move_credit_full() and action_data.no_action_debt(self._nb_ticks)
 
     def starts_doing(self, actor: monsters.Monster, action: actions.Action) -> None:
         """ starts doing (move or action) """
@@ -157,21 +388,346 @@ class Sequencer:
             action_data.consume_move_credit()
         else:
             action_data.now_doing = action
-            action_data.increase_action_debt(action.cost())
+            action_data.increase_action_debt(action.cost(), self._nb_ticks)
+            # finished on the tick that pays the debt (or the very next one if it costs nothing)
+            action_data.completion_tick = self._nb_ticks + max(action.cost(), 1) - 1
+            heapq.heappush(self._completions, (action_data.completion_tick, action_data.order, actor))
+        # not before next time
+        self._schedule(actor, action_data, self._nb_ticks + 1)
 
     def register(self, actor: monsters.Monster) -> None:
         """ register a monster or hero """
-        action_data = ActorData(self._segment)
+        luck = random.Random(myrandom.derived_seed(f"move credit {next(self._registrations)}"))
+        action_data = ActorData(self._segment, self._nb_ticks, next(self._orders), speed_schedule(actor.speed_value()), luck)
         self._actor_table[actor] = action_data
+        self._segment_actors[action_data.segment_reference][actor] = None
+        self._schedule(actor, action_data, self._nb_ticks)
 
     def unregister(self, actor: monsters.Monster) -> None:
         """ unregister a monster or hero  """
-        del self._actor_table[actor]
+        if actor in self._parked_table:
+            del self._parked_table[actor]
+            return
+        action_data = self._actor_table.pop(actor)
+        del self._segment_actors[action_data.segment_reference][actor]
+
+    def life_changed(self, actor: monsters.Monster, previous_state: monsters.LifeStateEnum, life_state: monsters.LifeStateEnum) -> None:
+        """ called by lifecycle of monsters """
+        if life_state is monsters.LifeStateEnum.ACTIVE:
+            if previous_state is monsters.LifeStateEnum.RISING:
+                self.register(actor)
+            else:
+                self.unpark(actor)
+        elif life_state in (monsters.LifeStateEnum.SLEEPING, monsters.LifeStateEnum.DORMANT):
+            self.park(actor)
+        elif life_state is monsters.LifeStateEnum.DEAD:
+            self.unregister(actor)
+
+    def speed_changed(self, actor: monsters.Monster) -> None:
+        """ actor goes faster or slower from now on (hasted, slowed, burdened...) """
+        action_data = self._actor_table[actor]
+        self._give_move_credit(action_data)
+        action_data.schedule = speed_schedule(actor.speed_value())
+        action_data.wakeup_tick = -1
+        self._schedule(actor, action_data, self._nb_ticks)
+
+    def park(self, actor: monsters.Monster) -> None:
+        """ actor is not simulated any more until unparked """
+        action_data = self._actor_table.pop(actor)
+        self._give_move_credit(action_data)
+        del self._segment_actors[action_data.segment_reference][actor]
+        self._parked_table[actor] = action_data
+
+    def unpark(self, actor: monsters.Monster) -> None:
+        """ actor is simulated again, what it was doing was done while parked """
+        action_data = self._parked_table.pop(actor)
+        action_data.forget_action(self._nb_ticks)
+        action_data.credit_tick = self._nb_ticks
+        action_data.order = next(self._orders)
+        action_data.wakeup_tick = -1
+        self._actor_table[actor] = action_data
+        self._segment_actors[action_data.segment_reference][actor] = None
+        self._schedule(actor, action_data, self._nb_ticks)
+
+    @property
+    def round_now(self) -> int:
+        """ property """
+        return self._round
+
+    @property
+    def nb_actors(self) -> int:
+        """ property """
+        return len(self._actor_table)
 
     def turn(self) -> str:
         """ turn to display on screen """
         return f"T:{self._round+1}.{self._segment+1}"
 
 
+def test() -> None:
+    """ Sequencer gives the same simulation as when every actor was looked at every tick (and faster) """
+
+    mylogger.start_logger(True)
+    constants.load_config()
+    myrandom.start_random()
+
+    class TestAction:
+        """ action that only leaves a trace """
+
+        def __init__(self, trace: typing.List[typing.Tuple[int, str, int]], name: int, move: bool, cost: int) -> None:
+            self._trace = trace
+            self._name = name
+            self._move = move
+            self._cost = cost
+
+        def is_move(self) -> bool:
+            """ is_move """
+            return self._move
+
+        def cost(self) -> int:
+            """ cost """
+            return self._cost
+
+        def execute(self) -> None:
+            """ execute """
+            self._trace.append((len(self._trace), "executes", self._name))
+
+    class TestActor:
+        """ actor with its own random for what it decides (so order in which actors are looked at does not matter) """
+
+        def __init__(self, trace: typing.List[typing.Tuple[int, str, int]], name: int, speed: int) -> None:
+            self._trace = trace
+            self._name = name
+            self._speed = speed
+            self._random = random.Random(name)
+
+        def speed_value(self) -> int:
+            """ speed """
+            return self._speed
+
+        def change_speed(self, speed: int) -> None:
+            """ hasted, slowed... """
+            self._speed = speed
+
+        def decide(self) -> TestAction:
+            """ what to do """
+            self._trace.append((len(self._trace), "acts", self._name))
+            if self._random.randint(0, 2):
+                return TestAction(self._trace, self._name, True, 0)
+            return TestAction(self._trace, self._name, False, self._random.randint(0, 20))
+
+        def tick(self) -> None:
+            """ tick """
+            self._trace.append((len(self._trace), "ticks", self._name))
+
+    class ReferenceActorData:
+        """ data of actor as it was """
+
+        def __init__(self, segment_reference: int, luck: random.Random) -> None:
+            self._move_credit = 0
+            self._action_debt = 0
+            self.segment_reference = segment_reference
+            self.luck = luck
+            self.now_doing: typing.Optional[TestAction] = None
+
+        def move_credit_full(self) -> bool:
+            """ check if full """
+            return self._move_credit >= constants.NB_SEGMENTS
+
+        def give_move_credit(self, credit: int) -> None:
+            """ more credit """
+            self._move_credit += credit
+
+        def consume_move_credit(self) -> None:
+            """ more credit """
+            self._move_credit -= constants.NB_SEGMENTS
+
+        def increase_action_debt(self, action_cost: int) -> None:
+            """ increase debt """
+            self._action_debt += action_cost
+
+        def decrease_action_debt(self) -> None:
+            """ decrease debt """
+            if self._action_debt > 0:
+                self._action_debt -= 1
+
+        def no_action_debt(self) -> bool:
+            """ no debt """
+            return self._action_debt == 0
+
+        def forget_action(self) -> None:
+            """ forget action """
+            self._action_debt = 0
+            self.now_doing = None
+
+    class ReferenceSequencer:
+        """ sequencer as it was : every actor looked at every tick (and moved from ready to standby by game loop) """
+
+        def __init__(self) -> None:
+            self._segment = 0
+            self._actor_table: typing.Dict[typing.Any, ReferenceActorData] = dict()
+            self._parked_table: typing.Dict[typing.Any, ReferenceActorData] = dict()
+            self._ready_ones: typing.Deque[typing.Any] = collections.deque([])
+            self._standby_ones: typing.Deque[typing.Any] = collections.deque([])
+            self._registrations = itertools.count(0)
+
+        def tick(self) -> None:
+            """ tick """
+
+            for actor, actor_data in self._actor_table.items():
+                if actor_data.move_credit_full():
+                    continue
+                credit = actor.speed_value() // constants.NB_SEGMENTS
+                first_reminder_max = actor.speed_value() % constants.NB_SEGMENTS
+                for first_reminder in range(first_reminder_max, 1, -1):
+                    if constants.NB_SEGMENTS % first_reminder == 0:
+                        break
+                else:
+                    first_reminder = 0
+                if first_reminder:
+                    divide = constants.NB_SEGMENTS // first_reminder
+                    assert constants.NB_SEGMENTS % first_reminder == 0
+                    delta_seg_now = actor_data.segment_reference - self._segment
+                    if delta_seg_now < 0:
+                        delta_seg_now += constants.NB_SEGMENTS
+                    if delta_seg_now % divide == 0:
+                        credit += 1
+                    second_reminder = first_reminder_max - first_reminder
+                    if second_reminder:
+                        if actor_data.luck.randint(0, constants.NB_SEGMENTS - 1) < second_reminder:
+                            credit += 1
+                actor_data.give_move_credit(credit)
+
+            for actor, actor_data in self._actor_table.items():
+                actor_data.decrease_action_debt()
+                if actor_data.no_action_debt():
+                    action = actor_data.now_doing
+                    if action:
+                        action.execute()
+                        actor_data.now_doing = None
+
+            for actor, actor_data in self._actor_table.items():
+                if actor_data.segment_reference == self._segment:
+                    actor.tick()
+
+            self._segment += 1
+            if self._segment == constants.NB_SEGMENTS:
+                self._segment = 0
+
+        def can_do_something(self, actor: typing.Any) -> bool:
+            """ not just moved nor doing anything """
+            action_data = self._actor_table[actor]
+            return action_data.move_credit_full() and action_data.no_action_debt()
+
+        def due_actors(self) -> typing.List[typing.Any]:
+            """ what game loop did : every actor from ready to standby, asked if it can do something """
+            due_ones = list()
+            while self._standby_ones:
+                self._ready_ones.append(self._standby_ones.popleft())
+            while self._ready_ones:
+                actor = self._ready_ones.popleft()
+                if self.can_do_something(actor):
+                    due_ones.append(actor)
+                self._standby_ones.append(actor)
+            return due_ones
+
+        def starts_doing(self, actor: typing.Any, action: TestAction) -> None:
+            """ starts doing (move or action) """
+            action_data = self._actor_table[actor]
+            if action.is_move():
+                action.execute()
+                action_data.consume_move_credit()
+            else:
+                action_data.now_doing = action
+                action_data.increase_action_debt(action.cost())
+
+        def register(self, actor: typing.Any) -> None:
+            """ register """
+            luck = random.Random(myrandom.derived_seed(f"move credit {next(self._registrations)}"))
+            self._actor_table[actor] = ReferenceActorData(self._segment, luck)
+            self._standby_ones.append(actor)
+
+        def unregister(self, actor: typing.Any) -> None:
+            """ unregister """
+            if actor in self._parked_table:
+                del self._parked_table[actor]
+                return
+            del self._actor_table[actor]
+            self._standby_ones.remove(actor)
+
+        def speed_changed(self, actor: typing.Any) -> None:
+            """ speed is read every tick """
+
+        def park(self, actor: typing.Any) -> None:
+            """ park """
+            self._parked_table[actor] = self._actor_table.pop(actor)
+            self._standby_ones.remove(actor)
+
+        def unpark(self, actor: typing.Any) -> None:
+            """ unpark """
+            actor_data = self._parked_table.pop(actor)
+            actor_data.forget_action()
+            self._actor_table[actor] = actor_data
+            self._standby_ones.append(actor)
+
+    def simulate(sequencer: typing.Any, nb_actors: int, nb_ticks: int) -> typing.Tuple[typing.List[typing.Tuple[int, str, int]], float]:
+        """ same scenario (actors coming, going, parked...) and trace of what happens """
+
+        trace: typing.List[typing.Tuple[int, str, int]] = list()
+        scenario = random.Random(0)
+        speeds = [3, 6, 7, 9, 12, 12, 12, 15, 18, 20, 24]
+        active: typing.List[TestActor] = list()
+        parked: typing.List[TestActor] = list()
+        names = itertools.count(0)
+
+        for _ in range(nb_actors):
+            actor = TestActor(trace, next(names), scenario.choice(speeds))
+            sequencer.register(actor)
+            active.append(actor)
+
+        t_before = time.perf_counter()
+        for _ in range(nb_ticks):
+
+            # some actors come, go, are parked or unparked, change speed
+            choice = scenario.randint(0, 99)
+            if choice == 0:
+                actor = TestActor(trace, next(names), scenario.choice(speeds))
+                sequencer.register(actor)
+                active.append(actor)
+            elif choice == 1 and active:
+                actor = active.pop(scenario.randint(0, len(active) - 1))
+                sequencer.unregister(actor)
+            elif choice == 2 and active:
+                actor = active.pop(scenario.randint(0, len(active) - 1))
+                sequencer.park(actor)
+                parked.append(actor)
+            elif choice == 3 and parked:
+                actor = parked.pop(scenario.randint(0, len(parked) - 1))
+                sequencer.unpark(actor)
+                active.append(actor)
+            elif choice == 4 and active:
+                actor = active[scenario.randint(0, len(active) - 1)]
+                actor.change_speed(scenario.choice(speeds))
+                sequencer.speed_changed(actor)
+
+            for actor in sequencer.due_actors():
+                sequencer.starts_doing(actor, actor.decide())
+
+            sequencer.tick()
+
+        return trace, time.perf_counter() - t_before
+
+    trace_reference, t_reference = simulate(ReferenceSequencer(), NB_TEST_ACTORS, NB_TEST_TICKS)
+    trace_event, t_event = simulate(Sequencer(), NB_TEST_ACTORS, NB_TEST_TICKS)
+    for event_reference, event in zip(trace_reference, trace_event):
+        assert event == event_reference, f"Simulations differ : {event_reference} before, {event} now"
+    assert len(trace_event) == len(trace_reference), "Simulations differ in length"
+
+    nb_acts = sum(1 for _, what, _ in trace_event if what == "acts")
+    print(f"{NB_TEST_ACTORS} actors {NB_TEST_TICKS} ticks : same {len(trace_event)} events ({nb_acts} acts)")
+    print(f"every actor every tick : {t_reference:.3f} s, due actors only : {t_event:.3f} s")
+    print(f"per tick : {t_reference / NB_TEST_TICKS * 1e6:.0f} us before, {t_event / NB_TEST_TICKS * 1e6:.0f} us now ({len(SPEED_SCHEDULES)} speed schedules)")
+
+
 if __name__ == '__main__':
-    assert False, "Do not run this script"
+    test()